@@ -15,4 +15,5 @@ urlpatterns = [
     path('doctors/delete/<uuid:doctor_id>/', views.delete_doctor, name='delete_doctor'),
     path('access-logs/', views.view_access_logs, name='view_access_logs'),
     path('verify-doctor/<uuid:doctor_id>/', views.verify_doctor, name='verify_doctor'),
+    path('registry-status/', views.registry_status, name='registry_status'),
 ]
@@ -3,9 +3,11 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
+from django.http import JsonResponse
 from patients.models import Patient, MedicalRecord
 from doctors.models import Doctor, AccessLog
 from patients.utils import doctor_validator
+from authentication import session_backend
 from django.utils import timezone
 
 def admin_login(request):
@@ -14,7 +16,7 @@ def admin_login(request):
         password = request.POST.get('password')
         user = authenticate(request, username=email, password=password)  # Use email as username
         if user is not None and user.is_superuser:
-            login(request, user)
+            login(request, user, backend=session_backend(user))
             messages.success(request, 'Admin login successful!')
             return redirect('admin_panel:dashboard')
         else:
@@ -177,3 +179,21 @@ def view_doctor_details(request, doctor_id):
     }
     
     return render(request, 'admin_panel/view_doctor_details.html', context)
+
+@login_required
+def registry_status(request):
+    if not request.user.is_superuser:
+        messages.error(request, 'Access denied. Admin privileges required.')
+        return redirect('admin_panel:login')
+    
+    # Report without forcing a load, so a cold worker stays cold
+    status = {
+        'loaded': doctor_validator.is_loaded,
+        'load_seconds': doctor_validator.load_seconds,
+        'validation_cache': doctor_validator.results.stats(),
+    }
+    if doctor_validator.is_loaded:
+        status['total_active_doctors'] = len(doctor_validator.active_doctors)
+        status['total_blacklisted_doctors'] = len(doctor_validator.blacklisted_doctors)
+    
+    return JsonResponse(status)
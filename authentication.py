@@ -1,38 +1,57 @@
-from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.backends import BaseBackend, ModelBackend
 from django.contrib.auth import get_user_model
-from patients.models import Patient
+from patients.models import Patient, UserIdentity
 from doctors.models import Doctor
+from patients.user_cache import load_user
 
-class CustomAuthBackend(BaseBackend):
+class CustomAuthBackend(ModelBackend):
     """
     Custom authentication backend that supports both Patient and Doctor models
+    
+    Permissions come from ModelBackend, which is why it no longer needs to be
+    listed separately: as a fallback it repeated the Patient lookup and ran a
+    second password hash for every failed login.
     """
     
-    def authenticate(self, request, username=None, password=None, **kwargs):
+    def authenticate(self, request, username=None, password=None, user_kind=None, **kwargs):
         """
         Authenticate user by checking both Patient and Doctor models
+        
+        The email is resolved to its accounts through UserIdentity in one
+        query, and exactly one password hash is computed per attempt: against
+        that account, or against a throwaway password when there is none, so
+        unknown emails take as long as wrong passwords. When the email belongs
+        to both a patient and a doctor, user_kind ('patient' or 'doctor',
+        passed by the login views) picks the account; patients come first
+        otherwise.
         """
-        # Try to authenticate as Patient first
-        try:
-            patient = Patient.objects.get(email=username)
-            if patient.check_password(password):
-                return patient
-        except Patient.DoesNotExist:
-            pass
+        if username is None or password is None:
+            return None
         
-        # Try to authenticate as Doctor
-        try:
-            doctor = Doctor.objects.get(email=username)
-            if doctor.check_password(password):
-                return doctor
-        except Doctor.DoesNotExist:
-            pass
+        identities = UserIdentity.resolve(username)
+        kinds = [kind for kind, _ in UserIdentity.KINDS]
+        if user_kind and user_kind.upper() in kinds:
+            kinds.insert(0, kinds.pop(kinds.index(user_kind.upper())))
+        for kind in kinds:
+            if kind not in identities:
+                continue
+            model = UserIdentity.model_of(kind)
+            try:
+                user = model._default_manager.get(pk=identities[kind])
+            except model.DoesNotExist:
+                break
+            return user if user.check_password(password) else None
         
+        # Unknown email: hash anyway so the response time doesn't reveal it
+        Patient().set_password(password)
         return None
     
     def get_user(self, user_id):
         """
         Get user by checking both Patient and Doctor models
+        
+        Only used for sessions that didn't record the user kind at login
+        (see session_backend()); those resolve in a single query instead.
         """
         try:
             patient = Patient.objects.get(pk=user_id)
@@ -47,3 +66,32 @@ class CustomAuthBackend(BaseBackend):
             pass
         
         return None
+
+class UserKindBackend(BaseBackend):
+    """
+    Resolves the logged-in user from one model
+    
+    Django keeps the backend a user logged in with in the session and asks
+    that backend for the user on every request, so logging in with the
+    backend for the user's kind makes get_user() a single primary-key query,
+    or none at all when SESSION_USER_CACHE is set.
+    """
+    model = None
+    
+    def get_user(self, user_id):
+        return load_user(self.model, user_id)
+
+class PatientBackend(UserKindBackend):
+    model = Patient
+
+class DoctorBackend(UserKindBackend):
+    model = Doctor
+
+SESSION_BACKENDS = {
+    Patient: 'authentication.PatientBackend',
+    Doctor: 'authentication.DoctorBackend',
+}
+
+def session_backend(user):
+    """Return the backend path to pass to login() for a Patient or Doctor"""
+    return SESSION_BACKENDS.get(type(user), 'authentication.CustomAuthBackend')
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+import os
+import time
+import random
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from patients.cache import LRUCache
+from patients.registry import DoctorRegistry
+from patients.utils import DoctorValidationService
+
+COUNCILS = [
+    'Andhra Pradesh Medical Council',
+    'Tamil Nadu Medical Council',
+    'Karnataka Medical Council',
+    'Maharashtra Medical Council',
+    'Delhi Medical Council',
+]
+
+def build_rows(count, offset=0):
+    """Build synthetic registry rows"""
+    return [
+        {
+            'registration_number': str(offset + i),
+            'state_medical_council': COUNCILS[i % len(COUNCILS)],
+            'name': f'Doctor {offset + i}',
+            'qualification_1': 'MBBS',
+        }
+        for i in range(count)
+    ]
+
+def linear_validate(active_rows, blacklisted_rows, registration_number, state_medical_council):
+    """The pre-index lookup: scan the blacklist, then the active list"""
+    for rows in (blacklisted_rows, active_rows):
+        for doctor in rows:
+            if registration_number and doctor.get('registration_number') == registration_number:
+                return doctor
+    return None
+
+def benchmark(rows, calls, baseline_calls):
+    """Compare linear-scan and indexed validation throughput"""
+
+    print("⏱️  DOCTOR VALIDATION BENCHMARK")
+    print("=" * 50)
+
+    blacklisted_count = max(rows // 100, 1)
+    active_rows = build_rows(rows - blacklisted_count)
+    blacklisted_rows = build_rows(blacklisted_count, offset=rows)
+
+    # Half of the lookups hit, half miss
+    queries = [
+        (str(random.randrange(rows * 2)), random.choice(COUNCILS))
+        for _ in range(calls)
+    ]
+
+    print(f"\n📊 Registry: {len(active_rows)} active, {len(blacklisted_rows)} blacklisted")
+    print(f"   Lookups: {calls} (baseline sampled on {baseline_calls})")
+
+    # Before: linear scan over every row
+    start = time.perf_counter()
+    for registration_number, council in queries[:baseline_calls]:
+        linear_validate(active_rows, blacklisted_rows, registration_number, council)
+    baseline_elapsed = time.perf_counter() - start
+    baseline_rate = baseline_calls / baseline_elapsed
+
+    # After: hash indexes built once at load time
+    start = time.perf_counter()
+    service = DoctorValidationService(DoctorRegistry(active_rows), DoctorRegistry(blacklisted_rows))
+    build_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for registration_number, council in queries:
+        service.validate_doctor(registration_number, council)
+    indexed_elapsed = time.perf_counter() - start
+    indexed_rate = calls / indexed_elapsed
+
+    print(f"\n🐢 Linear scan: {baseline_rate:,.1f} calls/sec")
+    print(f"🚀 Indexed:     {indexed_rate:,.1f} calls/sec (index build {build_elapsed:.2f}s)")
+    print(f"   Speedup:     {indexed_rate / baseline_rate:,.0f}x")
+
+    # Emergency and profile views keep validating the same few doctors
+    hot = queries[:100]
+    repeated = [random.choice(hot) for _ in range(calls)]
+    rates = {}
+    for label, maxsize in (('uncached', 0), ('memoized', 4096)):
+        service.results = LRUCache(maxsize, ttl=300)
+        start = time.perf_counter()
+        for registration_number, council in repeated:
+            service.validate_doctor(registration_number, council)
+        rates[label] = calls / (time.perf_counter() - start)
+
+    print(f"\n🔁 Repeated lookups over {len(hot)} doctors")
+    print(f"   Uncached:    {rates['uncached']:,.1f} calls/sec")
+    print(f"   Memoized:    {rates['memoized']:,.1f} calls/sec")
+    print(f"   Cache:       {service.results.stats()}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark doctor registry validation")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic registry size')
+    parser.add_argument('--calls', type=int, default=100_000, help='Indexed lookups to time')
+    parser.add_argument('--baseline-calls', type=int, default=20, help='Linear-scan lookups to time')
+    args = parser.parse_args()
+    benchmark(args.rows, args.calls, args.baseline_calls)
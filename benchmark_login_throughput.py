@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+import os
+import time
+import tempfile
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment
+
+from patients.models import Patient
+from doctors.models import Doctor
+
+class LegacyAuthBackend(ModelBackend):
+    """The pre-change backend: Patient, then Doctor, with ModelBackend listed after it"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        for model in (Patient, Doctor):
+            try:
+                user = model.objects.get(email=username)
+                if user.check_password(password):
+                    return user
+            except model.DoesNotExist:
+                pass
+        return None
+
+LEGACY_BACKENDS = override_settings(AUTHENTICATION_BACKENDS=[
+    '__main__.LegacyAuthBackend',
+    'django.contrib.auth.backends.ModelBackend',
+])
+
+CASES = [
+    ('Valid patient', 'bench.patient@example.com', 'bench-pass'),
+    ('Valid doctor', 'bench.doctor@example.com', 'bench-pass'),
+    ('Wrong password (patient)', 'bench.patient@example.com', 'wrong-pass'),
+    ('Wrong password (doctor)', 'bench.doctor@example.com', 'wrong-pass'),
+    ('Unknown email', 'nobody@example.com', 'wrong-pass'),
+]
+
+def create_users():
+    """Create one patient and one doctor in the throwaway test database"""
+    Patient.objects.create_user(
+        'bench.patient@example.com', 'bench-pass', first_name='Bench', last_name='Patient', phone_number='7000000001'
+    )
+    doctor = Doctor.objects.create(
+        email='bench.doctor@example.com', username='benchdoctor', phone_number='7000000002',
+        nmc_registration_number='BENCH1', medical_license_number='BENCHLIC1',
+        hospital_name='General Hospital', hospital_address='Main Road', is_verified=True,
+    )
+    doctor.set_password('bench-pass')
+    doctor.save()
+
+def measure(email, password, attempts):
+    """Return (password hashes per attempt, logins/sec)"""
+    hasher = type(get_hasher())
+    original = hasher.encode
+    hashes = 0
+
+    def counting_encode(self, *args, **kwargs):
+        nonlocal hashes
+        hashes += 1
+        return original(self, *args, **kwargs)
+
+    hasher.encode = counting_encode
+    try:
+        started = time.perf_counter()
+        for _ in range(attempts):
+            authenticate(None, username=email, password=password)
+        elapsed = time.perf_counter() - started
+    finally:
+        hasher.encode = original
+    return hashes / attempts, attempts / elapsed
+
+def benchmark(attempts):
+    """Compare logins/sec on one core before and after the single-hash login pipeline"""
+
+    print("🔑 LOGIN THROUGHPUT BENCHMARK")
+    print("=" * 50)
+    print(f"\nHasher: {get_hasher().algorithm}, {attempts} attempts per case, one process")
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    media = tempfile.TemporaryDirectory()
+    settings.MEDIA_ROOT = media.name
+    settings.QR_CODE_WORKERS = 0
+    try:
+        create_users()
+        for label, legacy in (('Before (CustomAuthBackend + ModelBackend)', True), ('After', False)):
+            print(f"\n📊 {label}")
+            if legacy:
+                LEGACY_BACKENDS.enable()
+            for case, email, password in CASES:
+                hashes, rate = measure(email, password, attempts)
+                print(f"   {case:<26} {hashes:.0f} hash(es)/attempt   {rate:,.2f} logins/sec")
+            if legacy:
+                LEGACY_BACKENDS.disable()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark login attempts per second")
+    parser.add_argument('--attempts', type=int, default=10, help='Login attempts to time per case')
+    args = parser.parse_args()
+    benchmark(args.attempts)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+import os
+import time
+import uuid
+import random
+import tempfile
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment
+from patients.models import Patient, PatientSearchTerm
+from patients.search import SEARCH_PAGE_SIZE, SEARCH_RESULTS_LIMIT, patient_terms, search_patients
+
+FIRST_NAMES = [
+    'Aarav', 'Priya', 'Venkatesh', 'Lakshmi', 'Mohammed', 'Ananya', 'Subramaniam', 'Kavya', 'Rahul', 'Fatima',
+    'Arjun', 'Divya', 'Sanjay', 'Meera', 'Imran', 'Pooja', 'Karthik', 'Nisha', 'Vikram', 'Sneha',
+]
+LAST_NAMES = [
+    'Sharma', 'Reddy', 'Krishnamurthy', 'Iyer', 'Khan', 'Banerjee', 'Naidu', 'Patel', 'Gupta', 'Menon',
+    'Das', 'Pillai', 'Joshi', 'Rao', 'Chatterjee', 'Nair', 'Singh', 'Verma', 'Kulkarni', 'Bose',
+]
+
+def legacy_search(query):
+    """The icontains queries search_patient ran before the search index"""
+    if query.startswith('PT'):
+        patients = Patient.objects.filter(patient_id__icontains=query)
+    elif '@' in query:
+        patients = Patient.objects.filter(email__icontains=query)
+    else:
+        patients = Patient.objects.filter(first_name__icontains=query) | Patient.objects.filter(last_name__icontains=query)
+    return list(patients.distinct())
+
+def populate(count, batch_size=10000):
+    """Insert patients and their search terms in batches, bypassing save()"""
+    for start in range(0, count, batch_size):
+        patients = []
+        for i in range(start, min(start + batch_size, count)):
+            first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+            # Rarer surnames, so name searches have selective and broad cases
+            if i % 100 == 0:
+                last = f"{last}{i:x}"
+            patients.append(Patient(
+                id=uuid.uuid4(), patient_id=f"PT{i:08X}", email=f"{first.lower()}.{last.lower()}{i}@example.com",
+                phone_number=str(7000000000 + i), first_name=first, last_name=last, password='',
+            ))
+        with transaction.atomic():
+            Patient.objects.bulk_create(patients)
+            PatientSearchTerm.objects.bulk_create(
+                PatientSearchTerm(patient=patient, kind=kind, term=term)
+                for patient in patients for kind, term in patient_terms(patient)
+            )
+
+def timed(search, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = search(query)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, len(results)
+
+def benchmark(count, repeat, legacy):
+    """Time doctor patient searches before and after the search index"""
+
+    print("🔍 PATIENT SEARCH BENCHMARK")
+    print("=" * 50)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    media = tempfile.TemporaryDirectory()
+    settings.MEDIA_ROOT = media.name
+    try:
+        print(f"\n📥 Loading {count:,} patients...")
+        started = time.perf_counter()
+        populate(count)
+        print(f"   {time.perf_counter() - started:.1f}s, {PatientSearchTerm.objects.count():,} search terms")
+
+        middle = count // 2 // 100 * 100
+        sample = Patient.objects.get(patient_id=f"PT{middle:08X}")
+        queries = [
+            ('Patient ID prefix', f"PT{middle:08X}"[:8]),
+            ('Full patient ID', f"PT{middle:08X}"),
+            ('Email prefix', sample.email.split('@')[0] + '@'),
+            ('Email domain', '@example'),
+            ('Rare surname', sample.last_name),
+            ('Common name', 'Lakshmi'),
+            ('Name prefixes', 'lak iy'),
+        ]
+        print(f"\n📊 Median of {repeat} runs (ms); pages of {SEARCH_PAGE_SIZE}, count capped at {SEARCH_RESULTS_LIMIT}")
+        print(f"   {'Query':<20} {'Page 1':>10} {'Page 2':>7} {'1 + count':>12} {'Legacy':>14}")
+        for label, query in queries:
+            first_ms, first_count = timed(search_patients, query, repeat)
+            cursor = search_patients(query).next_cursor
+            next_ms, _ = timed(lambda query: search_patients(query, cursor=cursor), query, repeat)
+            count_ms, count = timed(lambda query: [None] * search_patients(query).count, query, repeat)
+            legacy_column = ''
+            if legacy:
+                legacy_ms, legacy_count = timed(legacy_search, query, max(1, repeat // 10))
+                legacy_column = f"{legacy_ms:>8.1f} ({legacy_count})"
+            print(f"   {label:<20} {first_ms:>6.2f} ({first_count:>2}) {next_ms:>7.2f} "
+                  f"{count_ms:>6.2f} ({count:>3}) {legacy_column}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark doctor patient search")
+    parser.add_argument('--patients', type=int, default=200000, help='Patients to load into the throwaway database')
+    parser.add_argument('--repeat', type=int, default=50, help='Runs per query')
+    parser.add_argument('--skip-legacy', action='store_true', help="Don't time the old icontains queries")
+    args = parser.parse_args()
+    benchmark(args.patients, args.repeat, not args.skip_legacy)
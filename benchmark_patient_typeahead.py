@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+import os
+import time
+import random
+import tempfile
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from doctors.models import Doctor
+from patients.models import Patient
+from patients.search import forget_suggestions
+
+from benchmark_patient_search import FIRST_NAMES, LAST_NAMES, populate
+
+def typed_queries(count, sessions):
+    """What the doctor has typed after each keystroke, for a mix of names, IDs and emails"""
+    for session in range(sessions):
+        i = random.randrange(count)
+        kind = session % 3
+        if kind == 0:
+            text = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}".lower()
+        elif kind == 1:
+            text = f"PT{i:08X}"
+        else:
+            text = Patient.objects.only('email').get(patient_id=f"PT{i:08X}").email.split('@')[0][:12]
+        yield [text[:end] for end in range(2, len(text) + 1)]
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))] * 1000
+
+def run(client, sessions, cold):
+    timings = []
+    for keystrokes in sessions:
+        for query in keystrokes:
+            if cold:
+                forget_suggestions()
+            started = time.perf_counter()
+            response = client.post('/doctor/search-patient/suggest/', {'q': query})
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+    timings.sort()
+    return timings
+
+def benchmark(count, sessions):
+    """Time typeahead requests keystroke by keystroke, with and without the suggestion cache"""
+
+    print("⌨️  PATIENT TYPEAHEAD BENCHMARK")
+    print("=" * 50)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    media = tempfile.TemporaryDirectory()
+    settings.MEDIA_ROOT = media.name
+    try:
+        print(f"\n📥 Loading {count:,} patients...")
+        populate(count)
+        doctor = Doctor.objects.create(
+            email='bench.doctor@example.com', username='benchdoctor', phone_number='7000000002',
+            nmc_registration_number='BENCH1', medical_license_number='BENCHLIC1',
+            hospital_name='General Hospital', hospital_address='Main Road', is_verified=True,
+        )
+        client = Client()
+        client.force_login(doctor, backend='authentication.DoctorBackend')
+
+        random.seed(0)
+        typed = list(typed_queries(count, sessions))
+        requests = sum(len(keystrokes) for keystrokes in typed)
+        print(f"\n📊 {sessions} doctors typing, {requests} requests through the full view (ms)")
+        print(f"   {'Cache':<28} {'p50':>7} {'p99':>7} {'max':>7}")
+        for label, cold in (('Cold (every keystroke)', True), ('On', False)):
+            forget_suggestions()
+            timings = run(client, typed, cold)
+            print(f"   {label:<28} {percentile(timings, 0.5):>7.2f} {percentile(timings, 0.99):>7.2f} "
+                  f"{timings[-1] * 1000:>7.2f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the doctor patient typeahead")
+    parser.add_argument('--patients', type=int, default=200000, help='Patients to load into the throwaway database')
+    parser.add_argument('--sessions', type=int, default=60, help='Queries to type out one keystroke at a time')
+    args = parser.parse_args()
+    benchmark(args.patients, args.sessions)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+import os
+import time
+import tempfile
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import setup_test_environment
+from patients.models import Patient, PatientSearchTerm
+from patients.phonetic import phonetic_key
+from patients.search import SEARCH_RESULTS_LIMIT, name_tokens, search_patients
+
+from benchmark_patient_search import populate, timed
+
+# Other spellings of names the loaded patients have
+QUERIES = [
+    ('Laxmi', 'Lakshmi'),
+    ('Mohammad', 'Mohammed'),
+    ('Subramanyam', 'Subramaniam'),
+    ('Wenkatesh', 'Venkatesh'),
+    ('Krishnamoorthy', 'Krishnamurthy'),
+    ('Chaterji', 'Chatterjee'),
+    ('लक्ष्मी', 'Lakshmi'),
+    ('Laxmi Aiyar', 'Lakshmi Iyer'),
+    ('Kavia Pilay', 'Kavya Pillai'),
+]
+
+def scan_search(query):
+    """Phonetic matching without the index: key every patient's name in Python"""
+    keys = {phonetic_key(token) for token in name_tokens(query)}
+    return [
+        pk for pk, first_name, last_name in Patient.objects.values_list('pk', 'first_name', 'last_name').iterator()
+        if keys <= {phonetic_key(token) for token in name_tokens(f"{first_name} {last_name}")}
+    ]
+
+def benchmark(count, repeat, scan):
+    """Time searches for other spellings of patient names through the name sound index"""
+
+    print("🗣️  PHONETIC NAME SEARCH BENCHMARK")
+    print("=" * 50)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    media = tempfile.TemporaryDirectory()
+    settings.MEDIA_ROOT = media.name
+    try:
+        print(f"\n📥 Loading {count:,} patients...")
+        started = time.perf_counter()
+        populate(count)
+        sounds = PatientSearchTerm.objects.filter(kind=PatientSearchTerm.PHONETIC).count()
+        print(f"   {time.perf_counter() - started:.1f}s, {PatientSearchTerm.objects.count():,} search terms "
+              f"({sounds:,} name sounds)")
+
+        print(f"\n📊 Median of {repeat} runs (ms); count capped at {SEARCH_RESULTS_LIMIT}")
+        print(f"   {'Query':<16} {'Finds':<14} {'Page 1':>10} {'1 + count':>12} {'Scan':>14}")
+        for query, finds in QUERIES:
+            first_ms, first_count = timed(search_patients, query, repeat)
+            count_ms, matched = timed(lambda query: [None] * search_patients(query).count, query, repeat)
+            scan_column = ''
+            if scan:
+                scan_ms, scan_count = timed(scan_search, query, 1)
+                scan_column = f"{scan_ms:>8.0f} ({scan_count})"
+            print(f"   {query:<16} {finds:<14} {first_ms:>6.2f} ({first_count:>2}) "
+                  f"{count_ms:>6.2f} ({matched:>3}) {scan_column}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark phonetic patient name search")
+    parser.add_argument('--patients', type=int, default=1000000, help='Patients to load into the throwaway database')
+    parser.add_argument('--repeat', type=int, default=50, help='Runs per query')
+    parser.add_argument('--skip-scan', action='store_true', help="Don't time matching names without the index")
+    args = parser.parse_args()
+    benchmark(args.patients, args.repeat, not args.skip_scan)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+import os
+import time
+import random
+import datetime
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from django.conf import settings
+from patients.models import Patient
+from patients.payload import decode_payload
+from patients.qr import _make_qr, render_qr_png
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Venkatesh', 'Lakshmi', 'Mohammed', 'Ananya', 'Subramaniam', 'Kavya']
+LAST_NAMES = ['Sharma', 'Reddy', 'Krishnamurthy', 'Iyer', 'Khan', 'Banerjee', 'Naidu', 'Patel']
+
+def sample_patients(count):
+    """Unsaved patients with realistic card details"""
+    patients = []
+    for i in range(count):
+        first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+        patients.append(Patient(
+            patient_id=f"PT{random.getrandbits(32):08X}",
+            first_name=first,
+            last_name=last,
+            email=f"{first.lower()}.{last.lower()}{i}@example.com",
+            phone_number=f"9{random.randrange(10 ** 9):09d}",
+            blood_group=random.choice([choice for choice, _ in Patient.BLOOD_GROUP_CHOICES]),
+            date_of_birth=datetime.date(1950, 1, 1) + datetime.timedelta(days=random.randrange(25000)),
+            emergency_contact_name=f"{random.choice(FIRST_NAMES)} {last}",
+            emergency_contact_phone=f"8{random.randrange(10 ** 9):09d}",
+        ))
+    return patients
+
+def measure(patients, payload_format):
+    """Return averages of payload length, QR version, modules, render ms and PNG bytes"""
+    settings.QR_PAYLOAD_FORMAT = payload_format
+    totals = [0, 0, 0, 0.0, 0]
+    for patient in patients:
+        payload = patient.get_qr_data()
+        qr = _make_qr(payload, 10)
+        started = time.perf_counter()
+        png = render_qr_png(payload)
+        elapsed = time.perf_counter() - started
+        for index, value in enumerate((len(payload), qr.version, qr.modules_count, elapsed * 1000, len(png))):
+            totals[index] += value
+    return [total / len(patients) for total in totals]
+
+def benchmark(count):
+    """Compare the readable text QR payload with the compact signed Base45 one"""
+
+    print("🔳 QR PAYLOAD BENCHMARK")
+    print("=" * 50)
+    print(f"\n{count} sample patients, box size 10, error correction L")
+
+    patients = sample_patients(count)
+    results = {}
+    for payload_format in ('text', 'compact'):
+        results[payload_format] = measure(patients, payload_format)
+        length, version, modules, render_ms, png_bytes = results[payload_format]
+        print(f"\n📊 {payload_format.title()} payload")
+        print(f"   Payload: {length:,.0f} characters")
+        print(f"   QR version: {version:.1f} ({modules:.0f} x {modules:.0f} modules)")
+        print(f"   Render: {render_ms:.2f} ms   PNG: {png_bytes / 1024:.1f} KB")
+
+    text, compact = results['text'], results['compact']
+    print("\n📉 Compact vs text")
+    print(f"   Modules: {1 - (compact[2] / text[2]) ** 2:.0%} fewer   Render: {1 - compact[3] / text[3]:.0%} faster   "
+          f"PNG: {1 - compact[4] / text[4]:.0%} smaller")
+
+    settings.QR_PAYLOAD_FORMAT = 'compact'
+    payloads = [patient.get_qr_data() for patient in patients]
+    started = time.perf_counter()
+    for payload in payloads:
+        decode_payload(payload)
+    elapsed = time.perf_counter() - started
+    print(f"\n🔓 Decode and verify: {elapsed / count * 1e6:.1f} µs per payload")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark QR payload size and render time")
+    parser.add_argument('--patients', type=int, default=200, help='Sample patients to encode')
+    args = parser.parse_args()
+    benchmark(args.patients)
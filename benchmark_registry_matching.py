@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+import os
+import time
+import random
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from patients.registry import DoctorRegistry
+
+COUNCILS = [
+    ('Andhra Pradesh Medical Council', 'APMC'),
+    ('Tamil Nadu Medical Council', 'TNMC'),
+    ('Karnataka Medical Council', 'KMC'),
+    ('Delhi Medical Council', 'DMC'),
+]
+
+def messy(number, prefix):
+    """Format a registration number the way it arrives from the form"""
+    return random.choice([
+        f'{prefix}/{number}',
+        f'00{number}',
+        f' {number[:3]} {number[3:]} ',
+        f'{prefix.lower()}-{number}',
+    ])
+
+def typo(number):
+    """Swap two adjacent digits or drop one"""
+    position = random.randrange(len(number) - 1)
+    if random.random() < 0.5:
+        return number[:position] + number[position + 1] + number[position] + number[position + 2:]
+    return number[:position] + number[position + 1:]
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+def benchmark(rows, queries):
+    """Time normalized exact lookups and ranked near-match suggestions"""
+
+    print("🔎 REGISTRATION NUMBER MATCHING BENCHMARK")
+    print("=" * 50)
+
+    numbers = random.sample(range(100000, 10000000), rows)
+    started = time.perf_counter()
+    registry = DoctorRegistry(
+        {'registration_number': str(number), 'state_medical_council': COUNCILS[i % len(COUNCILS)][0]}
+        for i, number in enumerate(numbers)
+    )
+    print(f"\n📊 Registry: {len(registry)} rows (build {time.perf_counter() - started:.2f}s)")
+
+    started = time.perf_counter()
+    registry.suggest('0')
+    print(f"   Near-match index build: {time.perf_counter() - started:.2f}s")
+
+    sample = [(str(number), COUNCILS[random.randrange(len(COUNCILS))][1]) for number in random.sample(numbers, queries)]
+
+    timings, hits = [], 0
+    for number, prefix in sample:
+        query = messy(number, prefix)
+        started = time.perf_counter()
+        doctor = registry.find(query)
+        timings.append(time.perf_counter() - started)
+        hits += doctor is not None and doctor.registration_number == number
+    p50, p99 = percentiles(timings)
+    print(f"\n🧹 Normalized lookups: {hits}/{queries} resolved")
+    print(f"   p50 {p50 * 1e6:,.1f} µs   p99 {p99 * 1e6:,.1f} µs")
+
+    timings, top_hits, any_hits = [], 0, 0
+    for number, _ in sample:
+        query = typo(number)
+        started = time.perf_counter()
+        suggestions = registry.suggest(query)
+        timings.append(time.perf_counter() - started)
+        found = [doctor.registration_number for doctor, _ in suggestions]
+        top_hits += bool(found) and found[0] == number
+        any_hits += number in found
+    p50, p99 = percentiles(timings)
+    print(f"\n✏️  Near-match suggestions: intended number ranked first {top_hits}/{queries}, in top 5 {any_hits}/{queries}")
+    print(f"   p50 {p50 * 1e6:,.1f} µs   p99 {p99 * 1e6:,.1f} µs")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark registration number matching")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic registry size')
+    parser.add_argument('--queries', type=int, default=10_000, help='Lookups to time')
+    args = parser.parse_args()
+    benchmark(args.rows, args.queries)
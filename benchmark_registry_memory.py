@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+import os
+import csv
+import gc
+import argparse
+import tempfile
+import tracemalloc
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from patients.registry import DoctorRegistry
+
+# Same columns as static/css/blacklisted_doctors_clean.csv
+FIELDS = [
+    'year_of_info', 'registration_number', 'state_medical_council', 'name',
+    'father_or_husband_name', 'qualification_1', 'qualification_1_year',
+    'university_name', 'qualification_2', 'qualification_2_year', 'email',
+    'date_of_birth', 'date_of_registration', 'age', 'experience_years',
+]
+
+COUNCILS = [
+    'Andhra Pradesh Medical Council',
+    'Tamil Nadu Medical Council',
+    'Karnataka Medical Council',
+    'Maharashtra Medical Council',
+    'Delhi Medical Council',
+]
+
+def write_csv(path, rows):
+    """Write a synthetic registry CSV"""
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        for i in range(rows):
+            writer.writerow([
+                2000 + i % 20, 10000 + i, COUNCILS[i % len(COUNCILS)], f'Doctor Name {i}',
+                f'Parent Name {i}', 'MBBS', 1990 + i % 30, 'SVIMS Tirupati', 'MS (Ortho)',
+                2010 + i % 10, f'doctor{i}@example.com', '29-04-1994', '10-02-2020',
+                30 + i % 40, i % 40,
+            ])
+
+def measure(load):
+    """Return (object, bytes allocated) for a loader"""
+    gc.collect()
+    tracemalloc.start()
+    loaded = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return loaded, current
+
+def load_dicts(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+def benchmark(rows):
+    """Compare list-of-dicts and compact registry memory footprints"""
+
+    print("🧠 DOCTOR REGISTRY MEMORY BENCHMARK")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'registry.csv')
+        write_csv(path, rows)
+
+        dicts, dict_bytes = measure(lambda: load_dicts(path))
+        del dicts
+        registry, registry_bytes = measure(lambda: DoctorRegistry.from_csv(path))
+
+    scale = 100_000 / rows
+    print(f"\n📊 Rows: {len(registry)} ({len(FIELDS)} columns)")
+    print(f"   csv.DictReader rows: {dict_bytes * scale / 1024 / 1024:,.1f} MB per 100k rows")
+    print(f"   DoctorRegistry:      {registry_bytes * scale / 1024 / 1024:,.1f} MB per 100k rows")
+    print(f"   Reduction:           {dict_bytes / registry_bytes:,.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark doctor registry memory footprint")
+    parser.add_argument('--rows', type=int, default=100_000, help='Synthetic registry size')
+    args = parser.parse_args()
+    benchmark(args.rows)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+import os
+import sys
+import csv
+import json
+import argparse
+import tempfile
+import subprocess
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from patients.registry import DoctorRegistry
+from patients.snapshot import write_snapshot
+
+FIELDS = [
+    'year_of_info', 'registration_number', 'state_medical_council', 'name',
+    'father_or_husband_name', 'qualification_1', 'qualification_1_year',
+    'university_name', 'email', 'date_of_birth', 'age', 'experience_years',
+]
+
+COUNCILS = [
+    'Andhra Pradesh Medical Council',
+    'Tamil Nadu Medical Council',
+    'Karnataka Medical Council',
+    'Maharashtra Medical Council',
+    'Delhi Medical Council',
+]
+
+# Runs in a fresh interpreter so load time and RSS are those of a cold worker
+LOAD_SCRIPT = """
+import json, random, sys, time
+sys.path.insert(0, sys.argv[1])
+from patients.registry import DoctorRegistry
+from patients.snapshot import RegistrySnapshot
+
+started = time.perf_counter()
+if sys.argv[2] == 'csv':
+    registry = DoctorRegistry.from_csv(sys.argv[3])
+else:
+    registry = RegistrySnapshot(sys.argv[3]).active_doctors
+load_seconds = time.perf_counter() - started
+
+for _ in range(10000):
+    registry.find(str(random.randrange(int(sys.argv[4]))))
+
+memory = {}
+with open('/proc/self/status') as status:
+    for line in status:
+        key, _, value = line.partition(':')
+        if key in ('VmRSS', 'RssAnon', 'RssFile'):
+            memory[key] = int(value.split()[0])
+print(json.dumps({'load_seconds': load_seconds, 'rows': len(registry), **memory}))
+"""
+
+def write_csv(path, rows):
+    """Write a synthetic registry CSV"""
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(FIELDS)
+        for i in range(rows):
+            writer.writerow([
+                2000 + i % 20, i, COUNCILS[i % len(COUNCILS)], f'Doctor Name {i}',
+                f'Parent Name {i}', 'MBBS', 1990 + i % 30, 'SVIMS Tirupati',
+                f'doctor{i}@example.com', '29-04-1994', 30 + i % 40, i % 40,
+            ])
+
+def cold_load(mode, path, rows):
+    result = subprocess.run(
+        [sys.executable, '-c', LOAD_SCRIPT, os.path.dirname(os.path.abspath(__file__)), mode, path, str(rows)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+def benchmark(rows):
+    """Compare cold-start load time and RSS of the CSV and snapshot formats"""
+
+    print("📦 DOCTOR REGISTRY SNAPSHOT BENCHMARK")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'active_doctors_clean.csv')
+        snapshot_path = os.path.join(directory, 'doctor_registry.snap')
+        write_csv(csv_path, rows)
+        write_snapshot(snapshot_path, DoctorRegistry.from_csv(csv_path), DoctorRegistry())
+
+        print(f"\n📊 Rows: {rows}")
+        print(f"   CSV size:      {os.path.getsize(csv_path) / 1024 / 1024:,.1f} MB")
+        print(f"   Snapshot size: {os.path.getsize(snapshot_path) / 1024 / 1024:,.1f} MB")
+
+        for label, mode, path in (('CSV', 'csv', csv_path), ('Snapshot', 'snapshot', snapshot_path)):
+            result = cold_load(mode, path, rows)
+            print(f"\n⏱️  {label}")
+            print(f"   Cold load:        {result['load_seconds'] * 1000:,.1f} ms")
+            print(f"   RSS:              {result['VmRSS'] / 1024:,.1f} MB")
+            print(f"   Private (anon):   {result['RssAnon'] / 1024:,.1f} MB")
+            print(f"   Shared (file):    {result['RssFile'] / 1024:,.1f} MB")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark doctor registry snapshot loading")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic registry size')
+    args = parser.parse_args()
+    benchmark(args.rows)
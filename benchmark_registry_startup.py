@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+import os
+import sys
+import time
+import subprocess
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from patients.utils import DoctorValidationService
+
+CHECK_SCRIPT = """
+import os, django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+from django.core.management import call_command
+call_command('check', verbosity=0)
+from patients.utils import doctor_validator
+print(doctor_validator.is_loaded)
+"""
+
+def time_check():
+    """Run `manage.py check` in a fresh interpreter; return (seconds, registry loaded)"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHECK_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    return time.perf_counter() - started, result.stdout.strip() == 'True'
+
+def time_first_call(service):
+    started = time.perf_counter()
+    service.validate_doctor('12345', 'Andhra Pradesh Medical Council')
+    return time.perf_counter() - started
+
+def benchmark():
+    """Measure what the doctor registry costs at startup and on the first request"""
+
+    print("🚀 DOCTOR REGISTRY STARTUP BENCHMARK")
+    print("=" * 50)
+
+    check_seconds, loaded = time_check()
+    print(f"\n🔧 manage.py check: {check_seconds * 1000:,.0f} ms (registry loaded: {loaded})")
+
+    # The parse that every process used to pay at import time
+    cold = DoctorValidationService()
+    cold_first_call = time_first_call(cold)
+    print(f"\n📂 Registry load: {cold.load_seconds * 1000:,.1f} ms")
+    print(f"   First validation, cold registry: {cold_first_call * 1000:,.1f} ms")
+
+    warm = DoctorValidationService()
+    warm.warm_up().join()
+    print(f"   First validation, after warm_up(): {time_first_call(warm) * 1000:,.3f} ms")
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+import os
+import time
+import tempfile
+import argparse
+import django
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment
+
+from patients.models import Patient
+from doctors.models import Doctor
+
+USER_TABLES = ('FROM "patients_patient"', 'FROM "doctors_doctor"')
+
+CACHED_USERS = override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'session_users': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'session-users'},
+    },
+    SESSION_USER_CACHE='session_users',
+)
+
+PAGES = [
+    ('Patient dashboard', 'patient', '/dashboard/'),
+    ('Patient profile', 'patient', '/profile/'),
+    ('Doctor dashboard', 'doctor', '/doctor/dashboard/'),
+    ('Doctor patient search', 'doctor', '/doctor/search-patient/'),
+]
+
+def create_users():
+    """Create one patient and one verified doctor in the throwaway test database"""
+    patient = Patient.objects.create_user(
+        'bench.patient@example.com', 'bench-pass', first_name='Bench', last_name='Patient', phone_number='7000000001'
+    )
+    doctor = Doctor.objects.create(
+        email='bench.doctor@example.com', username='benchdoctor', phone_number='7000000002',
+        nmc_registration_number='BENCH1', medical_license_number='BENCHLIC1',
+        hospital_name='General Hospital', hospital_address='Main Road', is_verified=True,
+    )
+    return {'patient': patient, 'doctor': doctor}
+
+def measure(client, url, requests):
+    """Return (queries per request, user queries per request, ms per request)"""
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    queries = context.captured_queries
+    user_queries = [query for query in queries if any(table in query['sql'] for table in USER_TABLES)]
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    elapsed = time.perf_counter() - started
+    return len(queries), len(user_queries), elapsed / requests * 1000
+
+def benchmark(requests):
+    """Count the queries each authenticated page runs, before and after recording the user kind and caching users"""
+
+    print("🔐 SESSION USER RESOLUTION BENCHMARK")
+    print("=" * 50)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    media = tempfile.TemporaryDirectory()
+    settings.MEDIA_ROOT = media.name
+    settings.QR_CODE_WORKERS = 0
+    try:
+        users = create_users()
+        for label, backend, cached in (
+            ('Before (CustomAuthBackend: Patient, then Doctor)', 'authentication.CustomAuthBackend', False),
+            ('After (backend for the user kind)', None, False),
+            ('After, with SESSION_USER_CACHE', None, True),
+        ):
+            print(f"\n📊 {label}")
+            if cached:
+                CACHED_USERS.enable()
+            for page, kind, url in PAGES:
+                client = Client()
+                client.force_login(users[kind], backend=backend or f'authentication.{kind.title()}Backend')
+                if cached:
+                    client.get(url)
+                queries, user_queries, milliseconds = measure(client, url, requests)
+                print(f"   {page:<24} {queries} queries ({user_queries} for the user)   {milliseconds:.2f} ms/request")
+            if cached:
+                CACHED_USERS.disable()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark queries per authenticated request")
+    parser.add_argument('--requests', type=int, default=200, help='Requests to time per page')
+    args = parser.parse_args()
+    benchmark(args.requests)
@@ -1,11 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Doctor, AccessLog
+from .models import Doctor, AccessLog, RegistryDoctor
 
 @admin.register(Doctor)
 class DoctorAdmin(UserAdmin):
-    list_display = ('doctor_id', 'email', 'first_name', 'last_name', 'specialization', 'is_verified', 'created_at')
-    list_filter = ('specialization', 'is_verified', 'created_at')
+    list_display = ('doctor_id', 'email', 'first_name', 'last_name', 'specialization', 'is_verified', 'registry_status', 'created_at')
+    list_filter = ('specialization', 'is_verified', 'registry_status', 'created_at')
     search_fields = ('doctor_id', 'email', 'first_name', 'last_name', 'nmc_registration_number', 'hospital_name')
     ordering = ('-created_at',)
     
@@ -14,7 +14,7 @@ class DoctorAdmin(UserAdmin):
         ('Personal info', {'fields': ('first_name', 'last_name', 'phone_number')}),
         ('Professional Information', {'fields': ('nmc_registration_number', 'medical_license_number', 'specialization', 'years_of_experience')}),
         ('Hospital Information', {'fields': ('hospital_name', 'hospital_address')}),
-        ('Verification', {'fields': ('is_verified', 'verification_date')}),
+        ('Verification', {'fields': ('is_verified', 'verification_date', 'registry_status')}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Important dates', {'fields': ('last_login', 'date_joined', 'created_at', 'updated_at')}),
     )
@@ -43,3 +43,10 @@ class AccessLogAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('accessed_at',)
+
+@admin.register(RegistryDoctor)
+class RegistryDoctorAdmin(admin.ModelAdmin):
+    list_display = ('registration_number', 'name', 'state_medical_council', 'qualification_1', 'list_type')
+    list_filter = ('list_type', 'state_medical_council')
+    search_fields = ('registration_number', 'name')
+    ordering = ('list_type', 'row_number')
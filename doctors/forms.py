@@ -1,8 +1,11 @@
 from django import forms
+from django.urls import reverse_lazy
 from django.contrib.auth.forms import UserCreationForm
+from patients.forms import IdentityEmailMixin
+from patients.payload import decode_payload, is_compact_payload
 from .models import Doctor
 
-class DoctorRegistrationForm(UserCreationForm):
+class DoctorRegistrationForm(IdentityEmailMixin, UserCreationForm):
     email = forms.EmailField(
         required=True,
         widget=forms.EmailInput(attrs={'class': 'form-control'})
@@ -66,6 +69,8 @@ class DoctorRegistrationForm(UserCreationForm):
         widget=forms.Select(attrs={'class': 'form-select'})
     )
     
+    identity_kind = 'DOCTOR'
+    
     class Meta:
         model = Doctor
         fields = (
@@ -92,7 +97,13 @@ class DoctorRegistrationForm(UserCreationForm):
         return user
 
 class EmergencyAccessForm(forms.Form):
-    patient_id = forms.CharField(max_length=20, required=True, help_text="Enter patient's unique ID")
+    patient_id = forms.CharField(
+        max_length=500, required=True, help_text="Enter patient's unique ID or scan their card",
+        widget=forms.TextInput(attrs={
+            'data-suggest-url': reverse_lazy('doctors:patient_suggestions'),
+            'data-suggest-fill': 'patient_id',
+        }),
+    )
     access_reason = forms.CharField(widget=forms.Textarea, required=True, help_text="Describe the emergency situation")
     registration_number = forms.CharField(max_length=50, required=True, help_text="Enter your NMC registration number")
     state_medical_council = forms.ChoiceField(choices=[
@@ -107,3 +118,13 @@ class EmergencyAccessForm(forms.Form):
         ('Rajasthan Medical Council', 'Rajasthan Medical Council'),
         ('Other', 'Other'),
     ], required=True, help_text="Select your state medical council")
+    
+    def clean_patient_id(self):
+        """Accept a scanned card: the patient ID is read from its signed payload"""
+        patient_id = self.cleaned_data['patient_id'].strip()
+        if is_compact_payload(patient_id):
+            try:
+                return decode_payload(patient_id)['patient_id']
+            except ValueError:
+                raise forms.ValidationError("This card's QR code could not be verified.")
+        return patient_id
@@ -0,0 +1,68 @@
+import csv
+import os
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from doctors.models import RegistryDoctor
+from patients.registry import normalize_registration_number
+from patients.utils import DATASET_FILENAMES, doctor_validator
+
+COLUMNS = ('registration_number', 'state_medical_council', 'name', 'qualification_1')
+
+class Command(BaseCommand):
+    help = 'Import the active and blacklisted doctor CSVs into the RegistryDoctor table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--active', type=str, help='Active doctors CSV (defaults to the configured dataset)')
+        parser.add_argument('--blacklisted', type=str, help='Blacklisted doctors CSV (defaults to the configured dataset)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per bulk_create')
+
+    def handle(self, *args, **options):
+        default_paths = dict(zip(DATASET_FILENAMES, doctor_validator.dataset_paths()))
+        sources = (
+            ('ACTIVE', options.get('active') or default_paths['active_doctors_clean.csv']),
+            ('BLACKLISTED', options.get('blacklisted') or default_paths['blacklisted_doctors_clean.csv']),
+        )
+        for _, file_path in sources:
+            if not os.path.exists(file_path):
+                raise CommandError(f'{file_path} does not exist.')
+
+        for list_type, file_path in sources:
+            started = time.perf_counter()
+            # Replace the whole list in one transaction so lookups never see a partial import
+            with transaction.atomic():
+                RegistryDoctor.objects.filter(list_type=list_type).delete()
+                imported = self.import_file(list_type, file_path, options['batch_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                self.style.SUCCESS(f'Imported {imported} {list_type.lower()} doctors from {file_path} in {elapsed:.2f}s')
+            )
+
+    def import_file(self, list_type, file_path, batch_size):
+        """Stream a CSV into the table in batches; return the number of rows read"""
+        imported = 0
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            while True:
+                chunk = list(islice(reader, batch_size))
+                if not chunk:
+                    break
+                doctors = []
+                for row in chunk:
+                    imported += 1
+                    if not row.get('registration_number'):
+                        continue
+                    normalized = normalize_registration_number(row['registration_number'])
+                    doctors.append(RegistryDoctor(
+                        list_type=list_type,
+                        row_number=imported,
+                        normalized_registration_number=normalized,
+                        reversed_registration_number=normalized[::-1],
+                        details={key: value for key, value in row.items() if key not in COLUMNS and key},
+                        **{column: row.get(column) or '' for column in COLUMNS}
+                    ))
+                # Duplicate (number, council) rows keep the first one, like the in-memory registry
+                RegistryDoctor.objects.bulk_create(doctors, ignore_conflicts=True)
+                self.stdout.write(f'  {list_type.lower()}: {imported} rows read')
+        return imported
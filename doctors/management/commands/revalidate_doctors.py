@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from doctors.models import Doctor
+from patients.batches import keyset_batches
+from patients.user_cache import forget_users
+from patients.utils import doctor_validator
+
+class Command(BaseCommand):
+    help = 'Re-validate every doctor against the current doctor registry'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Doctors read and updated per batch')
+        parser.add_argument('--revoke-blacklisted', action='store_true', help='Also mark blacklisted doctors as unverified')
+        parser.add_argument('--dry-run', action='store_true', help='Report status changes without saving them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        doctor_validator.ensure_loaded()
+
+        doctors = Doctor.objects.values_list(
+            'pk', 'nmc_registration_number', 'state_medical_council', 'registry_status'
+        )
+
+        checked = 0
+        totals = {}
+        for batch in keyset_batches(doctors, batch_size):
+            # Group the changed doctors by new status: one UPDATE per status per batch
+            changes = {}
+            results = doctor_validator.validate_many((number, council) for _, number, council, _ in batch)
+            for (pk, number, _, old_status), result in zip(batch, results):
+                if result['status'] != old_status:
+                    changes.setdefault(result['status'], []).append(pk)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{number}: {old_status} -> {result["status"]}')
+
+            if not options['dry_run']:
+                with transaction.atomic():
+                    for status, pks in changes.items():
+                        updates = {'registry_status': status}
+                        if status == 'BLACKLISTED' and options['revoke_blacklisted']:
+                            updates['is_verified'] = False
+                        Doctor.objects.filter(pk__in=pks).update(**updates)
+                        forget_users(Doctor, pks)
+
+            checked += len(batch)
+            for status, pks in changes.items():
+                totals[status] = totals.get(status, 0) + len(pks)
+            self.stdout.write(f'Checked {checked} doctors ({sum(totals.values())} changed)')
+
+        elapsed = time.perf_counter() - started
+        for status, count in sorted(totals.items()):
+            self.stdout.write(f'  -> {status}: {count}')
+        rate = checked / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(f'Re-validated {checked} doctors in {elapsed:.2f}s ({rate:,.0f} doctors/sec)')
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0006_alter_doctor_managers_alter_doctor_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='registry_status',
+            field=models.CharField(choices=[('AUTHORIZED', 'Authorized'), ('BLACKLISTED', 'Blacklisted'), ('NOT_FOUND', 'Not Found'), ('PENDING', 'Pending Verification')], default='PENDING', help_text='Result of the last validation against the doctor registry', max_length=20),
+        ),
+    ]
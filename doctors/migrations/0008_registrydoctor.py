@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0007_doctor_registry_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryDoctor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('list_type', models.CharField(choices=[('ACTIVE', 'Active'), ('BLACKLISTED', 'Blacklisted')], max_length=20)),
+                ('row_number', models.PositiveIntegerField(help_text='Position of the row in its source file')),
+                ('registration_number', models.CharField(max_length=50)),
+                ('state_medical_council', models.CharField(blank=True, max_length=100)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('qualification_1', models.CharField(blank=True, max_length=100)),
+                ('details', models.JSONField(blank=True, default=dict, help_text='Remaining columns of the source row')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['list_type', 'state_medical_council'], name='registry_council_idx'), models.Index(fields=['list_type', 'qualification_1'], name='registry_qualification_idx')],
+                'constraints': [models.UniqueConstraint(fields=('list_type', 'registration_number', 'state_medical_council'), name='unique_registry_doctor')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:16
+
+import re
+
+from django.db import migrations, models
+
+
+# patients.registry.normalize_registration_number as of this migration
+_SEPARATORS = re.compile(r'[^0-9A-Z]')
+_COUNCIL_PREFIX = re.compile(r'^(?:APMC|TNMC|UPMC|WBMC|KMC|MMC|DMC|GMC|RMC|NMC|MCI)(?=\d)')
+
+
+def _normalize(value):
+    normalized = _COUNCIL_PREFIX.sub('', _SEPARATORS.sub('', (value or '').upper()))
+    if normalized.isdigit():
+        normalized = normalized.lstrip('0') or '0'
+    return normalized
+
+
+def normalize_registry(apps, schema_editor, batch_size=5000):
+    RegistryDoctor = apps.get_model('doctors', 'RegistryDoctor')
+    rows = RegistryDoctor.objects.order_by('pk').only('registration_number')
+    last_pk = None
+    while True:
+        # Keyset pagination: one batch of rows in memory at a time
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for row in batch:
+            row.normalized_registration_number = _normalize(row.registration_number)
+        RegistryDoctor.objects.bulk_update(batch, ['normalized_registration_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0008_registrydoctor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrydoctor',
+            name='normalized_registration_number',
+            field=models.CharField(blank=True, help_text='Registration number in canonical form, for format-tolerant lookups', max_length=50),
+        ),
+        migrations.RunPython(normalize_registry, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='registrydoctor',
+            index=models.Index(fields=['list_type', 'normalized_registration_number'], name='registry_normalized_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0009_registrydoctor_normalized_registration_number'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['-accessed_at'], name='access_log_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['doctor', '-accessed_at'], name='access_log_doctor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['doctor', 'patient', '-accessed_at'], name='access_log_doctor_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['patient', '-accessed_at'], name='access_log_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(condition=models.Q(('access_type', 'EMERGENCY')), fields=['-accessed_at'], name='access_log_emergency_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accesslog',
+            index=models.Index(fields=['validation_status', '-accessed_at'], name='access_log_status_idx'),
+        ),
+        # After the indexes leading with doctor and patient, so the foreign keys stay indexed
+        migrations.AlterField(
+            model_name='accesslog',
+            name='doctor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='access_logs', to='doctors.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='accesslog',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='doctor_access_logs', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
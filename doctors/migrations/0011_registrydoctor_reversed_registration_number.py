@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+def reverse_registry(apps, schema_editor, batch_size=5000):
+    RegistryDoctor = apps.get_model('doctors', 'RegistryDoctor')
+    rows = RegistryDoctor.objects.order_by('pk').only('normalized_registration_number')
+    last_pk = None
+    while True:
+        # Keyset pagination: one batch of rows in memory at a time
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for row in batch:
+            row.reversed_registration_number = row.normalized_registration_number[::-1]
+        RegistryDoctor.objects.bulk_update(batch, ['reversed_registration_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0010_accesslog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrydoctor',
+            name='reversed_registration_number',
+            field=models.CharField(blank=True, help_text='Canonical registration number reversed, for suffix lookups', max_length=50),
+        ),
+        migrations.RunPython(reverse_registry, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='registrydoctor',
+            index=models.Index(fields=['list_type', 'reversed_registration_number'], name='registry_reversed_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from patients.models import Patient
+from patients.models import Patient, UserIdentity
+from patients.user_cache import forget_users
 import uuid
 
 class DoctorManager(BaseUserManager):
@@ -55,6 +56,13 @@ class Doctor(AbstractUser):
         ('OTHER', 'Other'),
     ]
     
+    REGISTRY_STATUSES = [
+        ('AUTHORIZED', 'Authorized'),
+        ('BLACKLISTED', 'Blacklisted'),
+        ('NOT_FOUND', 'Not Found'),
+        ('PENDING', 'Pending Verification'),
+    ]
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     doctor_id = models.CharField(max_length=20, unique=True, editable=False)
     username = models.CharField(max_length=150, unique=True, blank=True, null=True)  # Make username optional
@@ -71,6 +79,7 @@ class Doctor(AbstractUser):
     state_medical_council = models.CharField(max_length=100, default='Andhra Pradesh Medical Council')
     is_verified = models.BooleanField(default=False)
     verification_date = models.DateTimeField(null=True, blank=True)
+    registry_status = models.CharField(max_length=20, choices=REGISTRY_STATUSES, default='PENDING', help_text="Result of the last validation against the doctor registry")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -98,6 +107,15 @@ class Doctor(AbstractUser):
         if not self.doctor_id:
             self.doctor_id = f"DR{str(uuid.uuid4())[:8].upper()}"
         super().save(*args, **kwargs)
+        forget_users(Doctor, [self.pk])
+        UserIdentity.record(self, kwargs.get('update_fields'))
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        forget_users(Doctor, [user_id])
+        UserIdentity.forget(Doctor, user_id)
+        return result
     
     def __str__(self):
         return f"Dr. {self.first_name} {self.last_name} ({self.doctor_id})"
@@ -117,8 +135,9 @@ class AccessLog(models.Model):
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='access_logs')
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='doctor_access_logs')
+    # Indexed through access_log_doctor_idx and access_log_patient_idx, which lead with them
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='access_logs', db_index=False)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='doctor_access_logs', db_index=False)
     access_type = models.CharField(max_length=20, choices=ACCESS_TYPES, default='EMERGENCY')
     access_reason = models.TextField()
     accessed_at = models.DateTimeField(auto_now_add=True)
@@ -131,6 +150,67 @@ class AccessLog(models.Model):
     
     class Meta:
         ordering = ('-accessed_at',)
+        indexes = [
+            # Newest first, for the admin dashboard and log list
+            models.Index(fields=['-accessed_at'], name='access_log_recent_idx'),
+            # A doctor's dashboard, profile and log page
+            models.Index(fields=['doctor', '-accessed_at'], name='access_log_doctor_idx'),
+            # One doctor's accesses of one patient, when they open the patient's records
+            models.Index(fields=['doctor', 'patient', '-accessed_at'], name='access_log_doctor_patient_idx'),
+            models.Index(fields=['patient', '-accessed_at'], name='access_log_patient_idx'),
+            # The admin log page's counts. Only emergency accesses: a whole
+            # access_type index could be picked over the ones above (SQLite keeps
+            # no statistics unless ANALYZE runs), though it narrows far less
+            models.Index(
+                fields=['-accessed_at'], condition=models.Q(access_type='EMERGENCY'), name='access_log_emergency_idx'
+            ),
+            models.Index(fields=['validation_status', '-accessed_at'], name='access_log_status_idx'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.doctor.first_name} {self.doctor.last_name} accessed {self.patient.first_name} {self.patient.last_name} - {self.accessed_at}"
+
+class RegistryDoctor(models.Model):
+    """A row of the active or blacklisted doctor registry datasets"""
+    
+    LIST_TYPES = [
+        ('ACTIVE', 'Active'),
+        ('BLACKLISTED', 'Blacklisted'),
+    ]
+    
+    list_type = models.CharField(max_length=20, choices=LIST_TYPES)
+    row_number = models.PositiveIntegerField(help_text="Position of the row in its source file")
+    registration_number = models.CharField(max_length=50)
+    normalized_registration_number = models.CharField(max_length=50, blank=True, help_text="Registration number in canonical form, for format-tolerant lookups")
+    reversed_registration_number = models.CharField(max_length=50, blank=True, help_text="Canonical registration number reversed, for suffix lookups")
+    state_medical_council = models.CharField(max_length=100, blank=True)
+    name = models.CharField(max_length=200, blank=True)
+    qualification_1 = models.CharField(max_length=100, blank=True)
+    details = models.JSONField(default=dict, blank=True, help_text="Remaining columns of the source row")
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['list_type', 'registration_number', 'state_medical_council'],
+                name='unique_registry_doctor',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['list_type', 'normalized_registration_number'], name='registry_normalized_idx'),
+            models.Index(fields=['list_type', 'reversed_registration_number'], name='registry_reversed_idx'),
+            models.Index(fields=['list_type', 'state_medical_council'], name='registry_council_idx'),
+            models.Index(fields=['list_type', 'qualification_1'], name='registry_qualification_idx'),
+        ]
+    
+    def as_record(self):
+        """Return the row as a dict with the same keys as the source CSV"""
+        return {
+            **self.details,
+            'registration_number': self.registration_number,
+            'state_medical_council': self.state_medical_council,
+            'name': self.name,
+            'qualification_1': self.qualification_1,
+        }
+    
+    def __str__(self):
+        return f"{self.registration_number} ({self.state_medical_council}) - {self.get_list_type_display()}"
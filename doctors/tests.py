@@ -1,3 +1,517 @@
-from django.test import TestCase
+import os
+import re
+import shutil
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import BACKEND_SESSION_KEY, authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from patients.registry import DoctorRegistry, normalize_registration_number
+from patients.utils import DoctorValidationService
+from authentication import DoctorBackend
+from patients.forms import PatientRegistrationForm
+from patients.models import Patient, UserIdentity
+from patients.search import suggest_patients
+from .forms import EmergencyAccessForm
+from .models import AccessLog, Doctor, RegistryDoctor
+
+
+def make_doctor(number, **extra_fields):
+    return Doctor.objects.create(
+        email=f'doctor{number}@example.com',
+        username=f'doctor{number}',
+        phone_number=f'90000{number}',
+        nmc_registration_number=str(number),
+        medical_license_number=f'LIC{number}',
+        hospital_name='General Hospital',
+        hospital_address='Main Road',
+        state_medical_council='Delhi Medical Council',
+        **extra_fields
+    )
+
+
+def use_temporary_media(test):
+    """
+    Keep any images these tests store out of MEDIA_ROOT: QR codes, which
+    Patient.save() writes (inline here) when QR_CODE_STORE_IMAGES is set, and
+    composed smart cards
+    """
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    media = override_settings(MEDIA_ROOT=media_root, QR_CODE_WORKERS=0)
+    media.enable()
+    test.addCleanup(media.disable)
+
+
+class RevalidateDoctorsCommandTests(TestCase):
+    def setUp(self):
+        validator = DoctorValidationService(
+            DoctorRegistry([{'registration_number': '100', 'state_medical_council': 'Delhi Medical Council'}]),
+            DoctorRegistry([{'registration_number': '900', 'state_medical_council': 'Delhi Medical Council'}]),
+        )
+        patcher = mock.patch('doctors.management.commands.revalidate_doctors.doctor_validator', validator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_updates_changed_statuses(self):
+        authorized = make_doctor(100)
+        blacklisted = make_doctor(900, is_verified=True)
+        unknown = make_doctor(500, registry_status='NOT_FOUND')
+
+        call_command('revalidate_doctors', '--batch-size=2', '--revoke-blacklisted', stdout=StringIO())
+
+        authorized.refresh_from_db()
+        blacklisted.refresh_from_db()
+        unknown.refresh_from_db()
+        self.assertEqual(authorized.registry_status, 'AUTHORIZED')
+        self.assertEqual(blacklisted.registry_status, 'BLACKLISTED')
+        self.assertFalse(blacklisted.is_verified)
+        self.assertEqual(unknown.registry_status, 'NOT_FOUND')
+
+    def test_dry_run_saves_nothing(self):
+        doctor = make_doctor(900)
+        call_command('revalidate_doctors', '--dry-run', stdout=StringIO())
+        doctor.refresh_from_db()
+        self.assertEqual(doctor.registry_status, 'PENDING')
+
+
+class ImportDoctorRegistryCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.active_path = os.path.join(directory, 'active.csv')
+        self.blacklisted_path = os.path.join(directory, 'blacklisted.csv')
+        with open(self.active_path, 'w', encoding='utf-8') as file:
+            file.write(
+                'registration_number,state_medical_council,name,qualification_1,university_name\n'
+                '100,Delhi Medical Council,A,MBBS,AIIMS\n'
+                '100,Delhi Medical Council,Duplicate,MBBS,AIIMS\n'
+                '100,Karnataka Medical Council,B,MD,KMC\n'
+            )
+        with open(self.blacklisted_path, 'w', encoding='utf-8') as file:
+            file.write('registration_number,state_medical_council,name\n900,Delhi Medical Council,C\n')
+
+    def import_registry(self):
+        call_command(
+            'import_doctor_registry', f'--active={self.active_path}', f'--blacklisted={self.blacklisted_path}',
+            '--batch-size=2', stdout=StringIO(),
+        )
+
+    def test_import_keeps_first_duplicate_and_replaces_on_rerun(self):
+        self.import_registry()
+        self.import_registry()
+        self.assertEqual(RegistryDoctor.objects.filter(list_type='ACTIVE').count(), 2)
+        self.assertEqual(RegistryDoctor.objects.filter(list_type='BLACKLISTED').count(), 1)
+        doctor = RegistryDoctor.objects.get(registration_number='100', state_medical_council='Delhi Medical Council')
+        self.assertEqual(doctor.as_record()['university_name'], 'AIIMS')
+        self.assertEqual(doctor.name, 'A')
+
+    @override_settings(DOCTOR_REGISTRY_SOURCE='database')
+    def test_database_validator(self):
+        self.import_registry()
+        service = DoctorValidationService()
+        self.assertEqual(service.validate_doctor('100', 'Karnataka Medical Council')['doctor']['name'], 'B')
+        self.assertEqual(service.validate_doctor('100', 'Other')['doctor']['name'], 'A')
+        self.assertEqual(service.validate_doctor('900')['status'], 'BLACKLISTED')
+        self.assertEqual(service.validate_doctor('500')['status'], 'NOT_FOUND')
+        self.assertEqual(service.validate_doctor('DMC/0900')['status'], 'BLACKLISTED')
+        self.assertEqual(service.suggest_doctors('901')[0]['doctor']['name'], 'C')
+
+        statistics = service.get_statistics()
+        self.assertEqual(statistics['total_active_doctors'], 2)
+        self.assertEqual(statistics['total_blacklisted_doctors'], 1)
+        self.assertCountEqual(statistics['state_councils_active'], ['Delhi Medical Council', 'Karnataka Medical Council'])
+        self.assertCountEqual(statistics['qualifications_active'], ['MBBS', 'MD'])
+
+    @override_settings(DOCTOR_REGISTRY_SOURCE='database', DOCTOR_REGISTRY_CHECK_INTERVAL=None)
+    def test_database_statistics_cached_until_reload_when_checks_are_disabled(self):
+        self.import_registry()
+        service = DoctorValidationService()
+        statistics = service.get_statistics()
+        with self.assertNumQueries(0):
+            self.assertIs(service.get_statistics(), statistics)
+
+    @override_settings(DOCTOR_REGISTRY_SOURCE='database')
+    def test_database_exact_number_outranks_canonical_match(self):
+        RegistryDoctor.objects.create(
+            list_type='ACTIVE', row_number=10, registration_number='APMC12345', normalized_registration_number='12345',
+            state_medical_council='Andhra Pradesh Medical Council', name='D',
+        )
+        RegistryDoctor.objects.create(
+            list_type='BLACKLISTED', row_number=10, registration_number='12345', normalized_registration_number='12345',
+            state_medical_council='Maharashtra Medical Council', name='E',
+        )
+        service = DoctorValidationService()
+        self.assertEqual(service.validate_doctor('APMC12345', 'Andhra Pradesh Medical Council')['status'], 'AUTHORIZED')
+        self.assertEqual(service.validate_doctor('APMC/012345', 'Andhra Pradesh Medical Council')['status'], 'AUTHORIZED')
+        self.assertEqual(service.validate_doctor('012345', 'Karnataka Medical Council')['status'], 'NOT_FOUND')
+        self.assertEqual(service.validate_doctor('MMC 012345', 'Maharashtra Medical Council')['status'], 'BLACKLISTED')
+
+    def test_normalize_migration_fills_existing_rows(self):
+        numbers = ['APMC/012345', 'mmc 00', 'TN-4521', '100']
+        for row_number, number in enumerate(numbers, start=1):
+            RegistryDoctor.objects.create(list_type='ACTIVE', row_number=row_number, registration_number=number)
+        migration = import_module('doctors.migrations.0009_registrydoctor_normalized_registration_number')
+        migration.normalize_registry(django_apps, None, batch_size=3)
+        self.assertEqual(
+            dict(RegistryDoctor.objects.values_list('registration_number', 'normalized_registration_number')),
+            {number: normalize_registration_number(number) for number in numbers},
+        )
+
+    def test_reverse_migration_fills_existing_rows(self):
+        self.import_registry()
+        RegistryDoctor.objects.update(reversed_registration_number='')
+        migration = import_module('doctors.migrations.0011_registrydoctor_reversed_registration_number')
+        migration.reverse_registry(django_apps, None, batch_size=2)
+        self.assertEqual(
+            set(RegistryDoctor.objects.values_list('normalized_registration_number', 'reversed_registration_number')),
+            {('100', '001'), ('900', '009')},
+        )
+
+    @override_settings(DOCTOR_REGISTRY_SOURCE='database')
+    def test_database_suggestions_use_indexes(self):
+        self.import_registry()
+        service = DoctorValidationService()
+        with CaptureQueriesContext(connection) as queries:
+            # A typo in the first digit is found through the reversed number
+            suggestions = service.suggest_doctors('800')
+        self.assertIn(('C', 1), [(suggestion['doctor']['name'], suggestion['distance']) for suggestion in suggestions])
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            for query in queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+                self.assertRegex(plan, r'SEARCH \S+ USING INDEX registry_(normalized|reversed)_idx', query['sql'])
+
+
+class SessionUserTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.doctor = make_doctor(100, is_verified=True)
+        self.doctor.set_password('secret-pass')
+        self.doctor.save()
+        self.patient = Patient.objects.create_user(
+            'patient@example.com', 'secret-pass', first_name='P', last_name='Q', phone_number='80000'
+        )
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "doctors_doctor"' in query['sql'] or 'FROM "patients_patient"' in query['sql']
+        ]
+
+    def test_doctor_login_records_kind(self):
+        self.client.post('/doctor/login/', {'email': 'doctor100@example.com', 'password': 'secret-pass'})
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'authentication.DoctorBackend')
+        queries = self.user_queries('/doctor/dashboard/')
+        self.assertEqual(len(queries), 1)
+        self.assertIn('doctors_doctor', queries[0])
+
+    def test_patient_login_records_kind(self):
+        self.client.post('/login/', {'email': 'patient@example.com', 'password': 'secret-pass'})
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'authentication.PatientBackend')
+        self.assertEqual(len(self.user_queries('/dashboard/')), 1)
+
+    def test_sessions_without_kind_still_resolve(self):
+        self.client.force_login(self.doctor, backend='authentication.CustomAuthBackend')
+        self.assertEqual(len(self.user_queries('/doctor/dashboard/')), 2)
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'session_users': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'session-users-tests'},
+    },
+    SESSION_USER_CACHE='session_users',
+)
+class CachedSessionUserTests(SessionUserTests):
+    def test_doctor_login_records_kind(self):
+        self.client.post('/doctor/login/', {'email': 'doctor100@example.com', 'password': 'secret-pass'})
+        self.assertEqual(len(self.user_queries('/doctor/dashboard/')), 1)
+        self.assertEqual(len(self.user_queries('/doctor/search-patient/')), 0)
+
+    def test_patient_login_records_kind(self):
+        self.client.post('/login/', {'email': 'patient@example.com', 'password': 'secret-pass'})
+        self.user_queries('/dashboard/')
+        self.assertEqual(len(self.user_queries('/dashboard/')), 0)
+
+    def test_save_invalidates_cached_user(self):
+        self.client.force_login(self.doctor, backend='authentication.DoctorBackend')
+        self.user_queries('/doctor/dashboard/')
+        self.doctor.is_verified = False
+        self.doctor.save()
+        response = self.client.get('/doctor/search-patient/')
+        self.assertRedirects(response, '/doctor/dashboard/', fetch_redirect_response=False)
+
+    def test_deleted_user_is_logged_out(self):
+        self.client.force_login(self.doctor, backend='authentication.DoctorBackend')
+        self.user_queries('/doctor/dashboard/')
+        self.doctor.delete()
+        response = self.client.get('/doctor/dashboard/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_text_fields_load_on_access(self):
+        self.client.force_login(self.doctor, backend='authentication.DoctorBackend')
+        self.user_queries('/doctor/dashboard/')
+        doctor = DoctorBackend().get_user(self.doctor.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(doctor.nmc_registration_number, '100')
+        with self.assertNumQueries(1):
+            self.assertEqual(doctor.hospital_address, 'Main Road')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginHashingTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.doctor = make_doctor(100)
+        self.doctor.set_password('doctor-pass')
+        self.doctor.save()
+        self.patient = Patient.objects.create_user(
+            'doctor100@example.com', 'patient-pass', first_name='P', last_name='Q', phone_number='80000'
+        )
+
+    def attempt(self, email, password, **credentials):
+        original = MD5PasswordHasher.encode
+        with mock.patch.object(MD5PasswordHasher, 'encode', autospec=True, side_effect=original) as encode:
+            user = authenticate(None, username=email, password=password, **credentials)
+        return user, encode.call_count
+
+    def test_one_hash_per_attempt(self):
+        self.assertEqual(self.attempt('doctor100@example.com', 'patient-pass'), (self.patient, 1))
+        self.assertEqual(self.attempt('doctor100@example.com', 'wrong'), (None, 1))
+        self.assertEqual(self.attempt('nobody@example.com', 'wrong'), (None, 1))
+
+    def test_user_kind_picks_the_account(self):
+        self.assertEqual(self.attempt('doctor100@example.com', 'doctor-pass', user_kind='doctor'), (self.doctor, 1))
+        self.assertEqual(self.attempt('doctor100@example.com', 'doctor-pass'), (None, 1))
+
+
+class UserIdentityTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.doctor = make_doctor(100)
+        self.patient = Patient.objects.create_user(
+            'doctor100@example.com', 'patient-pass', first_name='P', last_name='Q', phone_number='80000'
+        )
+
+    def test_identities_follow_saves_and_deletes(self):
+        self.assertEqual(UserIdentity.resolve('doctor100@example.com'), {
+            'PATIENT': self.patient.pk, 'DOCTOR': self.doctor.pk,
+        })
+        self.doctor.email = 'moved@example.com'
+        self.doctor.save()
+        self.assertEqual(UserIdentity.resolve('moved@example.com'), {'DOCTOR': self.doctor.pk})
+        self.patient.delete()
+        self.assertEqual(UserIdentity.resolve('doctor100@example.com'), {})
+
+    def test_authentication_resolves_email_in_one_query(self):
+        with self.assertNumQueries(2):
+            self.assertIsNone(authenticate(None, username='doctor100@example.com', password='wrong'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(None, username='nobody@example.com', password='wrong'))
+
+    def test_registration_rejects_duplicate_email(self):
+        form = PatientRegistrationForm(data={
+            'first_name': 'A', 'last_name': 'B', 'email': 'doctor100@example.com', 'phone_number': '80001',
+            'password1': 'a-long-passphrase-1', 'password2': 'a-long-passphrase-1',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+
+    def test_registration_checks_email_once(self):
+        form = PatientRegistrationForm(data={
+            'first_name': 'A', 'last_name': 'B', 'email': 'new@example.com', 'phone_number': '80001',
+            'password1': 'a-long-passphrase-1', 'password2': 'a-long-passphrase-1',
+        })
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(form.is_valid())
+        email_queries = [query['sql'] for query in queries if 'new@example.com' in query['sql']]
+        self.assertEqual(len(email_queries), 1)
+        self.assertIn('patients_useridentity', email_queries[0])
+
+    def test_sync_command_rebuilds_identities(self):
+        identities = set(UserIdentity.objects.values_list('email', 'kind', 'user_id'))
+        UserIdentity.objects.all().delete()
+        call_command('sync_user_identities', '--batch-size=1', stdout=StringIO())
+        self.assertEqual(set(UserIdentity.objects.values_list('email', 'kind', 'user_id')), identities)
+        self.assertEqual(len(identities), 2)
+
+    def test_identity_migration_batches(self):
+        identities = set(UserIdentity.objects.values_list('email', 'kind', 'user_id'))
+        UserIdentity.objects.all().delete()
+        import_module('patients.migrations.0004_useridentity').record_identities(django_apps, None, batch_size=1)
+        self.assertEqual(set(UserIdentity.objects.values_list('email', 'kind', 'user_id')), identities)
+
+
+class EmergencyAccessFormTests(TestCase):
+    def form(self, patient_id):
+        return EmergencyAccessForm({
+            'patient_id': patient_id,
+            'access_reason': 'Unconscious on arrival',
+            'registration_number': '100',
+            'state_medical_council': 'Delhi Medical Council',
+        })
+
+    def test_accepts_scanned_card(self):
+        patient = Patient(patient_id='PT1A2B3C4D', first_name='P', last_name='Q', email='p@example.com')
+        form = self.form(patient.get_qr_data())
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['patient_id'], 'PT1A2B3C4D')
+        self.assertTrue(self.form('PT1A2B3C4D').is_valid())
+
+    def test_rejects_forged_card(self):
+        form = self.form('PSC:' + 'A' * 30)
+        self.assertFalse(form.is_valid())
+        self.assertIn('patient_id', form.errors)
+
+
+class SearchPatientTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.doctor = make_doctor(100, is_verified=True)
+        self.patient = Patient.objects.create_user(
+            'lakshmi@example.com', 'secret-pass', first_name='Lakshmi', last_name='Iyer', phone_number='80000'
+        )
+        self.client.force_login(self.doctor, backend='authentication.DoctorBackend')
+
+    def search(self, query):
+        response = self.client.post('/doctor/search-patient/', {'query': query})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['patients'])
+
+    def test_searches_through_the_index(self):
+        self.assertEqual(self.search('lakshmi iyer'), [self.patient])
+        self.assertEqual(self.search(self.patient.patient_id), [self.patient])
+        self.assertEqual(self.search('lakshmi@'), [self.patient])
+        self.assertEqual(self.search('nobody'), [])
+
+    def test_next_page(self):
+        for i in range(25):
+            Patient.objects.create_user(
+                f'ravi{i}@example.com', 'secret-pass', first_name='Ravi', last_name=str(i), phone_number=f'8100{i}'
+            )
+        response = self.client.post('/doctor/search-patient/', {'query': 'ravi'})
+        page = response.context['patients']
+        self.assertEqual(len(page), 20)
+        self.assertContains(response, '25 patients found')
+        response = self.client.post('/doctor/search-patient/', {'query': 'ravi', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['patients']), 5)
+        self.assertContains(response, 'Showing 21&ndash;25')
+
+
+class PatientSuggestionTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.doctor = make_doctor(101, is_verified=True)
+        self.patient = Patient.objects.create_user(
+            'lakshmi@example.com', 'secret-pass', first_name='Lakshmi', last_name='Iyer', phone_number='80000'
+        )
+        self.client.force_login(self.doctor, backend='authentication.DoctorBackend')
+
+    def suggest(self, query):
+        response = self.client.post('/doctor/search-patient/suggest/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_suggestions(self):
+        results = self.suggest('laks')['results']
+        self.assertEqual([result['patient_id'] for result in results], [self.patient.patient_id])
+        self.assertEqual(results[0]['name'], 'Lakshmi Iyer')
+        self.assertEqual(results[0]['url'], f'/doctor/patient/{self.patient.pk}/')
+        self.assertEqual(len(self.suggest(self.patient.patient_id[:4])['results']), 1)
+        self.assertEqual(self.suggest('nobody')['results'], [])
+
+    def test_longer_query_reuses_shorter_results(self):
+        self.suggest('la')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(suggest_patients('lakshmi i')['results']), 1)
+            self.assertEqual(suggest_patients('lakx')['results'], [])
+
+    def test_new_patients_appear(self):
+        self.assertEqual(len(self.suggest('lak')['results']), 1)
+        Patient.objects.create_user(
+            'lakshman@example.com', 'secret-pass', first_name='Lakshman', last_name='Rao', phone_number='80001'
+        )
+        self.assertEqual(len(self.suggest('lak')['results']), 2)
+
+    def test_requires_verified_doctor(self):
+        self.client.force_login(make_doctor(102), backend='authentication.DoctorBackend')
+        self.assertEqual(self.client.post('/doctor/search-patient/suggest/', {'q': 'laks'}).status_code, 403)
+        self.client.force_login(self.patient, backend='authentication.PatientBackend')
+        self.assertEqual(self.client.post('/doctor/search-patient/suggest/', {'q': 'laks'}).status_code, 403)
+
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Reads SQLite query plans')
+class AccessLogQueryPlanTests(TestCase):
+    def setUp(self):
+        use_temporary_media(self)
+        self.doctor = make_doctor(103, is_verified=True)
+        self.patient = Patient.objects.create_user(
+            'lakshmi@example.com', 'secret-pass', first_name='Lakshmi', last_name='Iyer', phone_number='80000'
+        )
+        self.admin = Patient.objects.create_superuser(
+            'admin@example.com', 'secret-pass', first_name='Admin', last_name='User', phone_number='80001'
+        )
+        AccessLog.objects.create(doctor=self.doctor, patient=self.patient, access_reason='Emergency')
+
+    def access_log_plans(self, user, backend, url):
+        """Return {sql: plan lines} for the AccessLog queries a page runs"""
+        self.client.force_login(user, backend=backend)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries:
+                if query['sql'].startswith('SELECT') and '"doctors_accesslog"' in query['sql']:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans[query['sql']] = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(plans)
+        return plans
+
+    def assertUsesIndexes(self, plans, indexes):
+        used = set()
+        for sql, plan in plans.items():
+            for line in plan:
+                if 'doctors_accesslog' in line:
+                    match = re.search(r'USING (?:COVERING )?INDEX (access_log_\w+)', line)
+                    self.assertIsNotNone(match, f'{line}\n{sql}')
+                    used.add(match.group(1))
+                self.assertNotIn('TEMP B-TREE FOR ORDER BY', line, sql)
+        self.assertEqual(used, set(indexes))
+
+    def test_doctor_pages(self):
+        doctor_backend = 'authentication.DoctorBackend'
+        for url, indexes in (
+            ('/doctor/dashboard/', ['access_log_doctor_idx']),
+            ('/doctor/profile/', ['access_log_doctor_idx']),
+            ('/doctor/access-logs/', ['access_log_doctor_idx']),
+            (f'/doctor/patient/{self.patient.pk}/', ['access_log_doctor_patient_idx']),
+            (f'/doctor/patient/{self.patient.pk}/records/', ['access_log_doctor_patient_idx']),
+        ):
+            with self.subTest(url=url):
+                self.assertUsesIndexes(self.access_log_plans(self.doctor, doctor_backend, url), indexes)
+
+    def test_admin_pages(self):
+        patient_backend = 'authentication.PatientBackend'
+        for url, indexes in (
+            ('/admin-panel/', ['access_log_recent_idx']),
+            ('/admin-panel/access-logs/', ['access_log_recent_idx', 'access_log_emergency_idx', 'access_log_status_idx']),
+            (f'/admin-panel/doctors/{self.doctor.pk}/', ['access_log_doctor_idx']),
+        ):
+            with self.subTest(url=url):
+                self.assertUsesIndexes(self.access_log_plans(self.admin, patient_backend, url), indexes)
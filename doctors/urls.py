@@ -11,6 +11,7 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/', views.doctor_profile, name='profile'),
     path('search-patient/', views.search_patient, name='search_patient'),
+    path('search-patient/suggest/', views.patient_suggestions, name='patient_suggestions'),
     path('emergency-access/', views.emergency_access, name='emergency_access'),
     path('patient/<uuid:patient_id>/', views.view_patient_profile, name='view_patient_profile'),
     path('patient/<uuid:patient_id>/records/', views.view_patient_records, name='view_patient_records'),
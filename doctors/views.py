@@ -4,12 +4,16 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
+from django.db.models import Count, Q
 from django.urls import reverse
 from django.utils import timezone
 from .models import Doctor, AccessLog, Patient
 from .forms import DoctorRegistrationForm, EmergencyAccessForm
 from patients.models import MedicalRecord
+from patients.user_cache import load_deferred_fields
+from patients.search import search_patients, suggest_patients
 from patients.utils import doctor_validator
+from authentication import session_backend
 
 def doctor_validator_home(request):
     return render(request, 'doctors/home.html')
@@ -44,13 +48,13 @@ def doctor_login(request):
         
         # Use Django's authenticate function with custom backend
         from django.contrib.auth import authenticate
-        user = authenticate(request, username=email, password=password)
+        user = authenticate(request, username=email, password=password, user_kind='doctor')
         
         if user is not None:
             # Check if it's a doctor account and verified
             if hasattr(user, 'doctor_id') and user.is_verified:
                 from django.contrib.auth import login
-                login(request, user)
+                login(request, user, backend=session_backend(user))
                 messages.success(request, 'Login successful!')
                 return redirect('doctors:dashboard')
             elif hasattr(user, 'doctor_id') and not user.is_verified:
@@ -184,28 +188,27 @@ def search_patient(request):
         query = request.POST.get('query', '').strip()
         
         if query:
-            # Search by patient ID, email, or name
-            if query.startswith('PT'):
-                # Search by patient ID
-                patients = Patient.objects.filter(patient_id__icontains=query)
-            elif '@' in query:
-                # Search by email
-                patients = Patient.objects.filter(email__icontains=query)
-            else:
-                # Search by name
-                patients = Patient.objects.filter(
-                    first_name__icontains=query
-                ) | Patient.objects.filter(
-                    last_name__icontains=query
-                )
-            
-            patients = patients.distinct()
+            # Search by patient ID, email, or name, through the search index;
+            # the cursor picks up after the previous page
+            patients = search_patients(query, cursor=request.POST.get('cursor'))
     
     return render(request, 'doctors/search_patient.html', {
         'patients': patients,
         'query': query
     })
 
+@login_required
+@require_POST
+def patient_suggestions(request):
+    """Typeahead matches for a partly typed patient ID, email, or name, as JSON"""
+    if not getattr(request.user, 'is_verified', False):
+        return JsonResponse({'error': 'Your account is not verified yet.'}, status=403)
+    
+    suggestions = suggest_patients(request.POST.get('q', '')[:100])
+    for result in suggestions['results']:
+        result['url'] = reverse('doctors:view_patient_profile', args=[result['id']])
+    return JsonResponse(suggestions)
+
 @login_required
 def view_patient_records(request, patient_id):
     if not request.user.is_verified:
@@ -233,29 +236,35 @@ def view_patient_records(request, patient_id):
 @login_required
 def doctor_profile(request):
     """Display doctor's complete profile with dataset attributes"""
-    doctor = request.user
+    doctor = load_deferred_fields(request.user)
     
     # Get doctor details from dataset
     validation_result = doctor_validator.get_doctor_details(doctor.nmc_registration_number)
     dataset_info = validation_result['doctor'] if validation_result else None
     
-    # Get doctor's access statistics
-    access_stats = {
-        'total_accesses': doctor.access_logs.count(),
-        'emergency_accesses': doctor.access_logs.filter(access_type='EMERGENCY').count(),
-        'authorized_accesses': doctor.access_logs.filter(access_type='AUTHORIZED').count(),
-        'unique_patients': doctor.access_logs.values('patient').distinct().count(),
-        'last_access': doctor.access_logs.order_by('-accessed_at').first()
-    }
+    # Offer the closest registry entries when the number doesn't match exactly
+    registry_suggestions = []
+    if not validation_result:
+        registry_suggestions = doctor_validator.suggest_doctors(doctor.nmc_registration_number)
+    
+    # Get doctor's access statistics, in one pass over the doctor's logs
+    access_stats = doctor.access_logs.aggregate(
+        total_accesses=Count('pk'),
+        emergency_accesses=Count('pk', filter=Q(access_type='EMERGENCY')),
+        authorized_accesses=Count('pk', filter=Q(access_type='AUTHORIZED')),
+        unique_patients=Count('patient', distinct=True),
+    )
+    access_stats['last_access'] = doctor.access_logs.order_by('-accessed_at').first()
     
     return render(request, 'doctors/profile.html', {
         'doctor': doctor,
         'dataset_info': dataset_info,
         'access_stats': access_stats,
+        'registry_suggestions': registry_suggestions,
         'validation_status': validation_result['status'] if validation_result else 'NOT_FOUND'
     })
 
 @login_required
 def access_logs(request):
     logs = request.user.access_logs.all().order_by('-accessed_at')
-    return render(request, 'doctors/access_logs.html', {'logs': logs})
+    return render(request, 'doctors/access_logs.html', {'access_logs': logs})
@@ -127,15 +127,46 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# QR codes are rendered on request by patients:qr_code; set QR_CODE_STORE_IMAGES
+# to also write an image to MEDIA_ROOT whenever a patient is saved
+QR_CODE_STORE_IMAGES = False
+
+# 'compact' encodes QR codes as a signed Base45 payload (patients.payload);
+# 'text' keeps the readable multi-line block any phone can display
+QR_PAYLOAD_FORMAT = 'compact'
+
+# Threads rendering stored QR images after a save (0 renders them inline)
+QR_CODE_WORKERS = 2
+
+# Rendered QR images kept in memory, and how long browsers may reuse one (seconds)
+QR_RENDER_CACHE_SIZE = 256
+QR_CODE_MAX_AGE = 300
+
+# Typeahead suggestions cached per process (entries, seconds); the cache is
+# cleared locally when the search index changes, other processes catch up
+# within the TTL
+SEARCH_SUGGESTION_CACHE_SIZE = 2048
+SEARCH_SUGGESTION_CACHE_TTL = 60
+
 # Authentication
 AUTHENTICATION_BACKENDS = [
+    # Also provides ModelBackend's permissions
     'authentication.CustomAuthBackend',
-    'django.contrib.auth.backends.ModelBackend',
+    # Recorded in the session at login so request.user loads with one query
+    'authentication.PatientBackend',
+    'authentication.DoctorBackend',
 ]
 
 # Custom User Model
 AUTH_USER_MODEL = 'patients.Patient'
 
+# Cache alias holding compact snapshots of logged-in patients and doctors, so
+# request.user is rebuilt without a query (None disables). Snapshots are
+# dropped when the user is saved or deleted; with several worker processes
+# use a cache they share, e.g. a FileBasedCache.
+SESSION_USER_CACHE = None
+SESSION_USER_CACHE_TIMEOUT = 300
+
 # Login URLs
 LOGIN_URL = '/doctor/login/'
 LOGIN_REDIRECT_URL = '/doctor/dashboard/'
@@ -149,3 +180,17 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Doctor registry
+# Seconds between checks for changed registry CSVs (None disables reloading)
+DOCTOR_REGISTRY_CHECK_INTERVAL = 30
+# Touched by `manage.py reload_doctor_registry` to make running workers reload
+DOCTOR_REGISTRY_RELOAD_MARKER = BASE_DIR / 'doctor_registry.reload'
+# Compiled by `manage.py compile_doctor_registry`; used instead of the CSVs when up to date
+DOCTOR_REGISTRY_SNAPSHOT = BASE_DIR / 'doctor_registry.snap'
+# 'files' (CSV or snapshot, held per process) or 'database' (RegistryDoctor table)
+DOCTOR_REGISTRY_SOURCE = 'files'
+# Memoized validate_doctor()/get_doctor_details() results per process (0 disables)
+DOCTOR_VALIDATION_CACHE_SIZE = 4096
+# Seconds a memoized result is served for; results are also dropped when the registry reloads
+DOCTOR_VALIDATION_CACHE_TTL = 300
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'patient_smart_card.settings')
 
 application = get_wsgi_application()
+
+# Load the doctor registry in the background so the first request doesn't pay for it
+from patients.utils import doctor_validator  # noqa: E402
+
+doctor_validator.warm_up()
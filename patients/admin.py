@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Patient, MedicalRecord
+from .models import Patient, MedicalRecord, UserIdentity
 
 @admin.register(Patient)
 class PatientAdmin(UserAdmin):
@@ -43,3 +43,17 @@ class MedicalRecordAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('uploaded_at',)
+
+@admin.register(UserIdentity)
+class UserIdentityAdmin(admin.ModelAdmin):
+    list_display = ('email', 'kind', 'user_id')
+    list_filter = ('kind',)
+    search_fields = ('email',)
+    readonly_fields = ('email', 'kind', 'user_id')
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Match the email exactly, so a search is one lookup on the email index"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(email=search_term), False
@@ -0,0 +1,69 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+
+def keyset_batches(queryset, batch_size):
+    """
+    Yield a queryset's rows in lists of up to batch_size, in primary key order
+
+    Keyset pagination: each batch is an index seek past the last primary key
+    seen, so only one batch is in memory and no cursor stays open while the
+    caller writes. Rows are model instances, or values_list() rows that
+    start with the primary key.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+        last_pk = last[0] if isinstance(last, tuple) else last.pk
+
+
+@contextmanager
+def worker_pool(workers):
+    """A process pool of `workers` processes, or None to work in this process when it is 0"""
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    try:
+        yield pool
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def submit_chunks(pool, function, items, chunk_size):
+    """
+    Call function on items in chunks of chunk_size: as tasks in the pool, or
+    right away when pool is None
+
+    Returns:
+        list: each chunk's result, or a Future of it; see chunk_total()
+    """
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if pool is None:
+        return [function(chunk) for chunk in chunks]
+    return [pool.submit(function, chunk) for chunk in chunks]
+
+
+def chunk_total(results):
+    """Wait for the chunks from submit_chunks() and add up their (int) results"""
+    return sum(result if isinstance(result, int) else result.result() for result in results)
+
+
+def read_ahead(submissions):
+    """
+    Yield from an iterator of submitted batches one step behind, so the next
+    batch is read and submitted while the caller waits on this one; at most
+    two batches are in memory
+    """
+    in_flight = deque()
+    for submission in submissions:
+        in_flight.append(submission)
+        if len(in_flight) > 1:
+            yield in_flight.popleft()
+    while in_flight:
+        yield in_flight.popleft()
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from .qr import payload_hash, qr_code_name, storage_path, _exists, _make_qr, _write
+
+CARD_DIRECTORY = 'cards'
+# Bump when the card layout changes, so cached cards are composed again
+CARD_VERSION = 1
+
+# CR80 card (85.6 x 54 mm) at 300 dpi
+DPI = 300
+CARD_SIZE = (1011, 638)
+HEADER_COLOR = (192, 57, 43)
+
+# A4 sheet in PDF points, holding COLUMNS x ROWS cards
+SHEET_SIZE = (595.28, 841.89)
+CARD_POINTS = (CARD_SIZE[0] * 72 / DPI, CARD_SIZE[1] * 72 / DPI)
+COLUMNS, ROWS = 2, 5
+GAP = 8
+
+
+def card_fields(patient):
+    """What a patient's card shows; only these fields go into the card hash"""
+    photo_path = None
+    if patient.profile_image:
+        try:
+            photo_path = patient.profile_image.path
+        except NotImplementedError:
+            photo_path = None
+    payload = patient.get_qr_data()
+    return {
+        'version': CARD_VERSION,
+        'patient_id': patient.patient_id,
+        'name': f"{patient.first_name} {patient.last_name}".strip(),
+        'blood_group': patient.blood_group or 'N/A',
+        'date_of_birth': str(patient.date_of_birth or 'N/A'),
+        'emergency_contact': patient.emergency_contact_name or 'N/A',
+        'emergency_phone': patient.emergency_contact_phone or 'N/A',
+        'payload': payload,
+        'photo': photo_path,
+        # Reuse the stored QR image when it encodes this payload
+        'qr_image': storage_path(qr_code_name(patient.qr_payload_hash))
+        if patient.qr_code and patient.qr_payload_hash == payload_hash(payload) else None,
+    }
+
+
+def card_hash(fields):
+    content = {key: value for key, value in fields.items() if key != 'qr_image'}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def card_image_name(digest):
+    """
+    Storage name of a composed card; like QR images, cards are content-addressed
+    and the ones no patient's card_item() names any more are removed by
+    `manage.py clean_qr_codes`
+    """
+    return f"{CARD_DIRECTORY}/{digest}.jpg"
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    from PIL import ImageFont
+
+    return ImageFont.load_default(size=size)
+
+
+def _fit(draw, text, font, width):
+    """Shorten text with an ellipsis until it fits in width pixels"""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + '...', font=font) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def compose_card(fields):
+    """
+    Draw a patient's card: photo, name, blood group, emergency contact and QR code
+
+    Returns:
+        bytes: the card as a JPEG
+    """
+    from PIL import Image, ImageDraw, ImageOps
+
+    width, height = CARD_SIZE
+    card = Image.new('RGB', CARD_SIZE, 'white')
+    draw = ImageDraw.Draw(card)
+
+    draw.rectangle((0, 0, width, 110), fill=HEADER_COLOR)
+    draw.text((40, 55), 'PATIENT SMART CARD', font=_font(52), fill='white', anchor='lm')
+
+    photo_box = (40, 150, 260, 420)
+    if fields['photo'] and os.path.exists(fields['photo']):
+        with Image.open(fields['photo']) as photo:
+            photo = ImageOps.fit(photo.convert('RGB'), (photo_box[2] - photo_box[0], photo_box[3] - photo_box[1]))
+        card.paste(photo, photo_box[:2])
+    else:
+        draw.rectangle(photo_box, fill=(236, 240, 241))
+        initials = ''.join(part[0] for part in fields['name'].split()[:2]).upper()
+        draw.text(((photo_box[0] + photo_box[2]) / 2, (photo_box[1] + photo_box[3]) / 2), initials,
+                  font=_font(90), fill=(127, 140, 141), anchor='mm')
+    draw.rectangle(photo_box, outline=(189, 195, 199), width=2)
+
+    qr_size = 360
+    if fields['qr_image'] and os.path.exists(fields['qr_image']):
+        # Saves a render, which costs more than the rest of the card
+        with Image.open(fields['qr_image']) as stored:
+            qr_image = stored.convert('RGB').resize((qr_size, qr_size), Image.NEAREST)
+    else:
+        qr = _make_qr(fields['payload'], 1)
+        qr.box_size = max(1, qr_size // (qr.modules_count + 2 * qr.border))
+        qr_image = qr.make_image(fill_color="black", back_color="white").get_image().convert('RGB')
+    card.paste(qr_image, (width - 30 - qr_size + (qr_size - qr_image.width) // 2, 140 + (qr_size - qr_image.height) // 2))
+
+    text_x = 290
+    text_width = width - qr_size - 30 - text_x - 10
+    draw.text((text_x, 150), _fit(draw, fields['name'], _font(44), text_width), font=_font(44), fill='black')
+    draw.text((text_x, 210), fields['patient_id'], font=_font(32), fill=(85, 85, 85))
+    draw.text((text_x, 275), 'BLOOD GROUP', font=_font(26), fill=(85, 85, 85))
+    draw.text((text_x, 305), fields['blood_group'], font=_font(72), fill=HEADER_COLOR)
+    draw.text((text_x, 395), f"DOB: {fields['date_of_birth']}", font=_font(28), fill='black')
+
+    draw.line((40, 530, width - 40, 530), fill=(189, 195, 199), width=2)
+    emergency = f"Emergency: {fields['emergency_contact']}  {fields['emergency_phone']}"
+    draw.text((40, 560), _fit(draw, emergency, _font(32), width - 80), font=_font(32), fill='black')
+
+    buffer = BytesIO()
+    card.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def compose_cards(items):
+    """
+    Compose and store the cards for (fields, name, target_path) items that
+    aren't cached yet; `manage.py render_smart_cards` runs it in worker processes
+
+    Returns:
+        int: number of cards composed
+    """
+    composed = 0
+    for fields, name, target_path in items:
+        if not _exists(name, target_path):
+            _write(name, compose_card(fields), target_path)
+            composed += 1
+    return composed
+
+
+def card_item(patient):
+    """Return (digest, (fields, name, target_path)) for a patient's card"""
+    fields = card_fields(patient)
+    digest = card_hash(fields)
+    name = card_image_name(digest)
+    return digest, (fields, name, storage_path(name))
+
+
+def _read(name, target_path):
+    from django.core.files.storage import default_storage
+
+    if target_path:
+        with open(target_path, 'rb') as file:
+            return file.read()
+    with default_storage.open(name, 'rb') as file:
+        return file.read()
+
+
+def _card_positions():
+    """Lower-left corner of every card slot on a sheet, in reading order"""
+    card_width, card_height = CARD_POINTS
+    left = (SHEET_SIZE[0] - COLUMNS * card_width - (COLUMNS - 1) * GAP) / 2
+    top = (SHEET_SIZE[1] + ROWS * card_height + (ROWS - 1) * GAP) / 2
+    return [
+        (left + column * (card_width + GAP), top - (row + 1) * card_height - row * GAP)
+        for row in range(ROWS) for column in range(COLUMNS)
+    ]
+
+
+def card_sheets_pdf(cards):
+    """
+    Lay cards out on A4 sheets and yield the PDF in pieces
+
+    cards is an iterable of (name, target_path) for stored card JPEGs. Each
+    JPEG is embedded as it is, without decoding it, and only the sheet being
+    written is held in memory, so the output can go straight to a file or
+    an HTTP response however many cards there are.
+    """
+    offsets = {}
+    position = 0
+    page_numbers = []
+    next_number = 3  # 1 and 2 are the catalog and page tree, written last
+
+    def obj(number, body, stream=None):
+        offsets[number] = position
+        data = f"{number} 0 obj\n".encode('latin-1') + body
+        if stream is not None:
+            data += b"\nstream\n" + stream + b"\nendstream"
+        return data + b"\nendobj\n"
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    yield header
+    position += len(header)
+
+    positions = _card_positions()
+    sheet = []
+    cards = iter(cards)
+    while True:
+        card = next(cards, None)
+        if card is not None:
+            sheet.append(card)
+            if len(sheet) < len(positions):
+                continue
+        if not sheet:
+            break
+
+        images = []
+        for name, target_path in sheet:
+            jpeg = _read(name, target_path)
+            body = (
+                f"<< /Type /XObject /Subtype /Image /Width {CARD_SIZE[0]} /Height {CARD_SIZE[1]} "
+                f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>"
+            ).encode('latin-1')
+            data = obj(next_number, body, jpeg)
+            images.append(next_number)
+            next_number += 1
+            yield data
+            position += len(data)
+
+        card_width, card_height = CARD_POINTS
+        content = ''.join(
+            f"q {card_width:.2f} 0 0 {card_height:.2f} {x:.2f} {y:.2f} cm /Im{index} Do Q\n"
+            # Hairline cut guides around each card
+            f"0.8 G 0.25 w {x:.2f} {y:.2f} {card_width:.2f} {card_height:.2f} re S\n"
+            for index, (x, y) in enumerate(positions[:len(sheet)])
+        ).encode('latin-1')
+        data = obj(next_number, f"<< /Length {len(content)} >>".encode('latin-1'), content)
+        content_number = next_number
+        next_number += 1
+        yield data
+        position += len(data)
+
+        xobjects = ' '.join(f"/Im{index} {number} 0 R" for index, number in enumerate(images))
+        data = obj(next_number, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {SHEET_SIZE[0]} {SHEET_SIZE[1]}] "
+            f"/Resources << /XObject << {xobjects} >> >> /Contents {content_number} 0 R >>"
+        ).encode('latin-1'))
+        page_numbers.append(next_number)
+        next_number += 1
+        yield data
+        position += len(data)
+
+        sheet = []
+        if card is None:
+            break
+
+    kids = ' '.join(f"{number} 0 R" for number in page_numbers)
+    for number, body in (
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_numbers)} >>".encode('latin-1')),
+    ):
+        data = obj(number, body)
+        yield data
+        position += len(data)
+
+    xref = [f"xref\n0 {next_number}\n", "0000000000 65535 f \n"]
+    xref.extend(f"{offsets[number]:010d} 00000 n \n" for number in range(1, next_number))
+    xref.append(f"trailer\n<< /Size {next_number} /Root 1 0 R >>\nstartxref\n{position}\n%%EOF\n")
+    yield ''.join(xref).encode('latin-1')
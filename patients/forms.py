@@ -1,13 +1,38 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Patient, MedicalRecord
+from django.core.exceptions import ValidationError
+from .models import Patient, MedicalRecord, UserIdentity
 
-class PatientRegistrationForm(UserCreationForm):
+class IdentityEmailMixin:
+    """
+    Registration form check that an email is free for the account kind with
+    one indexed UserIdentity query, in place of the unique check on the
+    account table that ModelForm would run as well
+    """
+    identity_kind = None
+    
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if self.identity_kind in UserIdentity.resolve(email):
+            raise forms.ValidationError('An account with this email already exists.')
+        return email
+    
+    def validate_unique(self):
+        exclude = self._get_validation_exclusions()
+        exclude.add('email')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as e:
+            self._update_errors(e)
+
+class PatientRegistrationForm(IdentityEmailMixin, UserCreationForm):
     email = forms.EmailField(required=True)
     phone_number = forms.CharField(max_length=20, required=True)
     first_name = forms.CharField(max_length=100, required=True)
     last_name = forms.CharField(max_length=100, required=True)
     
+    identity_kind = 'PATIENT'
+    
     class Meta:
         model = Patient
         fields = ('first_name', 'last_name', 'email', 'phone_number', 'password1', 'password2')
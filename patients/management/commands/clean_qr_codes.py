@@ -0,0 +1,72 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from patients.batches import keyset_batches
+from patients.cards import CARD_DIRECTORY, card_item
+from patients.models import Patient
+from patients.qr import QR_CODE_DIRECTORY
+
+class Command(BaseCommand):
+    help = 'Delete QR code images and composed smart cards under MEDIA_ROOT that no patient points at'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600, help='Keep files modified less than this many seconds ago (renders still being saved)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Patients read per batch when working out their current cards')
+        parser.add_argument('--dry-run', action='store_true', help='Report orphaned files without deleting them')
+
+    def handle(self, *args, **options):
+        self.clean(QR_CODE_DIRECTORY, ('.png', '.tmp'), self.qr_code_names, options)
+        # Cards are keyed by what they show, so an edited patient leaves the old card behind
+        self.clean(CARD_DIRECTORY, ('.jpg', '.tmp'), lambda: self.card_names(options['batch_size']), options)
+
+    def qr_code_names(self):
+        return {
+            os.path.basename(name)
+            for name in Patient.objects.exclude(qr_code='').exclude(qr_code=None).values_list('qr_code', flat=True).iterator()
+        }
+
+    def card_names(self, batch_size):
+        patients = Patient.objects.only('pk', 'profile_image', 'qr_code', 'qr_payload_hash', *Patient.QR_FIELDS)
+        names = set()
+        for batch in keyset_batches(patients, batch_size):
+            names.update(os.path.basename(card_item(patient)[1][1]) for patient in batch)
+        return names
+
+    def clean(self, directory_name, suffixes, referenced_names, options):
+        directory = os.path.join(settings.MEDIA_ROOT, directory_name)
+        if not os.path.isdir(directory):
+            self.stdout.write(f'{directory} does not exist, nothing to clean.')
+            return
+
+        started = time.perf_counter()
+        referenced = referenced_names()
+        cutoff = time.time() - options['min_age']
+
+        # scandir streams the directory, however many files it holds
+        scanned = removed = freed = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(suffixes):
+                    continue
+                scanned += 1
+                if entry.name in referenced:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {entry.name}')
+                if not options['dry_run']:
+                    os.unlink(entry.path)
+
+        elapsed = time.perf_counter() - started
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{directory_name}: {action} {removed} of {scanned} files ({freed / 1024:.1f} KB) in {elapsed:.2f}s; '
+                f'{len(referenced)} images in use'
+            )
+        )
@@ -0,0 +1,39 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from patients.registry import DoctorRegistry
+from patients.snapshot import write_snapshot
+from patients.utils import doctor_validator
+
+class Command(BaseCommand):
+    help = 'Compile the doctor registry CSVs into a memory-mappable snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, help='Snapshot path (defaults to DOCTOR_REGISTRY_SNAPSHOT)')
+
+    def handle(self, *args, **options):
+        output = options.get('output') or getattr(settings, 'DOCTOR_REGISTRY_SNAPSHOT', None)
+        if not output:
+            raise CommandError('Pass --output or set DOCTOR_REGISTRY_SNAPSHOT.')
+
+        started = time.perf_counter()
+
+        # Fingerprint before parsing, matching what workers compare at load time
+        sources = doctor_validator.source_fingerprints()
+        registries = []
+        for file_path in doctor_validator.dataset_paths():
+            if os.path.exists(file_path):
+                registries.append(DoctorRegistry.from_csv(file_path))
+            else:
+                self.stdout.write(self.style.WARNING(f'{file_path} not found, compiling an empty dataset.'))
+                registries.append(DoctorRegistry())
+        active_doctors, blacklisted_doctors = registries
+
+        write_snapshot(output, active_doctors, blacklisted_doctors, sources)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'Active doctors: {len(active_doctors)}')
+        self.stdout.write(f'Blacklisted doctors: {len(blacklisted_doctors)}')
+        self.stdout.write(f'Snapshot size: {os.path.getsize(output) / 1024:.1f} KB')
+        self.stdout.write(self.style.SUCCESS(f'Compiled {output} in {elapsed * 1000:.1f} ms'))
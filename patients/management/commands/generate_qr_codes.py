@@ -0,0 +1,75 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from patients.batches import chunk_total, keyset_batches, read_ahead, submit_chunks, worker_pool
+from patients.models import Patient
+from patients.qr import payload_hash, qr_code_name, write_qr_images, storage_path
+from patients.user_cache import forget_users
+
+class Command(BaseCommand):
+    help = 'Generate stored QR code images for many patients at once, across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Patients read and updated per batch')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Images rendered per task sent to a worker')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (0 renders in this process)')
+        parser.add_argument('--force', action='store_true', help='Also check patients whose QR code is already up to date')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        patients = Patient.objects.only('pk', 'qr_code', 'qr_payload_hash', *Patient.QR_FIELDS)
+        totals = {'checked': 0, 'rendered': 0, 'updated': 0}
+        with worker_pool(options['workers']) as pool:
+            batches = keyset_batches(patients, options['batch_size'])
+            for submitted in read_ahead(self.submit(batch, pool, options) for batch in batches):
+                self.finish(*submitted, totals, started)
+
+        elapsed = time.perf_counter() - started
+        rate = totals['checked'] / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Checked {totals["checked"]} patients in {elapsed:.2f}s ({rate:,.0f} patients/sec): '
+                f'{totals["rendered"]} images rendered, {totals["updated"]} patients updated'
+            )
+        )
+
+    def submit(self, batch, pool, options):
+        """Queue renders for the batch's out-of-date patients; one per distinct payload"""
+        changed = []
+        items = {}
+        for patient in batch:
+            payload = patient.get_qr_data()
+            digest = payload_hash(payload)
+            if digest == patient.qr_payload_hash and patient.qr_code and not options['force']:
+                continue
+            changed.append((patient, digest))
+            if digest not in items:
+                name = qr_code_name(digest)
+                items[digest] = (name, payload, storage_path(name))
+
+        results = submit_chunks(pool, write_qr_images, list(items.values()), options['chunk_size'])
+        return len(batch), changed, results
+
+    def finish(self, checked, changed, results, totals, started):
+        """Wait for a batch's images, then point its patients at them"""
+        totals['rendered'] += chunk_total(results)
+        updated = []
+        for patient, digest in changed:
+            name = qr_code_name(digest)
+            if patient.qr_code != name or patient.qr_payload_hash != digest:
+                patient.qr_code = name
+                patient.qr_payload_hash = digest
+                updated.append(patient)
+        if updated:
+            with transaction.atomic():
+                Patient.objects.bulk_update(updated, ['qr_code', 'qr_payload_hash'])
+            forget_users(Patient, [patient.pk for patient in updated])
+
+        totals['checked'] += checked
+        totals['updated'] += len(updated)
+        elapsed = time.perf_counter() - started
+        rate = totals['checked'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Checked {totals["checked"]} patients ({totals["rendered"]} rendered, {rate:,.0f} patients/sec)'
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from patients.batches import keyset_batches
+from patients.models import Patient, PatientSearchTerm
+from patients.search import forget_suggestions, patient_terms
+
+class Command(BaseCommand):
+    help = 'Rebuild the patient search index, e.g. after importing patients with bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Patients read and indexed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        patients = Patient.objects.only('first_name', 'last_name', 'email')
+
+        indexed = 0
+        with transaction.atomic():
+            PatientSearchTerm.objects.all().delete()
+            # One batch of patients and their terms in memory at a time
+            for batch in keyset_batches(patients, batch_size):
+                terms = PatientSearchTerm.objects.bulk_create(
+                    PatientSearchTerm(patient_id=patient.pk, kind=kind, term=term)
+                    for patient in batch for kind, term in patient_terms(patient)
+                )
+                indexed += len(terms)
+        forget_suggestions()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} search terms.'))
@@ -0,0 +1,45 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from patients.utils import doctor_validator
+
+class Command(BaseCommand):
+    help = 'Rebuild the doctor registry and signal running workers to reload it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-signal', action='store_true', help='Only report the build, do not touch the reload marker')
+
+    def handle(self, *args, **options):
+        # Build in this process to validate the files and report timings
+        doctor_validator.load_datasets()
+        if doctor_validator.load_error is not None:
+            # Workers keep their current registry on a bad file, but don't signal them for nothing
+            raise CommandError(f'Could not load the doctor registry: {doctor_validator.load_error}')
+        active_doctors, blacklisted_doctors = doctor_validator.ensure_loaded()
+
+        self.stdout.write(f'Build time: {doctor_validator.load_seconds * 1000:.1f} ms')
+        self.stdout.write(f'Active doctors: {len(active_doctors)}')
+        self.stdout.write(f'Blacklisted doctors: {len(blacklisted_doctors)}')
+
+        if options['no_signal']:
+            return
+
+        marker = getattr(settings, 'DOCTOR_REGISTRY_RELOAD_MARKER', None)
+        if not marker:
+            self.stdout.write(
+                self.style.WARNING('DOCTOR_REGISTRY_RELOAD_MARKER is not set; workers will not be signalled.')
+            )
+            return
+
+        with open(marker, 'a'):
+            os.utime(marker)
+
+        interval = getattr(settings, 'DOCTOR_REGISTRY_CHECK_INTERVAL', None)
+        if not interval:
+            self.stdout.write(
+                self.style.WARNING('DOCTOR_REGISTRY_CHECK_INTERVAL is disabled; workers only reload on restart.')
+            )
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f'Reload signalled; workers will pick it up within {interval} seconds.')
+        )
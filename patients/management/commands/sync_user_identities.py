@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from patients.batches import keyset_batches
+from patients.models import UserIdentity
+
+class Command(BaseCommand):
+    help = 'Rebuild the email -> account identity table from every user model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Users read and recorded per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            UserIdentity.objects.all().delete()
+            for kind, _ in UserIdentity.KINDS:
+                model = UserIdentity.model_of(kind)
+                users = model._default_manager.values_list('pk', 'email')
+                recorded = 0
+                for batch in keyset_batches(users, batch_size):
+                    identities = UserIdentity.objects.bulk_create(
+                        UserIdentity(email=email, kind=kind, user_id=pk) for pk, email in batch
+                    )
+                    recorded += len(identities)
+                self.stdout.write(f'{model._meta.verbose_name_plural.title()}: {recorded}')
+        self.stdout.write(self.style.SUCCESS('User identities rebuilt.'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+def record_identities(apps, schema_editor, batch_size=5000):
+    UserIdentity = apps.get_model('patients', 'UserIdentity')
+    for kind, label in (('PATIENT', 'patients.Patient'), ('DOCTOR', 'doctors.Doctor')):
+        users = apps.get_model(label).objects.order_by('pk').values_list('pk', 'email')
+        last_pk = None
+        while True:
+            # Keyset pagination: one batch of users and their identities in memory at a time
+            page = users if last_pk is None else users.filter(pk__gt=last_pk)
+            batch = list(page[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            UserIdentity.objects.bulk_create(UserIdentity(email=email, kind=kind, user_id=pk) for pk, email in batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_patient_profile_image_patient_qr_code'),
+        ('doctors', '0009_registrydoctor_normalized_registration_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('kind', models.CharField(choices=[('PATIENT', 'Patient'), ('DOCTOR', 'Doctor')], max_length=20)),
+                ('user_id', models.UUIDField()),
+            ],
+            options={
+                'verbose_name_plural': 'user identities',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'user_id'), name='unique_identity_user'), models.UniqueConstraint(fields=('email', 'kind'), name='unique_identity_email')],
+            },
+        ),
+        migrations.RunPython(record_identities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0004_useridentity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='qr_payload_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the payload the QR code image encodes', max_length=64),
+        ),
+    ]
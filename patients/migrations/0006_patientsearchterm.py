@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:47
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# The term rules as of this migration, so later changes to patients.search
+# don't change what it writes
+_WORD = re.compile(r'\w+')
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    return ''.join(character for character in text if not unicodedata.combining(character))
+
+
+def _patient_terms(patient):
+    terms = {('N', token) for token in _WORD.findall(_normalize(f"{patient.first_name} {patient.last_name}"))}
+    email = _normalize(patient.email).strip()
+    if email:
+        terms.add(('E', email))
+        if '@' in email:
+            terms.add(('E', email[email.index('@'):]))
+    return terms
+
+
+def index_patients(apps, schema_editor, batch_size=5000):
+    Patient = apps.get_model('patients', 'Patient')
+    PatientSearchTerm = apps.get_model('patients', 'PatientSearchTerm')
+    patients = Patient.objects.order_by('pk').only('first_name', 'last_name', 'email')
+    last_pk = None
+    while True:
+        # Keyset pagination: one batch of patients and their terms in memory at a time
+        page = patients if last_pk is None else patients.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        PatientSearchTerm.objects.bulk_create(
+            PatientSearchTerm(patient_id=patient.pk, kind=kind, term=term)
+            for patient in batch for kind, term in _patient_terms(patient)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0005_patient_qr_payload_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('N', 'Name'), ('E', 'Email')], max_length=1)),
+                ('term', models.CharField(max_length=254)),
+                ('patient', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term', 'patient'], name='search_term_lookup')],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'kind', 'term'), name='unique_search_term')],
+            },
+        ),
+        migrations.RunPython(index_patients, migrations.RunPython.noop),
+    ]
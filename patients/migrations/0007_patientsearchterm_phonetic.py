@@ -0,0 +1,107 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:21
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# The term rules as of this migration, so later changes to patients.search
+# and patients.phonetic don't change what it writes
+_WORD = re.compile(r'[\w\u0900-\u0963\u0966-\u0d7f]+')
+_INDIC_LETTERS = {
+    0x01: 'n', 0x02: 'n',
+    0x0B: 'r', 0x0C: 'l', 0x60: 'r', 0x61: 'l',
+    0x43: 'r', 0x44: 'r', 0x62: 'l', 0x63: 'l',
+    0x15: 'k', 0x16: 'k', 0x17: 'g', 0x18: 'g', 0x19: 'n',
+    0x1A: 'c', 0x1B: 'c', 0x1C: 'j', 0x1D: 'j', 0x1E: 'n',
+    0x1F: 't', 0x20: 't', 0x21: 'd', 0x22: 'd', 0x23: 'n',
+    0x24: 't', 0x25: 't', 0x26: 'd', 0x27: 'd', 0x28: 'n', 0x29: 'n',
+    0x2A: 'p', 0x2B: 'f', 0x2C: 'b', 0x2D: 'b', 0x2E: 'm',
+    0x2F: 'y', 0x30: 'r', 0x31: 'r', 0x32: 'l', 0x33: 'l', 0x34: 'l', 0x35: 'v',
+    0x36: 's', 0x37: 's', 0x38: 's', 0x39: 'h',
+    0x58: 'k', 0x59: 'k', 0x5A: 'g', 0x5B: 'j', 0x5C: 'r', 0x5D: 'r', 0x5E: 'f', 0x5F: 'y',
+}
+_INDIC_LETTERS.update((offset, 'a') for offset in range(0x04, 0x15) if offset not in _INDIC_LETTERS)
+_INDIC_LETTERS.update((0x66 + digit, str(digit)) for digit in range(10))
+_LATIN_RULES = [
+    (re.compile(r'[^a-z0-9]'), ''),
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'q'), 'k'),
+    (re.compile(r'z'), 'j'),
+    (re.compile(r'w'), 'v'),
+    (re.compile(r'ck'), 'k'),
+    (re.compile(r'ph'), 'f'),
+    (re.compile(r'(?<=[^aeiou])h'), ''),
+    (re.compile(r'h$'), ''),
+]
+_VOWELS = re.compile(r'[aeiouy]')
+_REPEATS = re.compile(r'(.)\1+')
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    return ''.join(character for character in text if not unicodedata.combining(character))
+
+
+def _phonetic_key(word):
+    key = ''.join(
+        _INDIC_LETTERS.get(ord(character) % 0x80, '') if 0x0900 <= ord(character) <= 0x0D7F else character
+        for character in word
+    )
+    for pattern, replacement in _LATIN_RULES:
+        key = pattern.sub(replacement, key)
+    if not key:
+        return ''
+    return _REPEATS.sub(r'\1', ('a' if key[0] in 'aeiou' else key[0]) + _VOWELS.sub('', key[1:]))
+
+
+def _patient_terms(patient):
+    terms = set()
+    for token in _WORD.findall(_normalize(f"{patient.first_name} {patient.last_name}")):
+        terms.add(('N', token))
+        key = _phonetic_key(token)
+        if key:
+            terms.add(('P', key))
+    email = _normalize(patient.email).strip()
+    if email:
+        terms.add(('E', email))
+        if '@' in email:
+            terms.add(('E', email[email.index('@'):]))
+    return terms
+
+
+def reindex_patients(apps, schema_editor, batch_size=5000):
+    # Adds the name sound terms, and Indic names are now split into whole words
+    Patient = apps.get_model('patients', 'Patient')
+    PatientSearchTerm = apps.get_model('patients', 'PatientSearchTerm')
+    patients = Patient.objects.order_by('pk').only('first_name', 'last_name', 'email')
+    last_pk = None
+    while True:
+        # Keyset pagination: one batch of patients and their terms in memory at a time
+        page = patients if last_pk is None else patients.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        PatientSearchTerm.objects.filter(patient__in=[patient.pk for patient in batch]).delete()
+        PatientSearchTerm.objects.bulk_create(
+            PatientSearchTerm(patient_id=patient.pk, kind=kind, term=term)
+            for patient in batch for kind, term in _patient_terms(patient)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_patientsearchterm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patientsearchterm',
+            name='kind',
+            field=models.CharField(choices=[('N', 'Name'), ('E', 'Email'), ('P', 'Name sound')], max_length=1),
+        ),
+        migrations.RunPython(reindex_patients, migrations.RunPython.noop),
+    ]
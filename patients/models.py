@@ -1,7 +1,10 @@
+from django.apps import apps
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 import uuid
 import os
+from .user_cache import forget_users
 
 class PatientManager(BaseUserManager):
     """Custom manager for Patient model"""
@@ -76,6 +79,7 @@ class Patient(AbstractUser):
     address = models.TextField(blank=True)
     profile_image = models.ImageField(upload_to='patient_images/', null=True, blank=True)
     qr_code = models.ImageField(upload_to='qr_codes/', null=True, blank=True)
+    qr_payload_hash = models.CharField(max_length=64, blank=True, editable=False, help_text="SHA-256 of the payload the QR code image encodes")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -99,69 +103,51 @@ class Patient(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'phone_number']
     
+    # Fields encoded in the QR code (see get_qr_data())
+    QR_FIELDS = (
+        'patient_id', 'first_name', 'last_name', 'email', 'phone_number', 'blood_group',
+        'date_of_birth', 'emergency_contact_name', 'emergency_contact_phone',
+    )
+    
     def save(self, *args, **kwargs):
         if not self.patient_id:
             self.patient_id = f"PT{str(uuid.uuid4())[:8].upper()}"
         super().save(*args, **kwargs)
+        forget_users(Patient, [self.pk])
+        UserIdentity.record(self, kwargs.get('update_fields'))
+        PatientSearchTerm.index(self, kwargs.get('update_fields'))
         
-        # Generate QR code after saving
-        self.generate_qr_code()
+        # Store the QR image in the background when its payload may have changed;
+        # otherwise it's rendered on request by the qr_code view
+        update_fields = kwargs.get('update_fields')
+        store_image = getattr(settings, 'QR_CODE_STORE_IMAGES', False)
+        if store_image and (update_fields is None or set(update_fields) & set(self.QR_FIELDS)):
+            from .qr import schedule_qr_code
+            schedule_qr_code(self)
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        forget_users(Patient, [user_id])
+        UserIdentity.forget(Patient, user_id)
+        from .search import forget_suggestions
+        forget_suggestions()
+        return result
     
     def generate_qr_code(self):
-        """Generate QR code for patient card"""
-        try:
-            import qrcode
-            from io import BytesIO
-            from django.core.files import File
-            
-            # Create QR code data with patient information
-            qr_data = f"""
-PATIENT SMART CARD
-================
-Patient ID: {self.patient_id}
-Name: {self.first_name} {self.last_name}
-Email: {self.email}
-Phone: {self.phone_number}
-Blood Group: {self.blood_group or 'N/A'}
-Date of Birth: {self.date_of_birth or 'N/A'}
-Emergency Contact: {self.emergency_contact_name or 'N/A'}
-Emergency Phone: {self.emergency_contact_phone or 'N/A'}
-================
-            """.strip()
-            
-            # Generate QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            
-            # Create QR code image
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Save QR code to file
-            buffer = BytesIO()
-            qr_img.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Generate filename
-            filename = f"qr_{self.patient_id}.png"
-            
-            # Save to model
-            self.qr_code.save(filename, File(buffer), save=False)
-            
-        except ImportError:
-            # If qrcode library is not installed, skip QR generation
-            pass
-        except Exception as e:
-            # Log error but don't break the save process
-            print(f"Error generating QR code for patient {self.patient_id}: {e}")
+        """Generate QR code for patient card, waiting for the image to be written"""
+        from .qr import schedule_qr_code
+        schedule_qr_code(self, wait=True)
     
     def get_qr_data(self):
-        """Get QR code data as string"""
+        """
+        Get QR code data as string: the signed compact payload (see
+        patients.payload), or the readable text block when
+        QR_PAYLOAD_FORMAT = 'text'
+        """
+        if getattr(settings, 'QR_PAYLOAD_FORMAT', 'compact') == 'compact':
+            from .payload import encode_payload
+            return encode_payload(self)
         return f"""
 PATIENT SMART CARD
 ================
@@ -179,6 +165,120 @@ Emergency Phone: {self.emergency_contact_phone or 'N/A'}
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.patient_id})"
 
+class UserIdentity(models.Model):
+    """
+    Which account an email belongs to, across every user model
+
+    Kept in step by Patient and Doctor save() and delete(), so an email
+    resolves to its accounts with one indexed query however many account
+    types there are. An email may belong to one account of each kind.
+    """
+    KINDS = [
+        ('PATIENT', 'Patient'),
+        ('DOCTOR', 'Doctor'),
+    ]
+    
+    # Model behind each kind, as an app label, for resolving an identity to its user
+    KIND_MODELS = {
+        'PATIENT': 'patients.Patient',
+        'DOCTOR': 'doctors.Doctor',
+    }
+    
+    # Indexed through unique_identity_email, which leads with it
+    email = models.EmailField()
+    kind = models.CharField(max_length=20, choices=KINDS)
+    user_id = models.UUIDField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'user_id'], name='unique_identity_user'),
+            models.UniqueConstraint(fields=['email', 'kind'], name='unique_identity_email'),
+        ]
+        verbose_name_plural = 'user identities'
+    
+    @classmethod
+    def kind_of(cls, model):
+        label = model._meta.label
+        return next(kind for kind, model_label in cls.KIND_MODELS.items() if model_label == label)
+    
+    @classmethod
+    def model_of(cls, kind):
+        return apps.get_model(cls.KIND_MODELS[kind])
+    
+    @classmethod
+    def record(cls, user, update_fields=None):
+        """Create or update the identity of a saved user"""
+        if update_fields is not None and 'email' not in update_fields:
+            return
+        cls.objects.update_or_create(
+            kind=cls.kind_of(type(user)), user_id=user.pk, defaults={'email': user.email}
+        )
+    
+    @classmethod
+    def forget(cls, model, user_id):
+        cls.objects.filter(kind=cls.kind_of(model), user_id=user_id).delete()
+    
+    @classmethod
+    def resolve(cls, email):
+        """Return {kind: user_id} for the accounts registered with an email"""
+        return dict(cls.objects.filter(email=email).values_list('kind', 'user_id'))
+    
+    def __str__(self):
+        return f"{self.email} ({self.get_kind_display()})"
+
+class PatientSearchTerm(models.Model):
+    """
+    Normalized search tokens of a patient, for indexed prefix search
+
+    Kept in step by Patient.save() (rows go with the patient on delete), so
+    doctors' patient search is a range scan over the (kind, term) index
+    instead of a LIKE '%...%' scan of the whole patient table.
+    """
+    NAME = 'N'
+    EMAIL = 'E'
+    PHONETIC = 'P'
+    KINDS = [
+        (NAME, 'Name'),
+        (EMAIL, 'Email'),
+        (PHONETIC, 'Name sound'),
+    ]
+    
+    # Patient fields the terms are built from
+    SOURCE_FIELDS = ('first_name', 'last_name', 'email')
+    
+    # Indexed through unique_search_term, which leads with it
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='search_terms', db_index=False)
+    kind = models.CharField(max_length=1, choices=KINDS)
+    term = models.CharField(max_length=254)
+    
+    class Meta:
+        constraints = [
+            # Checks a patient's other query words, one probe per candidate
+            models.UniqueConstraint(fields=['patient', 'kind', 'term'], name='unique_search_term'),
+        ]
+        indexes = [
+            # Finds the candidates: ends with patient, so the search reads only the index
+            models.Index(fields=['kind', 'term', 'patient'], name='search_term_lookup'),
+        ]
+    
+    @classmethod
+    def index(cls, patient, update_fields=None):
+        """Bring a saved patient's terms up to date, writing only the ones that changed"""
+        from .search import forget_suggestions, patient_terms
+        if update_fields is not None and not set(update_fields) & set(cls.SOURCE_FIELDS):
+            return
+        forget_suggestions()
+        wanted = patient_terms(patient)
+        existing = set(cls.objects.filter(patient=patient).values_list('kind', 'term'))
+        for kind, _ in cls.KINDS:
+            stale = [term for term_kind, term in existing - wanted if term_kind == kind]
+            if stale:
+                cls.objects.filter(patient=patient, kind=kind, term__in=stale).delete()
+        cls.objects.bulk_create(cls(patient=patient, kind=kind, term=term) for kind, term in wanted - existing)
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.term}"
+
 class MedicalRecord(models.Model):
     RECORD_TYPE_CHOICES = [
         ('PRESCRIPTION', 'Prescription'),
@@ -0,0 +1,139 @@
+import datetime
+import struct
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# Scanned text starts with this; the rest is Base45, so the whole payload
+# fits QR alphanumeric mode (5.5 bits a character instead of 8)
+PAYLOAD_PREFIX = 'PSC:'
+PAYLOAD_VERSION = 1
+
+BASE45_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:'
+_BASE45_VALUES = {character: value for value, character in enumerate(BASE45_ALPHABET)}
+
+# Frozen for payload version 1, whatever Patient.BLOOD_GROUP_CHOICES becomes
+BLOOD_GROUPS = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+TEXT_FIELDS = (
+    'patient_id', 'first_name', 'last_name', 'phone_number', 'email',
+    'emergency_contact_name', 'emergency_contact_phone',
+)
+EPOCH = datetime.date(1900, 1, 1)
+# Last date of birth the 16-bit field holds; later (or pre-1900) dates are sent as unknown
+LAST_DATE = EPOCH + datetime.timedelta(days=0xFFFF - 1)
+SEPARATOR = '\x1f'
+TAG_SIZE = 8
+_HEADER = struct.Struct('>BBH')
+
+
+def b45encode(data):
+    """Encode bytes as Base45 (RFC 9285)"""
+    characters = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, low = divmod(value, 45)
+        high, middle = divmod(value, 45)
+        characters.extend((BASE45_ALPHABET[low], BASE45_ALPHABET[middle], BASE45_ALPHABET[high]))
+    if len(data) % 2:
+        high, low = divmod(data[-1], 45)
+        characters.extend((BASE45_ALPHABET[low], BASE45_ALPHABET[high]))
+    return ''.join(characters)
+
+
+def b45decode(text):
+    """Decode Base45 text (RFC 9285), raising ValueError when it isn't valid"""
+    try:
+        values = [_BASE45_VALUES[character] for character in text]
+    except KeyError:
+        raise ValueError('Invalid Base45 character') from None
+    if len(values) % 3 == 1:
+        raise ValueError('Invalid Base45 length')
+
+    data = bytearray()
+    for i in range(0, len(values), 3):
+        group = values[i:i + 3]
+        if len(group) == 3:
+            value = group[0] + group[1] * 45 + group[2] * 2025
+            if value > 0xFFFF:
+                raise ValueError('Invalid Base45 group')
+            data.extend(divmod(value, 256))
+        else:
+            value = group[0] + group[1] * 45
+            if value > 0xFF:
+                raise ValueError('Invalid Base45 group')
+            data.append(value)
+    return bytes(data)
+
+
+def _tag(body, secret=None):
+    return salted_hmac('patients.payload', body, secret=secret).digest()[:TAG_SIZE]
+
+
+def _tag_matches(tag, body):
+    # Cards outlive key rotation: accept any key still in SECRET_KEY_FALLBACKS
+    return any(
+        constant_time_compare(tag, _tag(body, secret))
+        for secret in [settings.SECRET_KEY, *getattr(settings, 'SECRET_KEY_FALLBACKS', [])]
+    )
+
+
+def encode_payload(patient):
+    """
+    Pack a patient's card details into the compact QR payload
+
+    Layout before Base45: version, blood group (index + 1, 0 when unknown) and
+    date of birth (days since 1900-01-01 + 1, 0 when unknown or outside
+    1900-01-01 to LAST_DATE) in four bytes, the text fields as UTF-8 joined
+    by 0x1F, then a truncated HMAC-SHA256
+    (keyed by SECRET_KEY; SECRET_KEY_FALLBACKS are also accepted when
+    decoding) so tampered or misread cards are rejected.
+    """
+    blood_group = BLOOD_GROUPS.index(patient.blood_group) + 1 if patient.blood_group in BLOOD_GROUPS else 0
+    date_of_birth = patient.date_of_birth
+    if isinstance(date_of_birth, str):
+        date_of_birth = datetime.date.fromisoformat(date_of_birth)
+    birth = (date_of_birth - EPOCH).days + 1 if date_of_birth and EPOCH <= date_of_birth <= LAST_DATE else 0
+    text = SEPARATOR.join((getattr(patient, field) or '').replace(SEPARATOR, ' ') for field in TEXT_FIELDS)
+    body = _HEADER.pack(PAYLOAD_VERSION, blood_group, birth) + text.encode('utf-8')
+    return PAYLOAD_PREFIX + b45encode(body + _tag(body))
+
+
+def is_compact_payload(text):
+    return text.strip().startswith(PAYLOAD_PREFIX)
+
+
+def decode_payload(text, verify=True):
+    """
+    Unpack a compact QR payload
+
+    Returns:
+        dict: version, blood_group, date_of_birth and the TEXT_FIELDS
+
+    Raises:
+        ValueError: if the text isn't a payload of a known version, or its
+        signature doesn't match (unless verify=False)
+    """
+    text = text.strip()
+    if not text.startswith(PAYLOAD_PREFIX):
+        raise ValueError('Not a patient smart card payload')
+    data = b45decode(text[len(PAYLOAD_PREFIX):])
+    if len(data) < _HEADER.size + TAG_SIZE:
+        raise ValueError('Truncated patient smart card payload')
+
+    body, tag = data[:-TAG_SIZE], data[-TAG_SIZE:]
+    version, blood_group, birth = _HEADER.unpack_from(body)
+    if version != PAYLOAD_VERSION:
+        raise ValueError(f'Unsupported patient smart card payload version {version}')
+    if verify and not _tag_matches(tag, body):
+        raise ValueError('Patient smart card payload signature does not match')
+
+    values = body[_HEADER.size:].decode('utf-8').split(SEPARATOR)
+    if len(values) != len(TEXT_FIELDS) or not 0 <= blood_group <= len(BLOOD_GROUPS):
+        raise ValueError('Malformed patient smart card payload')
+    fields = dict(zip(TEXT_FIELDS, values))
+    fields.update(
+        version=version,
+        blood_group=BLOOD_GROUPS[blood_group - 1] if blood_group else None,
+        date_of_birth=EPOCH + datetime.timedelta(days=birth - 1) if birth else None,
+    )
+    return fields
@@ -0,0 +1,66 @@
+import re
+
+# Key letter for each code point offset in the nine Brahmic script blocks
+# (Devanagari U+0900 to Malayalam U+0D00), which share the ISCII layout:
+# क, ক, ਕ, ક, କ, க, క, ಕ and ക are all at offset 0x15. Aspirates fold
+# into their plain consonant and vowels into 'a', matching what
+# phonetic_key() does to the same name written in Latin letters.
+_INDIC_LETTERS = {
+    0x01: 'n', 0x02: 'n',
+    0x0B: 'r', 0x0C: 'l', 0x60: 'r', 0x61: 'l',
+    0x43: 'r', 0x44: 'r', 0x62: 'l', 0x63: 'l',
+    0x15: 'k', 0x16: 'k', 0x17: 'g', 0x18: 'g', 0x19: 'n',
+    0x1A: 'c', 0x1B: 'c', 0x1C: 'j', 0x1D: 'j', 0x1E: 'n',
+    0x1F: 't', 0x20: 't', 0x21: 'd', 0x22: 'd', 0x23: 'n',
+    0x24: 't', 0x25: 't', 0x26: 'd', 0x27: 'd', 0x28: 'n', 0x29: 'n',
+    0x2A: 'p', 0x2B: 'f', 0x2C: 'b', 0x2D: 'b', 0x2E: 'm',
+    0x2F: 'y', 0x30: 'r', 0x31: 'r', 0x32: 'l', 0x33: 'l', 0x34: 'l', 0x35: 'v',
+    0x36: 's', 0x37: 's', 0x38: 's', 0x39: 'h',
+    0x58: 'k', 0x59: 'k', 0x5A: 'g', 0x5B: 'j', 0x5C: 'r', 0x5D: 'r', 0x5E: 'f', 0x5F: 'y',
+}
+_INDIC_LETTERS.update((offset, 'a') for offset in range(0x04, 0x15) if offset not in _INDIC_LETTERS)
+_INDIC_LETTERS.update((0x66 + digit, str(digit)) for digit in range(10))
+INDIC_RANGE = (0x0900, 0x0D7F)
+
+# Spelling variants of romanized Indian names, applied in order
+_LATIN_RULES = [
+    (re.compile(r'[^a-z0-9]'), ''),
+    (re.compile(r'x'), 'ks'),  # Laxmi, Lakshmi
+    (re.compile(r'q'), 'k'),
+    (re.compile(r'z'), 'j'),  # Zakir, Jakir
+    (re.compile(r'w'), 'v'),  # Tejaswini, Tejasvini
+    (re.compile(r'ck'), 'k'),
+    (re.compile(r'ph'), 'f'),
+    (re.compile(r'(?<=[^aeiou])h'), ''),  # Aspirates: Shankar, Sankar; Arathi, Arati
+    (re.compile(r'h$'), ''),
+]
+_VOWELS = re.compile(r'[aeiouy]')
+# After the vowels go, so Kannan, Kanan and கண்ணன் (no inherent vowels) agree
+_REPEATS = re.compile(r'(.)\1+')
+
+
+def transliterate(word):
+    """Replace letters of the Brahmic scripts in a word with phonetic_key() letters"""
+    first, last = INDIC_RANGE
+    return ''.join(
+        _INDIC_LETTERS.get(ord(character) % 0x80, '') if first <= ord(character) <= last else character
+        for character in word
+    )
+
+
+def phonetic_key(word):
+    """
+    Reduce a normalized name word to how it sounds, so spellings of the same
+    Indian name share a key: 'Tejaswini', 'Tejasvini' and 'तेजस्विनी' are all
+    'tjsvn'
+
+    Transliterates Indic scripts, folds common romanization variants (w/v,
+    x/ks, z/j, aspirated consonants), then keeps the first letter (any vowel
+    as 'a') and the consonants after it, with repeats collapsed, like Metaphone.
+    """
+    key = transliterate(word)
+    for pattern, replacement in _LATIN_RULES:
+        key = pattern.sub(replacement, key)
+    if not key:
+        return ''
+    return _REPEATS.sub(r'\1', ('a' if key[0] in 'aeiou' else key[0]) + _VOWELS.sub('', key[1:]))
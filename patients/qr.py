@@ -0,0 +1,234 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from .cache import LRUCache
+
+QR_CODE_DIRECTORY = 'qr_codes'
+
+_rendered = LRUCache(getattr(settings, 'QR_RENDER_CACHE_SIZE', 256))
+
+_executor = None
+_executor_lock = threading.Lock()
+# Patient pk -> payload hash of the newest scheduled render; older renders
+# still in flight see they were superseded and leave the patient alone
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def payload_hash(payload):
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def qr_code_name(digest):
+    """
+    Storage name of the QR image for a payload hash
+
+    Images are content-addressed: a payload is rendered once, however many
+    times or by however many patients it is saved, and a changed payload gets
+    a new file (the old one is removed by `manage.py clean_qr_codes`).
+    """
+    return f"{QR_CODE_DIRECTORY}/{digest}.png"
+
+
+def _make_qr(payload, box_size):
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr
+
+
+def render_qr_png(payload, box_size=10):
+    """Render a payload to PNG bytes"""
+    buffer = BytesIO()
+    _make_qr(payload, box_size).make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_qr_svg(payload, box_size=10):
+    """Render a payload to SVG bytes"""
+    from qrcode.image.svg import SvgPathImage
+
+    return _make_qr(payload, box_size).make_image(image_factory=SvgPathImage).to_string(encoding='unicode').encode('utf-8')
+
+
+RENDERERS = {
+    'png': ('image/png', render_qr_png),
+    'svg': ('image/svg+xml', render_qr_svg),
+}
+
+
+def render_qr(payload, image_format='png', box_size=10):
+    """
+    Render a payload in the given format, from the in-process LRU of
+    rendered images (QR_RENDER_CACHE_SIZE entries) when possible
+
+    Returns:
+        tuple: (content type, image bytes)
+    """
+    content_type, renderer = RENDERERS[image_format]
+    key = (payload_hash(payload), image_format, box_size)
+    content = _rendered.get(key)
+    if content is None:
+        content = renderer(payload, box_size)
+        _rendered.set(key, content)
+    return content_type, content
+
+
+def _exists(name, target_path):
+    return os.path.exists(target_path) if target_path else default_storage.exists(name)
+
+
+def _write(name, content, target_path):
+    """Write the file at name in one step, so readers never see a partial image"""
+    if target_path is None:
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+        return
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def storage_path(name):
+    """Filesystem path of a stored image, or None for storages without one"""
+    try:
+        return default_storage.path(name)
+    except NotImplementedError:
+        return None
+
+
+def write_qr_images(items):
+    """
+    Render and write the images for (name, payload, target_path) items that
+    don't exist yet; `manage.py generate_qr_codes` runs it in worker processes
+
+    Returns:
+        int: number of images rendered
+    """
+    rendered = 0
+    for name, payload, target_path in items:
+        if not _exists(name, target_path):
+            _write(name, render_qr_png(payload), target_path)
+            rendered += 1
+    return rendered
+
+
+def write_qr_code(patient_pk, payload, target_path=None):
+    """
+    Store the QR image for a payload unless it already exists, then point
+    the patient's qr_code and qr_payload_hash fields at it
+
+    Returns:
+        bool: True if an image was rendered
+    """
+    from .models import Patient
+    from .user_cache import forget_users
+
+    digest = payload_hash(payload)
+    name = qr_code_name(digest)
+    rendered = False
+    if not _exists(name, target_path):
+        _write(name, render_qr_png(payload), target_path)
+        rendered = True
+
+    with _pending_lock:
+        if _pending.get(patient_pk, digest) != digest:
+            return rendered
+    if Patient.objects.filter(pk=patient_pk).exclude(qr_payload_hash=digest).update(qr_code=name, qr_payload_hash=digest):
+        forget_users(Patient, [patient_pk])
+    return rendered
+
+
+def _run(patient_pk, payload, target_path):
+    try:
+        return write_qr_code(patient_pk, payload, target_path)
+    except ImportError:
+        # If qrcode library is not installed, skip QR generation
+        return False
+    except Exception as e:
+        # Log error but don't break the save process
+        print(f"Error generating QR code for patient {patient_pk}: {e}")
+        return False
+    finally:
+        with _pending_lock:
+            if _pending.get(patient_pk) == payload_hash(payload):
+                del _pending[patient_pk]
+
+
+def _background_run(*args):
+    try:
+        return _run(*args)
+    finally:
+        # Worker threads outlive requests; don't leave their connections open
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'QR_CODE_WORKERS', 2), thread_name_prefix='qr-code'
+            )
+        return _executor
+
+
+def schedule_qr_code(patient, wait=False):
+    """
+    Queue a background render of a patient's QR image
+
+    Nothing is queued when the patient's qr_payload_hash already matches the
+    payload or a render for the same payload is already queued, and the
+    worker only renders when no image exists for the payload yet. With
+    wait=True, or QR_CODE_WORKERS = 0, the image is written before this
+    returns; otherwise the render is queued when the current transaction
+    commits, since the worker updates the patient on its own connection.
+    """
+    payload = patient.get_qr_data()
+    digest = payload_hash(payload)
+    if digest == patient.qr_payload_hash and patient.qr_code and not wait:
+        return
+    name = qr_code_name(digest)
+    # Resolve the path now: MEDIA_ROOT may change before the worker runs
+    target_path = storage_path(name)
+
+    if wait or not getattr(settings, 'QR_CODE_WORKERS', 2):
+        with _pending_lock:
+            _pending[patient.pk] = digest
+        _run(patient.pk, payload, target_path)
+        if _exists(name, target_path):
+            patient.qr_code = name
+            patient.qr_payload_hash = digest
+        return
+    transaction.on_commit(lambda: _submit(patient.pk, payload, target_path))
+
+
+def _submit(patient_pk, payload, target_path):
+    digest = payload_hash(payload)
+    with _pending_lock:
+        if _pending.get(patient_pk) == digest:
+            return
+        _pending[patient_pk] = digest
+    _get_executor().submit(_background_run, patient_pk, payload, target_path)
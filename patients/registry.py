@@ -0,0 +1,450 @@
+import csv
+import re
+import string
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping
+
+from django.db import models
+
+# Joins the non-indexed fields of a row into a single string
+FIELD_SEPARATOR = '\x1f'
+
+# Fields whose per-value row counts are kept up to date as rows are added
+COUNTED_FIELDS = ('state_medical_council', 'qualification_1')
+
+# Council abbreviations that registration numbers arrive prefixed with, e.g. "APMC/12345"
+COUNCIL_PREFIXES = ('APMC', 'TNMC', 'KMC', 'MMC', 'DMC', 'GMC', 'UPMC', 'WBMC', 'RMC', 'NMC', 'MCI')
+
+# Sorts after every character, so [prefix, prefix + PREFIX_END) is a range scan for the prefix
+PREFIX_END = '\U0010ffff'
+
+_SEPARATORS = re.compile(r'[^0-9A-Z]')
+_COUNCIL_PREFIX = re.compile(r'^(?:%s)(?=\d)' % '|'.join(sorted(COUNCIL_PREFIXES, key=len, reverse=True)))
+
+
+def normalize_registration_number(value):
+    """
+    Reduce a registration number to a canonical form: upper case, without
+    spaces or punctuation, a council abbreviation prefix or leading zeros
+    """
+    normalized = _COUNCIL_PREFIX.sub('', _SEPARATORS.sub('', (value or '').upper()))
+    if normalized.isdigit():
+        normalized = normalized.lstrip('0') or '0'
+    return value if normalized == value else normalized
+
+
+def edit_distance(a, b):
+    """Levenshtein distance, counting an adjacent transposition as one edit"""
+    # A shared prefix or suffix never changes the distance, and near matches
+    # share most of theirs, so only the differing middle goes through the table
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return len(a) or len(b)
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        previous_previous, previous = previous, current
+    return previous[len(b)]
+
+
+def single_edits(value):
+    """Yield every string one deletion, transposition, substitution or insertion away"""
+    alphabet = string.digits if value.isdigit() else string.digits + string.ascii_uppercase
+    for i in range(len(value)):
+        yield value[:i] + value[i + 1:]
+        if i + 1 < len(value):
+            yield value[:i] + value[i + 1] + value[i] + value[i + 2:]
+        for character in alphabet:
+            if character != value[i]:
+                yield value[:i] + character + value[i + 1:]
+    for i in range(len(value) + 1):
+        for character in alphabet:
+            yield value[:i] + character + value[i:]
+
+
+class NearMatchIndex:
+    """
+    Normalized registration numbers sorted forwards and reversed, for ranked
+    near-match lookups
+
+    Every number one edit away from the query is probed directly, so single
+    typos are always found. Further out, a typo towards the end of a number
+    keeps the right row close by in the forward order and one towards the
+    start keeps it close in the reversed order; the rows in a small window
+    around both positions are ranked by edit distance too.
+    """
+
+    WINDOW = 8
+
+    def __init__(self, keys):
+        """keys: iterable of (normalized registration number, row index)"""
+        forward = sorted(keys)
+        self.keys = [key for key, _ in forward]
+        self.rows = array('I', (row for _, row in forward))
+        backward = sorted((key[::-1], row) for key, row in forward)
+        self.reversed_keys = [key for key, _ in backward]
+        self.reversed_rows = array('I', (row for _, row in backward))
+
+    def _probe(self, key):
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.rows[position]
+        return None
+
+    def search(self, normalized, limit=5, max_distance=2):
+        """Return up to `limit` (row index, distance) pairs, closest first"""
+        if not normalized:
+            return []
+        candidates = {}
+        row = self._probe(normalized)
+        if row is not None:
+            candidates[row] = (0, normalized)
+        if max_distance >= 1:
+            for key in single_edits(normalized):
+                row = self._probe(key)
+                if row is not None and row not in candidates:
+                    candidates[row] = (1, key)
+        for keys, rows, probe, flip in (
+            (self.keys, self.rows, normalized, False),
+            (self.reversed_keys, self.reversed_rows, normalized[::-1], True),
+        ):
+            position = bisect_left(keys, probe)
+            for candidate in range(max(position - self.WINDOW, 0), min(position + self.WINDOW, len(keys))):
+                row = rows[candidate]
+                if row in candidates:
+                    continue
+                key = keys[candidate][::-1] if flip else keys[candidate]
+                if abs(len(key) - len(normalized)) > max_distance:
+                    continue
+                distance = edit_distance(normalized, key)
+                if distance <= max_distance:
+                    candidates[row] = (distance, key)
+        ranked = sorted(candidates.items(), key=lambda item: item[1])
+        return [(row, distance) for row, (distance, _) in ranked[:limit]]
+
+
+class DoctorRecord(Mapping):
+    """
+    Read-only view of one registry row; detail fields are decoded on first access
+    """
+
+    __slots__ = ('_registry', '_index', '_details')
+
+    def __init__(self, registry, index):
+        self._registry = registry
+        self._index = index
+        self._details = None
+
+    @property
+    def registration_number(self):
+        return self._registry.registration_number_of(self._index)
+
+    @property
+    def state_medical_council(self):
+        return self._registry.council_of(self._index)
+
+    def _decode(self):
+        if self._details is None:
+            values = self._registry.details_of(self._index).split(FIELD_SEPARATOR)
+            self._details = dict(zip(self._registry.detail_fields, values))
+        return self._details
+
+    def __getitem__(self, key):
+        if key == 'registration_number':
+            return self.registration_number
+        if key == 'state_medical_council':
+            return self.state_medical_council
+        return self._decode()[key]
+
+    def __iter__(self):
+        return iter(self._registry.fields)
+
+    def __len__(self):
+        return len(self._registry.fields)
+
+    def __repr__(self):
+        return f"DoctorRecord({dict(self)!r})"
+
+
+class DoctorRegistry:
+    """
+    Doctor rows from one registry dataset, indexed for constant-time lookups
+
+    Rows are stored column-wise: registration numbers in a list, state medical
+    councils as codes into an interned name table, and the remaining fields
+    packed into one string per row that is only split when a record is read.
+    Row counts per value of COUNTED_FIELDS are accumulated as rows are added.
+    """
+
+    def __init__(self, rows=None, fields=None):
+        self.fields = ()
+        self.detail_fields = ()
+        self.registration_numbers = []
+        self.council_codes = array('I')
+        self.councils = []
+        self.details = []
+        self.by_registration = {}
+        self.by_registration_and_council = {}
+        self.by_normalized = {}
+        self.by_normalized_and_council = {}
+        self.counts = {field: Counter() for field in COUNTED_FIELDS}
+        self._council_lookup = {}
+        self._positions = None
+        self._counted_positions = ()
+        self._near_matches = None
+        self._near_matches_lock = threading.Lock()
+        if fields:
+            self._set_fields(fields)
+        for row in rows or []:
+            self.add(row)
+
+    @classmethod
+    def from_csv(cls, file_path):
+        """Build a registry from a CSV file with a header row"""
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            registry = cls(fields=next(reader, ()))
+            for values in reader:
+                if values:
+                    registry._append(values)
+        return registry
+
+    def _set_fields(self, fields):
+        self.fields = tuple(fields)
+        registration_position = self.fields.index('registration_number')
+        council_position = self.fields.index('state_medical_council')
+        detail_positions = [
+            position for position in range(len(self.fields))
+            if position not in (registration_position, council_position)
+        ]
+        self.detail_fields = tuple(self.fields[position] for position in detail_positions)
+        self._positions = (registration_position, council_position, detail_positions)
+        self._counted_positions = tuple(
+            (self.counts[field], self.fields.index(field)) for field in COUNTED_FIELDS if field in self.fields
+        )
+
+    def _council_code(self, council):
+        code = self._council_lookup.get(council)
+        if code is None:
+            code = len(self.councils)
+            self.councils.append(sys.intern(council))
+            self._council_lookup[council] = code
+        return code
+
+    def add(self, row):
+        """Append a row given as a mapping of field name to value"""
+        if not self.fields:
+            self._set_fields(row.keys())
+        self._append([row.get(field) or '' for field in self.fields])
+
+    def _append(self, values):
+        registration_position, council_position, detail_positions = self._positions
+        values = values + [''] * (len(self.fields) - len(values))
+        index = len(self.registration_numbers)
+        registration_number = values[registration_position]
+        council_code = self._council_code(values[council_position])
+
+        self.registration_numbers.append(registration_number)
+        self.council_codes.append(council_code)
+        self.details.append(FIELD_SEPARATOR.join(values[position] for position in detail_positions))
+        for counts, position in self._counted_positions:
+            if values[position]:
+                counts[values[position]] += 1
+
+        # Index the first row per registration number, and per (number, council)
+        # only where it differs from that first row's council
+        if not registration_number:
+            return
+        normalized = normalize_registration_number(registration_number)
+        if normalized is not registration_number:
+            first = self.by_normalized.setdefault(normalized, index)
+            if first != index and self.council_codes[first] != council_code:
+                self.by_normalized_and_council.setdefault((normalized, council_code), index)
+        first = self.by_registration.setdefault(registration_number, index)
+        if first != index and self.council_codes[first] != council_code:
+            self.by_registration_and_council.setdefault((registration_number, council_code), index)
+
+    def registration_number_of(self, index):
+        return self.registration_numbers[index]
+
+    def council_of(self, index):
+        return self.councils[self.council_codes[index]]
+
+    def details_of(self, index):
+        return self.details[index]
+
+    def record(self, index):
+        return DoctorRecord(self, index)
+
+    def value_counts(self, field):
+        """Return the number of rows per non-empty value of a field"""
+        if field in self.counts:
+            return dict(self.counts[field])
+        return dict(Counter(value for value in (doctor.get(field) for doctor in self) if value))
+
+    def find(self, registration_number=None, state_medical_council=None, normalized=True):
+        """
+        Find a doctor by registration number, preferring the row registered
+        with the given state medical council
+
+        Without an exact match, and unless normalized is False, the canonical
+        form is tried, e.g. "APMC/0092179" for "92179". Councils number their
+        doctors separately, so a canonical match must then be registered with
+        the given council.
+
+        Returns:
+            DoctorRecord: The matching row, or None
+        """
+        if not registration_number:
+            return None
+        index = self.by_registration.get(registration_number)
+        if index is not None:
+            return DoctorRecord(self, self._with_council(
+                index, self.by_registration_and_council, registration_number, state_medical_council
+            ))
+        if not normalized:
+            return None
+        key = normalize_registration_number(registration_number)
+        for by_number, by_number_and_council in (
+            (self.by_registration, self.by_registration_and_council),
+            (self.by_normalized, self.by_normalized_and_council),
+        ):
+            index = by_number.get(key)
+            if index is None:
+                continue
+            index = self._with_council(index, by_number_and_council, key, state_medical_council)
+            if not state_medical_council or self.council_of(index) == state_medical_council:
+                return DoctorRecord(self, index)
+        return None
+
+    def _with_council(self, index, by_number_and_council, key, state_medical_council):
+        """The row for key registered with the council when the first row isn't"""
+        if state_medical_council and self.council_of(index) != state_medical_council:
+            council_code = self._council_lookup.get(state_medical_council)
+            index = by_number_and_council.get((key, council_code), index)
+        return index
+
+    def build_near_matches(self):
+        """Build the near-match index for suggest(), once, if it isn't built yet"""
+        with self._near_matches_lock:
+            if self._near_matches is None:
+                self._near_matches = NearMatchIndex(
+                    (normalize_registration_number(number), index) for number, index in self.by_registration.items()
+                )
+        return self._near_matches
+
+    def suggest(self, registration_number, limit=5):
+        """
+        Rank the rows whose normalized registration number is closest to the
+        given one
+
+        Returns:
+            list: (DoctorRecord, edit distance) pairs, closest first
+        """
+        near_matches = self._near_matches
+        if near_matches is None:
+            near_matches = self.build_near_matches()
+        normalized = normalize_registration_number(registration_number)
+        return [(DoctorRecord(self, index), distance) for index, distance in near_matches.search(normalized, limit)]
+
+    def __len__(self):
+        return len(self.registration_numbers)
+
+    def __iter__(self):
+        return (DoctorRecord(self, index) for index in range(len(self)))
+
+
+class DatabaseRegistry:
+    """
+    Registry rows stored in the RegistryDoctor table (see
+    `manage.py import_doctor_registry`), queried through its unique index
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def find(self, registration_number=None, state_medical_council=None, normalized=True):
+        """
+        Find a doctor by registration number, preferring the row registered
+        with the given state medical council; see DoctorRegistry.find() for
+        the canonical form fallback
+
+        Returns:
+            dict: The matching row, or None
+        """
+        if not registration_number:
+            return None
+        rows = self.queryset.filter(registration_number=registration_number).order_by('row_number')
+        doctor = None
+        if state_medical_council:
+            doctor = rows.filter(state_medical_council=state_medical_council).first()
+        if doctor is None:
+            doctor = rows.first()
+        if doctor is None and normalized:
+            rows = self.queryset.filter(
+                normalized_registration_number=normalize_registration_number(registration_number)
+            ).order_by('row_number')
+            if state_medical_council:
+                rows = rows.filter(state_medical_council=state_medical_council)
+            doctor = rows.first()
+        return doctor.as_record() if doctor is not None else None
+
+    def suggest(self, registration_number, limit=5):
+        """
+        Rank rows sharing a prefix or suffix with the normalized registration
+        number by edit distance
+
+        Both are range scans of an index: prefixes on the normalized number,
+        suffixes as prefixes of the reversed one (LIKE can't use either index).
+
+        Returns:
+            list: (dict, edit distance) pairs, closest first
+        """
+        normalized = normalize_registration_number(registration_number)
+        if not normalized:
+            return []
+        anchor = max(len(normalized) - 2, 1)
+        candidates = []
+        for field, prefix in (
+            ('normalized_registration_number', normalized[:anchor]),
+            ('reversed_registration_number', normalized[::-1][:anchor]),
+        ):
+            candidates.extend(self.queryset.filter(**{
+                f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END,
+            }).order_by('row_number')[:NearMatchIndex.WINDOW * 2])
+        candidates.sort(key=lambda doctor: doctor.row_number)
+        ranked = {}
+        for doctor in candidates:
+            distance = edit_distance(normalized, doctor.normalized_registration_number)
+            if distance <= 2 and doctor.normalized_registration_number not in ranked:
+                ranked[doctor.normalized_registration_number] = (distance, doctor)
+        ordered = sorted(ranked.values(), key=lambda item: item[0])[:limit]
+        return [(doctor.as_record(), distance) for distance, doctor in ordered]
+
+    def value_counts(self, field):
+        """Return the number of rows per non-empty value of a column"""
+        return dict(
+            self.queryset.exclude(**{field: ''}).order_by().values_list(field).annotate(rows=models.Count('pk'))
+        )
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def __iter__(self):
+        return (doctor.as_record() for doctor in self.queryset.order_by('row_number').iterator())
@@ -0,0 +1,344 @@
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Exists, OuterRef
+from django.utils.functional import cached_property
+
+from .cache import LRUCache
+from .phonetic import phonetic_key
+
+SEARCH_PAGE_SIZE = 20
+SUGGESTION_LIMIT = 8
+# No search pages past this many results; narrow the query instead
+SEARCH_RESULTS_LIMIT = 200
+# Sorts after any character a term can hold, closing a prefix range
+PREFIX_END = '\U0010ffff'
+# Shorter phonetic keys ('ar' for Iyer) sound like too many names to search by
+PHONETIC_MIN_KEY = 2
+
+# Brahmic vowel signs aren't \w; keep them, and split only at the danda
+_WORD = re.compile(r'[\w\u0900-\u0963\u0966-\u0d7f]+')
+# Patient IDs are PT and eight hex digits; 'Ptolemy' is still a name
+_PATIENT_ID = re.compile(r'PT[0-9A-F]{0,8}', re.IGNORECASE)
+
+
+def normalize(text):
+    """Casefold and strip accents, so 'Émile' and 'emile' index the same"""
+    text = unicodedata.normalize('NFKD', text or '').casefold()
+    return ''.join(character for character in text if not unicodedata.combining(character))
+
+
+def name_tokens(text):
+    return _WORD.findall(normalize(text))
+
+
+def patient_terms(patient):
+    """Return the {(kind, term)} a patient is found by"""
+    from .models import PatientSearchTerm
+
+    terms = set()
+    for token in name_tokens(f"{patient.first_name} {patient.last_name}"):
+        terms.add((PatientSearchTerm.NAME, token))
+        key = phonetic_key(token)
+        if key:
+            # Also found by other spellings of the name, ranked after exact ones
+            terms.add((PatientSearchTerm.PHONETIC, key))
+    email = normalize(patient.email).strip()
+    if email:
+        terms.add((PatientSearchTerm.EMAIL, email))
+        if '@' in email:
+            # Also found by domain, when the query starts with '@'
+            terms.add((PatientSearchTerm.EMAIL, email[email.index('@'):]))
+    return terms
+
+
+def _prefix(field, value):
+    return {f'{field}__gte': value, f'{field}__lt': value + PREFIX_END}
+
+
+class SearchPage:
+    """
+    One page of patient search results
+
+    `next_cursor` resumes the search after the last patient shown (None on
+    the last page). `count` is only computed when read, and stops at
+    SEARCH_RESULTS_LIMIT + 1 rows, so even a one-letter query costs a bounded
+    index scan; `count_capped` says the real count is higher. `matches` holds
+    one queryset per rank of results.
+    """
+
+    def __init__(self, patients, next_cursor, offset, matches):
+        self.patients = patients
+        self.next_cursor = next_cursor
+        self.offset = offset
+        self._matches = matches
+
+    @cached_property
+    def count(self):
+        count = 0
+        for matches in self._matches:
+            if count > SEARCH_RESULTS_LIMIT:
+                break
+            count += matches.order_by()[:SEARCH_RESULTS_LIMIT + 1 - count].count()
+        return count
+
+    @property
+    def count_capped(self):
+        return self.count > SEARCH_RESULTS_LIMIT
+
+    @property
+    def first(self):
+        return self.offset + 1
+
+    @property
+    def last(self):
+        return self.offset + len(self.patients)
+
+    def __iter__(self):
+        return iter(self.patients)
+
+    def __len__(self):
+        return len(self.patients)
+
+
+def _dump_cursor(kind, tokens, position, offset):
+    return signing.dumps([kind, tokens, position, offset], salt='patients.search')
+
+
+def _load_cursor(cursor, kind, tokens):
+    """
+    Return (position, offset) from a cursor; a missing or tampered cursor, or
+    one from another query (its position has another shape), starts over
+    """
+    if not cursor:
+        return None, 0
+    try:
+        cursor_kind, cursor_tokens, position, offset = signing.loads(cursor, salt='patients.search')
+    except (signing.BadSignature, TypeError, ValueError):
+        return None, 0
+    if cursor_kind != kind or cursor_tokens != tokens:
+        return None, 0
+    return position, offset
+
+
+def _parse(query):
+    """
+    Return (kind, tokens) for a query: kind is None for patient ID queries,
+    otherwise the PatientSearchTerm kind its tokens are looked up as
+    """
+    from .models import PatientSearchTerm
+
+    if _PATIENT_ID.fullmatch(query):
+        return None, [query.upper()]
+    if '@' in query:
+        return PatientSearchTerm.EMAIL, [normalize(query)]
+    # The longest word is the most selective; the others must match the same patient
+    return PatientSearchTerm.NAME, sorted(name_tokens(query), key=len, reverse=True)
+
+
+def _term_matches(kind, tokens, prefix=True):
+    """
+    Term rows of patients matching every token, one row per patient: the
+    patient's first term (in index order) that starts with tokens[0], or
+    equals it when prefix is False
+    """
+    from .models import PatientSearchTerm
+
+    terms = PatientSearchTerm.objects.filter(kind=kind)
+    if prefix:
+        matches = terms.filter(**_prefix('term', tokens[0])).exclude(Exists(terms.filter(
+            patient=OuterRef('patient'), term__gte=tokens[0], term__lt=OuterRef('term'),
+        )))
+    else:
+        matches = terms.filter(term=tokens[0])
+    for token in tokens[1:]:
+        lookup = _prefix('term', token) if prefix else {'term': token}
+        matches = matches.filter(Exists(terms.filter(patient=OuterRef('patient'), **lookup)))
+    return matches
+
+
+def _ranked_matches(kind, tokens):
+    """
+    Return [(rank, term matches)], best rank first: for name queries, the
+    patients whose names start with the query words, then the other patients
+    whose names sound like them ('laxmi' finds Lakshmi after any Laxmi).
+    Sounds match whole words, or 'lakshmi' would find every Lakshman.
+    """
+    from .models import PatientSearchTerm
+
+    ranked = [(0, _term_matches(kind, tokens))]
+    keys = [phonetic_key(token) for token in tokens]
+    if kind == PatientSearchTerm.NAME and all(len(key) >= PHONETIC_MIN_KEY for key in keys):
+        names = PatientSearchTerm.objects.filter(kind=PatientSearchTerm.NAME)
+        spelled = [Exists(names.filter(patient=OuterRef('patient'), **_prefix('term', token))) for token in tokens]
+        exact = spelled[0]
+        for condition in spelled[1:]:
+            exact &= condition
+        sounds = _term_matches(PatientSearchTerm.PHONETIC, sorted(keys, key=len, reverse=True), prefix=False)
+        ranked.append((1, sounds.exclude(exact)))
+    return ranked
+
+
+def search_patients(query, cursor=None, page_size=SEARCH_PAGE_SIZE):
+    """
+    Find patients by patient ID prefix, email prefix, or the starts of their
+    name words ('lak iy' finds Lakshmi Iyer), then names that sound like
+    them ('laxmi iyer'), a page at a time
+
+    Every lookup is a range scan over a B-tree index: the patient_id unique
+    index for 'PT...' queries, the PatientSearchTerm (kind, term) index for
+    the rest. Pages follow that index order (patient ID, or rank, matching
+    word then patient), so a page resumes from the cursor with an index seek
+    instead of an OFFSET, and results stop at SEARCH_RESULTS_LIMIT.
+
+    Returns:
+        SearchPage
+    """
+    from .models import Patient
+
+    query = query.strip()
+    kind, tokens = _parse(query) if query else (None, [])
+    position, offset = _load_cursor(cursor, kind, tokens)
+    page_size = min(page_size, SEARCH_RESULTS_LIMIT - offset)
+    if not tokens or page_size <= 0:
+        return SearchPage([], None, offset, [])
+
+    if kind is None:
+        matches = Patient.objects.filter(**_prefix('patient_id', tokens[0]))
+        page = matches.order_by('patient_id')
+        if position:
+            page = page.filter(patient_id__gt=position[0])
+        patients = list(page[:page_size + 1])
+        keys = [[patient.patient_id] for patient in patients]
+        matches = [matches]
+    else:
+        ranked = _ranked_matches(kind, tokens)
+        patients, keys = [], []
+        for rank, rank_matches in ranked:
+            if position and rank < position[0]:
+                continue
+            page = rank_matches.order_by('term', 'patient')
+            if position and rank == position[0]:
+                _, term, patient_pk = position
+                page = page.filter(term__gte=term).exclude(term=term, patient__lte=patient_pk)
+            rows = list(page.values_list('term', 'patient')[:page_size + 1 - len(patients)])
+            found = Patient.objects.in_bulk([patient_pk for _, patient_pk in rows])
+            patients.extend(found[patient_pk] for _, patient_pk in rows if patient_pk in found)
+            keys.extend([rank, term, str(patient_pk)] for term, patient_pk in rows if patient_pk in found)
+            if len(patients) > page_size:
+                break
+        matches = [rank_matches for _, rank_matches in ranked]
+
+    next_cursor = None
+    if len(patients) > page_size:
+        patients = patients[:page_size]
+        if offset + page_size < SEARCH_RESULTS_LIMIT:
+            next_cursor = _dump_cursor(kind, tokens, keys[page_size - 1], offset + page_size)
+    return SearchPage(patients, next_cursor, offset, matches)
+
+
+_suggestions = LRUCache(
+    getattr(settings, 'SEARCH_SUGGESTION_CACHE_SIZE', 2048), getattr(settings, 'SEARCH_SUGGESTION_CACHE_TTL', 60)
+)
+_index_generation = object()
+
+
+def forget_suggestions():
+    """
+    Drop this process's cached suggestions after the search index changed
+
+    Other processes keep theirs for up to SEARCH_SUGGESTION_CACHE_TTL seconds.
+    """
+    global _index_generation
+    _index_generation = object()
+
+
+def _suggestion_matches(kind, tokens, entry):
+    """Whether a cached suggestion also matches a longer query, and its place in index order"""
+    if kind is None:
+        return entry['patient_id'].startswith(tokens[0]), (entry['patient_id'],)
+    terms = entry['terms'][kind]
+    for token in tokens[1:]:
+        if not any(term.startswith(token) for term in terms):
+            return False, None
+    first = [term for term in terms if term.startswith(tokens[0])]
+    return bool(first), (min(first, default=''), entry['id'].replace('-', ''))
+
+
+def _query_suggestions(kind, tokens, limit):
+    from .models import Patient, PatientSearchTerm
+
+    if kind is None:
+        patients = Patient.objects.filter(**_prefix('patient_id', tokens[0])).order_by('patient_id')
+        rows = list(patients.values('id', 'patient_id', 'first_name', 'last_name')[:limit + 1])
+    else:
+        patient_pks = list(
+            _term_matches(kind, tokens).order_by('term', 'patient').values_list('patient', flat=True)[:limit + 1]
+        )
+        found = {row['id']: row for row in Patient.objects.filter(pk__in=patient_pks).values(
+            'id', 'patient_id', 'first_name', 'last_name'
+        )}
+        rows = [found[patient_pk] for patient_pk in patient_pks if patient_pk in found]
+
+    entries = {
+        row['id']: {
+            'id': str(row['id']),
+            'patient_id': row['patient_id'],
+            'name': f"{row['first_name']} {row['last_name']}",
+            'terms': {kind: [] for kind, _ in PatientSearchTerm.KINDS},
+        }
+        for row in rows[:limit]
+    }
+    for patient_pk, term_kind, term in PatientSearchTerm.objects.filter(patient__in=list(entries)).values_list(
+        'patient', 'kind', 'term'
+    ):
+        entries[patient_pk]['terms'][term_kind].append(term)
+    return {'entries': list(entries.values()), 'complete': len(rows) <= limit}
+
+
+def suggest_patients(query, limit=SUGGESTION_LIMIT):
+    """
+    The first `limit` patients a partly typed query finds, for typeahead
+
+    Results are cached per normalized query. A query that extends an earlier
+    one whose results were complete (fewer than `limit` matches) is answered
+    by filtering those in memory, so narrowing a query by typing more of it
+    doesn't touch the database.
+
+    Returns:
+        dict: 'results', a list of {'id', 'patient_id', 'name'} in the same
+        order search_patients() uses, and 'complete', False when there are
+        more matches than were returned
+    """
+    key = ' '.join(normalize(query).split())
+    kind, tokens = _parse(key)
+    if not tokens:
+        return {'results': [], 'complete': True}
+
+    generation = _index_generation
+    cached = _suggestions.get((key, limit), generation)
+    if cached is None:
+        for end in range(len(key) - 1, 0, -1):
+            shorter = _suggestions.get((key[:end], limit), generation)
+            if shorter is None or not shorter['complete'] or _parse(key[:end])[0] != kind:
+                continue
+            ranked = []
+            for entry in shorter['entries']:
+                matched, order = _suggestion_matches(kind, tokens, entry)
+                if matched:
+                    ranked.append((order, entry))
+            ranked.sort(key=lambda item: item[0])
+            cached = {'entries': [entry for _, entry in ranked], 'complete': True}
+            break
+        else:
+            cached = _query_suggestions(kind, tokens, limit)
+        _suggestions.set((key, limit), cached, generation)
+
+    return {
+        'results': [
+            {field: entry[field] for field in ('id', 'patient_id', 'name')} for entry in cached['entries']
+        ],
+        'complete': cached['complete'],
+    }
@@ -0,0 +1,292 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Sequence
+
+from .registry import COUNTED_FIELDS, DoctorRecord, NearMatchIndex, normalize_registration_number
+
+# File layout (little-endian):
+#   header    magic, format version, metadata offset, metadata length
+#   per dataset:
+#     data    registration number + packed detail fields for each row, in sorted order
+#     index   one fixed-width entry per row, sorted by registration number (UTF-8 bytes)
+#     aliases normalized registration number + position in the index, for rows whose
+#             number isn't already in canonical form, sorted by normalized number
+#   metadata  JSON: fields, council names, value counts and section offsets per
+#             dataset, source fingerprints
+MAGIC = b'DRSNAP'
+VERSION = 3
+HEADER = struct.Struct('<6sHQQ')
+ENTRY = struct.Struct('<QIII')  # data offset, registration number length, details length, council code
+ALIAS = struct.Struct('<QII')  # normalized number offset, normalized number length, index position
+
+DATASETS = ('active', 'blacklisted')
+
+
+def _write_dataset(file, registry):
+    """Write the data and index sections of one registry; return its metadata"""
+    encoded = [registry.registration_number_of(index).encode('utf-8') for index in range(len(registry))]
+    order = sorted(range(len(registry)), key=lambda index: (encoded[index], index))
+
+    offsets = array('Q')
+    lengths = array('I')
+    for index in order:
+        details = registry.details_of(index).encode('utf-8')
+        offsets.append(file.tell())
+        lengths.append(len(details))
+        file.write(encoded[index])
+        file.write(details)
+
+    index_offset = file.tell()
+    for position, index in enumerate(order):
+        file.write(ENTRY.pack(
+            offsets[position], len(encoded[index]), lengths[position], registry.council_codes[index]
+        ))
+
+    aliases = []
+    for position, index in enumerate(order):
+        registration_number = registry.registration_number_of(index)
+        normalized = normalize_registration_number(registration_number)
+        if registration_number and normalized != registration_number:
+            aliases.append((normalized.encode('utf-8'), position))
+    aliases.sort()
+    alias_offsets = array('Q')
+    for normalized, _ in aliases:
+        alias_offsets.append(file.tell())
+        file.write(normalized)
+    aliases_offset = file.tell()
+    for (normalized, position), offset in zip(aliases, alias_offsets):
+        file.write(ALIAS.pack(offset, len(normalized), position))
+
+    return {
+        'fields': list(registry.fields),
+        'detail_fields': list(registry.detail_fields),
+        'councils': list(registry.councils),
+        'counts': {field: registry.value_counts(field) for field in COUNTED_FIELDS},
+        'count': len(order),
+        'index_offset': index_offset,
+        'alias_count': len(aliases),
+        'aliases_offset': aliases_offset,
+    }
+
+
+def write_snapshot(file_path, active_doctors, blacklisted_doctors, sources=None):
+    """
+    Compile two DoctorRegistry instances into a snapshot file
+
+    The file is written next to the destination and renamed into place, so
+    processes that already have the old snapshot mapped keep reading it.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            datasets = {
+                name: _write_dataset(file, registry)
+                for name, registry in zip(DATASETS, (active_doctors, blacklisted_doctors))
+            }
+            metadata = json.dumps({'datasets': datasets, 'sources': sources or {}}).encode('utf-8')
+            metadata_offset = file.tell()
+            file.write(metadata)
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, metadata_offset, len(metadata)))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class _RegistrationKeys(Sequence):
+    """Registration numbers of a snapshot dataset as bytes, for bisect"""
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    def __getitem__(self, index):
+        return self._registry._registration_bytes(index)
+
+    def __len__(self):
+        return len(self._registry)
+
+
+class _AliasKeys(Sequence):
+    """Normalized registration numbers of a snapshot's alias section, for bisect"""
+
+    def __init__(self, registry):
+        self._registry = registry
+
+    def __getitem__(self, index):
+        return self._registry._alias(index)[0]
+
+    def __len__(self):
+        return self._registry._alias_count
+
+
+class SnapshotRegistry:
+    """
+    Read-only registry backed by one dataset of a memory-mapped snapshot
+
+    Offers the same lookups as DoctorRegistry; find() is a binary search over
+    the sorted index, and nothing is decoded until a record is read.
+    """
+
+    def __init__(self, buffer, section):
+        self._buffer = buffer
+        self._count = section['count']
+        self._index_offset = section['index_offset']
+        self._keys = _RegistrationKeys(self)
+        self._alias_count = section['alias_count']
+        self._aliases_offset = section['aliases_offset']
+        self._alias_keys = _AliasKeys(self)
+        self._near_matches = None
+        self._near_matches_lock = threading.Lock()
+        self.fields = tuple(section['fields'])
+        self.detail_fields = tuple(section['detail_fields'])
+        self.councils = [sys.intern(council) for council in section['councils']]
+        self._council_lookup = {council: code for code, council in enumerate(self.councils)}
+        self.counts = section['counts']
+
+    def _entry(self, index):
+        return ENTRY.unpack_from(self._buffer, self._index_offset + index * ENTRY.size)
+
+    def _registration_bytes(self, index):
+        offset, registration_length, _, _ = self._entry(index)
+        return self._buffer[offset:offset + registration_length]
+
+    def _alias(self, position):
+        offset, length, index = ALIAS.unpack_from(self._buffer, self._aliases_offset + position * ALIAS.size)
+        return self._buffer[offset:offset + length], index
+
+    def _position(self, key, keys, count):
+        position = bisect_left(keys, key)
+        if position < count and keys[position] == key:
+            return position
+        return None
+
+    def registration_number_of(self, index):
+        return self._registration_bytes(index).decode('utf-8')
+
+    def council_of(self, index):
+        return self.councils[self._entry(index)[3]]
+
+    def details_of(self, index):
+        offset, registration_length, details_length, _ = self._entry(index)
+        start = offset + registration_length
+        return self._buffer[start:start + details_length].decode('utf-8')
+
+    def record(self, index):
+        return DoctorRecord(self, index)
+
+    def value_counts(self, field):
+        """Return the number of rows per non-empty value of a field"""
+        if field in self.counts:
+            return dict(self.counts[field])
+        return dict(Counter(value for value in (doctor.get(field) for doctor in self) if value))
+
+    def find(self, registration_number=None, state_medical_council=None, normalized=True):
+        """
+        Find a doctor by registration number, preferring the row registered
+        with the given state medical council; see DoctorRegistry.find() for
+        the canonical form fallback
+
+        Returns:
+            DoctorRecord: The matching row, or None
+        """
+        if not registration_number:
+            return None
+        key = registration_number.encode('utf-8')
+        index = self._position(key, self._keys, self._count)
+        if index is not None:
+            match = self._with_council(index, key, state_medical_council)
+            return DoctorRecord(self, index if match is None else match)
+        if not normalized:
+            return None
+
+        key = normalize_registration_number(registration_number).encode('utf-8')
+        index = self._position(key, self._keys, self._count)
+        if index is not None:
+            index = self._with_council(index, key, state_medical_council)
+            if index is not None:
+                return DoctorRecord(self, index)
+        position = self._position(key, self._alias_keys, self._alias_count)
+        while position is not None and position < self._alias_count and self._alias_keys[position] == key:
+            index = self._alias(position)[1]
+            if not state_medical_council or self.council_of(index) == state_medical_council:
+                return DoctorRecord(self, index)
+            position += 1
+        return None
+
+    def _with_council(self, index, key, state_medical_council):
+        """The first row from index on with key and the council (index without one), or None"""
+        if not state_medical_council:
+            return index
+        council_code = self._council_lookup.get(state_medical_council)
+        while index < self._count and self._keys[index] == key:
+            if self._entry(index)[3] == council_code:
+                return index
+            index += 1
+        return None
+
+    def build_near_matches(self):
+        """Build the in-memory near-match index for suggest(), once, if it isn't built yet"""
+        with self._near_matches_lock:
+            if self._near_matches is None:
+                self._near_matches = NearMatchIndex(
+                    (normalize_registration_number(self.registration_number_of(index)), index)
+                    for index in range(self._count)
+                    if index == 0 or self._keys[index] != self._keys[index - 1]
+                )
+        return self._near_matches
+
+    def suggest(self, registration_number, limit=5):
+        """
+        Rank the rows whose normalized registration number is closest to the
+        given one
+
+        Returns:
+            list: (DoctorRecord, edit distance) pairs, closest first
+        """
+        near_matches = self._near_matches
+        if near_matches is None:
+            near_matches = self.build_near_matches()
+        normalized = normalize_registration_number(registration_number)
+        return [(DoctorRecord(self, index), distance) for index, distance in near_matches.search(normalized, limit)]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (DoctorRecord(self, index) for index in range(self._count))
+
+
+class RegistrySnapshot:
+    """
+    A compiled snapshot opened with mmap
+
+    The pages are shared through the page cache by every process that maps the
+    same file, so workers don't each hold a private copy of the registry.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._buffer) < HEADER.size:
+            raise ValueError(f'{file_path} is not a doctor registry snapshot')
+        magic, version, metadata_offset, metadata_length = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{file_path} is not a doctor registry snapshot')
+        if version != VERSION:
+            raise ValueError(f'Unsupported doctor registry snapshot version {version}')
+
+        metadata = json.loads(self._buffer[metadata_offset:metadata_offset + metadata_length])
+        self.sources = metadata['sources']
+        self.active_doctors = SnapshotRegistry(self._buffer, metadata['datasets']['active'])
+        self.blacklisted_doctors = SnapshotRegistry(self._buffer, metadata['datasets']['blacklisted'])
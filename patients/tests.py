@@ -1,3 +1,828 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from authentication import session_backend
+from doctors.models import Doctor
+
+from . import qr
+from .batches import chunk_total, keyset_batches, read_ahead, submit_chunks
+from .cache import LRUCache
+from .cards import card_item, card_sheets_pdf, compose_cards
+from .models import Patient, PatientSearchTerm
+from .payload import b45decode, b45encode, decode_payload
+from .phonetic import phonetic_key
+from .search import normalize, search_patients
+from .registry import DoctorRegistry, NearMatchIndex, edit_distance, normalize_registration_number
+from .snapshot import RegistrySnapshot, SnapshotRegistry, write_snapshot
+from .utils import DoctorValidationService
+
+
+class DoctorRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = DoctorRegistry([
+            {'registration_number': '100', 'state_medical_council': 'Delhi Medical Council', 'name': 'A'},
+            {'registration_number': '100', 'state_medical_council': 'Karnataka Medical Council', 'name': 'B'},
+            {'registration_number': '200', 'state_medical_council': 'Delhi Medical Council', 'name': 'C'},
+        ])
+
+    def test_find_prefers_matching_council(self):
+        self.assertEqual(self.registry.find('100', 'Karnataka Medical Council')['name'], 'B')
+
+    def test_find_falls_back_to_registration_number(self):
+        self.assertEqual(self.registry.find('100')['name'], 'A')
+        self.assertEqual(self.registry.find('200', 'Other')['name'], 'C')
+
+    def test_record_exposes_all_fields(self):
+        record = self.registry.find('200')
+        self.assertEqual(record.registration_number, '200')
+        self.assertEqual(dict(record), {
+            'registration_number': '200',
+            'state_medical_council': 'Delhi Medical Council',
+            'name': 'C',
+        })
+
+    def test_value_counts(self):
+        self.assertEqual(self.registry.value_counts('state_medical_council'), {
+            'Delhi Medical Council': 2,
+            'Karnataka Medical Council': 1,
+        })
+        self.assertEqual(self.registry.value_counts('name'), {'A': 1, 'B': 1, 'C': 1})
+
+    def test_find_miss(self):
+        self.assertIsNone(self.registry.find('300', 'Delhi Medical Council'))
+        self.assertIsNone(self.registry.find(None, 'Delhi Medical Council'))
+
+
+class RegistrationNumberMatchingTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = DoctorRegistry([
+            {'registration_number': '92179', 'state_medical_council': 'Andhra Pradesh Medical Council', 'name': 'A'},
+            {'registration_number': 'KMC/004521', 'state_medical_council': 'Karnataka Medical Council', 'name': 'B'},
+            {'registration_number': '46698', 'state_medical_council': 'Andhra Pradesh Medical Council', 'name': 'C'},
+        ])
+
+    def test_normalize_registration_number(self):
+        self.assertEqual(normalize_registration_number('APMC/0092179'), '92179')
+        self.assertEqual(normalize_registration_number(' 92 179 '), '92179')
+        self.assertEqual(normalize_registration_number('kmc-12'), '12')
+        self.assertEqual(normalize_registration_number('TESTab-12'), 'TESTAB12')
+
+    def test_find_normalizes_both_sides(self):
+        self.assertEqual(self.registry.find('APMC 0092179')['name'], 'A')
+        self.assertEqual(self.registry.find('4521', 'Karnataka Medical Council')['name'], 'B')
+
+    def test_suggest_ranks_near_matches(self):
+        suggestions = self.registry.suggest('92197')
+        self.assertEqual([(doctor['name'], distance) for doctor, distance in suggestions], [('A', 1)])
+        self.assertEqual(self.registry.suggest('4621')[0][0]['name'], 'B')
+        self.assertEqual(self.registry.suggest('11111'), [])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('92179', '92179'), 0)
+        self.assertEqual(edit_distance('92179', '29179'), 1)
+        self.assertEqual(edit_distance('92179', '9279'), 1)
+        self.assertEqual(edit_distance('92179', '921795'), 1)
+        self.assertEqual(edit_distance('92179', '82170'), 2)
+        self.assertEqual(edit_distance('', '12'), 2)
+
+
+class RegistrySnapshotTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.snapshot_path = os.path.join(directory, 'registry.snap')
+        active_doctors = DoctorRegistry([
+            {'registration_number': '300', 'state_medical_council': 'Delhi Medical Council', 'name': 'A'},
+            {'registration_number': '100', 'state_medical_council': 'Delhi Medical Council', 'name': 'B'},
+            {'registration_number': '100', 'state_medical_council': 'Karnataka Medical Council', 'name': 'C'},
+            {'registration_number': 'APMC-0042', 'state_medical_council': 'Andhra Pradesh Medical Council', 'name': 'D'},
+        ])
+        write_snapshot(self.snapshot_path, active_doctors, DoctorRegistry(), {'source.csv': {'stat': [1, 2]}})
+        self.snapshot = RegistrySnapshot(self.snapshot_path)
+
+    def test_find_matches_in_memory_registry(self):
+        registry = self.snapshot.active_doctors
+        self.assertEqual(len(registry), 4)
+        self.assertEqual(registry.find('100')['name'], 'B')
+        self.assertEqual(registry.find('100', 'Karnataka Medical Council')['name'], 'C')
+        self.assertEqual(registry.find('300', 'Other')['name'], 'A')
+        self.assertIsNone(registry.find('200'))
+        self.assertIsNone(self.snapshot.blacklisted_doctors.find('100'))
+        self.assertEqual(registry.value_counts('state_medical_council'), {
+            'Delhi Medical Council': 2,
+            'Karnataka Medical Council': 1,
+            'Andhra Pradesh Medical Council': 1,
+        })
+
+    def test_normalized_lookups(self):
+        registry = self.snapshot.active_doctors
+        self.assertEqual(registry.find('0100', 'Karnataka Medical Council')['name'], 'C')
+        self.assertEqual(registry.find('42')['name'], 'D')
+        self.assertEqual(registry.suggest('43')[0][0]['name'], 'D')
+
+    def test_sources_round_trip(self):
+        self.assertEqual(self.snapshot.sources, {'source.csv': {'stat': [1, 2]}})
+
+    def test_rejects_other_files(self):
+        with open(self.snapshot_path, 'wb') as file:
+            file.write(b'registration_number,state_medical_council\n' * 4)
+        with self.assertRaises(ValueError):
+            RegistrySnapshot(self.snapshot_path)
+
+
+class DoctorValidationServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.service = DoctorValidationService(
+            DoctorRegistry([{'registration_number': '100', 'state_medical_council': 'Delhi Medical Council'}]),
+            DoctorRegistry([{'registration_number': '900', 'state_medical_council': 'Delhi Medical Council'}]),
+        )
+
+    def test_validate_doctor(self):
+        self.assertEqual(self.service.validate_doctor('100', 'Delhi Medical Council')['status'], 'AUTHORIZED')
+        self.assertEqual(self.service.validate_doctor('900', 'Delhi Medical Council')['status'], 'BLACKLISTED')
+        self.assertEqual(self.service.validate_doctor('500', 'Delhi Medical Council')['status'], 'NOT_FOUND')
+
+    def test_exact_number_outranks_canonical_match_in_other_list(self):
+        # Councils number their doctors separately: MMC's 12345 isn't APMC12345
+        active_doctors = DoctorRegistry([
+            {'registration_number': 'APMC12345', 'state_medical_council': 'Andhra Pradesh Medical Council'},
+        ])
+        blacklisted_doctors = DoctorRegistry([
+            {'registration_number': '12345', 'state_medical_council': 'Maharashtra Medical Council'},
+        ])
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        snapshot_path = os.path.join(directory, 'registry.snap')
+        write_snapshot(snapshot_path, active_doctors, blacklisted_doctors)
+        snapshot = RegistrySnapshot(snapshot_path)
+
+        for datasets in ((active_doctors, blacklisted_doctors), (snapshot.active_doctors, snapshot.blacklisted_doctors)):
+            service = DoctorValidationService(*datasets)
+            result = service.validate_doctor('APMC12345', 'Andhra Pradesh Medical Council')
+            self.assertEqual(result['status'], 'AUTHORIZED')
+            self.assertEqual(service.validate_doctor('APMC12345')['status'], 'AUTHORIZED')
+            self.assertEqual(service.get_doctor_details('APMC12345')['status'], 'ACTIVE')
+            # A canonical form match must be registered with the given council
+            self.assertEqual(service.validate_doctor('APMC/012345', 'Andhra Pradesh Medical Council')['status'], 'AUTHORIZED')
+            self.assertEqual(service.validate_doctor('012345', 'Karnataka Medical Council')['status'], 'NOT_FOUND')
+            self.assertEqual(service.validate_doctor('MMC 012345', 'Maharashtra Medical Council')['status'], 'BLACKLISTED')
+
+    def test_validate_many(self):
+        results = self.service.validate_many([
+            ('100', 'Delhi Medical Council'), ('900', None), ('500', None),
+        ])
+        self.assertEqual([result['status'] for result in results], ['AUTHORIZED', 'BLACKLISTED', 'NOT_FOUND'])
+
+    def test_statistics_are_cached_per_snapshot(self):
+        statistics = self.service.get_statistics()
+        self.assertEqual(statistics['total_active_doctors'], 1)
+        self.assertEqual(statistics['active_by_council'], {'Delhi Medical Council': 1})
+        self.assertIs(self.service.get_statistics(), statistics)
+
+    def test_get_doctor_details(self):
+        self.assertEqual(self.service.get_doctor_details('100')['status'], 'ACTIVE')
+        self.assertEqual(self.service.get_doctor_details('900')['status'], 'BLACKLISTED')
+        self.assertIsNone(self.service.get_doctor_details('500'))
+
+    def test_results_are_memoized_until_reload(self):
+        self.assertEqual(self.service.validate_doctor('100', 'Delhi Medical Council')['status'], 'AUTHORIZED')
+        self.assertEqual(self.service.validate_doctor('100', 'Delhi Medical Council')['status'], 'AUTHORIZED')
+        self.assertIsNone(self.service.get_doctor_details('500'))
+        self.assertIsNone(self.service.get_doctor_details('500'))
+        self.assertEqual((self.service.results.hits, self.service.results.misses), (2, 2))
+
+        self.service._datasets = (
+            DoctorRegistry(),
+            DoctorRegistry([{'registration_number': '100', 'state_medical_council': 'Delhi Medical Council'}]),
+        )
+        self.assertEqual(self.service.validate_doctor('100', 'Delhi Medical Council')['status'], 'BLACKLISTED')
+
+    def test_memoized_results_keep_exact_matches_apart(self):
+        service = DoctorValidationService(
+            DoctorRegistry([
+                {'registration_number': '012345', 'state_medical_council': 'Delhi Medical Council', 'name': 'Alice'},
+                {'registration_number': '12345', 'state_medical_council': 'Delhi Medical Council', 'name': 'Bob'},
+            ]),
+            DoctorRegistry(),
+        )
+        for _ in range(2):
+            self.assertEqual(service.validate_doctor('012345')['doctor']['name'], 'Alice')
+            self.assertEqual(service.validate_doctor('12345')['doctor']['name'], 'Bob')
+            self.assertEqual(service.get_doctor_details('012345')['doctor']['name'], 'Alice')
+            self.assertEqual(service.get_doctor_details('12345')['doctor']['name'], 'Bob')
+        self.assertEqual(service.results.hits, 4)
+
+    def test_datasets_load_on_first_use(self):
+        service = DoctorValidationService()
+        self.assertFalse(service.is_loaded)
+        service.validate_doctor('100', 'Delhi Medical Council')
+        self.assertTrue(service.is_loaded)
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.stats()['hits'], 3)
+
+    def test_entries_expire(self):
+        cache = LRUCache(ttl=10)
+        with mock.patch('patients.cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with mock.patch('patients.cache.time.monotonic', return_value=105):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('patients.cache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+
+    def test_new_generation_clears_entries(self):
+        cache = LRUCache()
+        old, new = object(), object()
+        cache.get('a', old)
+        cache.set('a', 1, old)
+        self.assertIsNone(cache.get('a', new))
+        cache.set('a', 1, old)
+        self.assertEqual(len(cache), 0)
+
+
+class BatchTests(TestCase):
+    def test_keyset_batches(self):
+        patients = [
+            Patient.objects.create_user(
+                f'patient{i}@example.com', 'secret-pass', first_name='P', last_name=str(i), phone_number=f'8000{i}'
+            )
+            for i in range(5)
+        ]
+        pks = sorted(patient.pk for patient in patients)
+        batches = list(keyset_batches(Patient.objects.order_by('-pk'), 2))
+        self.assertEqual([[patient.pk for patient in batch] for batch in batches], [pks[:2], pks[2:4], pks[4:]])
+        batches = list(keyset_batches(Patient.objects.values_list('pk', 'email'), 3))
+        self.assertEqual([[row[0] for row in batch] for batch in batches], [pks[:3], pks[3:]])
+
+    def test_read_ahead_submits_the_next_batch_first(self):
+        events = []
+
+        def submissions():
+            for batch in range(3):
+                events.append(f'submit {batch}')
+                yield batch
+
+        for batch in read_ahead(submissions()):
+            events.append(f'finish {batch}')
+        self.assertEqual(events, ['submit 0', 'submit 1', 'finish 0', 'submit 2', 'finish 1', 'finish 2'])
+
+    def test_submit_chunks_without_pool(self):
+        results = submit_chunks(None, len, list(range(5)), 2)
+        self.assertEqual(results, [2, 2, 1])
+        self.assertEqual(chunk_total(results), 5)
+
+
+class DoctorRegistryReloadTests(SimpleTestCase):
+    HEADER = 'registration_number,state_medical_council,name\n'
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        os.makedirs(os.path.join(self.static_root, 'css'))
+        self.write('active_doctors_clean.csv', '100,Delhi Medical Council,A\n')
+        self.write('blacklisted_doctors_clean.csv', '')
+        self.settings_override = override_settings(
+            STATIC_ROOT=self.static_root,
+            DOCTOR_REGISTRY_RELOAD_MARKER=os.path.join(self.static_root, 'reload'),
+            DOCTOR_REGISTRY_SNAPSHOT=os.path.join(self.static_root, 'registry.snap'),
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def write(self, filename, rows):
+        with open(os.path.join(self.static_root, 'css', filename), 'w', encoding='utf-8') as file:
+            file.write(self.HEADER + rows)
+
+    def test_reload_picks_up_changed_file(self):
+        service = DoctorValidationService()
+        self.assertEqual(service.validate_doctor('200')['status'], 'NOT_FOUND')
+        self.assertFalse(service.reload())
+
+        self.write('blacklisted_doctors_clean.csv', '200,Delhi Medical Council,B\n')
+        self.assertTrue(service.reload())
+        self.assertEqual(service.validate_doctor('200')['status'], 'BLACKLISTED')
+
+    def test_load_builds_suggestion_indexes(self):
+        service = DoctorValidationService()
+        with mock.patch('patients.registry.NearMatchIndex', wraps=NearMatchIndex) as build:
+            service.ensure_loaded()
+            self.assertEqual(build.call_count, 2)
+            self.assertEqual(service.suggest_doctors('101')[0]['doctor']['name'], 'A')
+            self.assertEqual(build.call_count, 2)
+
+    def test_unparsable_file_keeps_current_registry(self):
+        self.write('blacklisted_doctors_clean.csv', '200,Delhi Medical Council,B\n')
+        self.write('active_doctors_clean.csv', '200,Delhi Medical Council,B\n')
+        service = DoctorValidationService()
+        self.assertEqual(service.validate_doctor('200')['status'], 'BLACKLISTED')
+
+        with open(os.path.join(self.static_root, 'css', 'blacklisted_doctors_clean.csv'), 'wb') as file:
+            file.write(self.HEADER.encode() + '200,Delhi Medical Council,Bj\xf6rn\n'.encode('latin-1'))
+        with mock.patch('builtins.print'):
+            self.assertFalse(service.reload())
+        self.assertIsInstance(service.load_error, UnicodeDecodeError)
+        self.assertEqual(service.validate_doctor('200')['status'], 'BLACKLISTED')
+        self.assertTrue(service.has_changed())
+
+        # Fixing the file is picked up by the next check
+        self.write('blacklisted_doctors_clean.csv', '')
+        self.assertTrue(service.reload())
+        self.assertEqual(service.validate_doctor('200')['status'], 'AUTHORIZED')
+
+    def test_touch_without_content_change_does_not_reload(self):
+        service = DoctorValidationService()
+        service.ensure_loaded()
+        file_path = os.path.join(self.static_root, 'css', 'active_doctors_clean.csv')
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertFalse(service.reload())
+
+    def test_reload_marker_forces_reload(self):
+        service = DoctorValidationService()
+        service.ensure_loaded()
+        with open(os.path.join(self.static_root, 'reload'), 'a'):
+            pass
+        self.assertTrue(service.reload())
+
+    def test_loads_up_to_date_snapshot(self):
+        call_command('compile_doctor_registry', stdout=StringIO())
+        service = DoctorValidationService()
+        self.assertEqual(service.validate_doctor('100')['status'], 'AUTHORIZED')
+        self.assertIsInstance(service.active_doctors, SnapshotRegistry)
+
+        # An edited CSV makes the snapshot stale, so the CSVs are used again
+        self.write('blacklisted_doctors_clean.csv', '100,Delhi Medical Council,A\n')
+        self.assertTrue(service.reload())
+        self.assertIsInstance(service.active_doctors, DoctorRegistry)
+        self.assertEqual(service.validate_doctor('100')['status'], 'BLACKLISTED')
+
+
+class QRCodePipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.media_root = media_root
+        media = override_settings(MEDIA_ROOT=media_root, QR_CODE_WORKERS=0, QR_CODE_STORE_IMAGES=True)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_patient(self):
+        return Patient.objects.create_user(
+            'patient@example.com', 'secret-pass', first_name='P', last_name='Q', phone_number='80000'
+        )
+
+    def test_renders_once_per_payload(self):
+        with mock.patch('patients.qr.render_qr_png', wraps=qr.render_qr_png) as render:
+            patient = self.create_patient()
+            patient.save()
+            patient.save(update_fields=['last_login'])
+            self.assertEqual(render.call_count, 1)
+            first_name = patient.qr_code.name
+
+            patient.blood_group = 'O+'
+            patient.save()
+            self.assertEqual(render.call_count, 2)
+
+            # Back to a payload that was rendered before: no new render
+            patient.blood_group = None
+            patient.save()
+            self.assertEqual(render.call_count, 2)
+
+        patient.refresh_from_db()
+        digest = qr.payload_hash(patient.get_qr_data())
+        self.assertEqual(patient.qr_payload_hash, digest)
+        self.assertEqual(patient.qr_code.name, f'qr_codes/{digest}.png')
+        self.assertEqual(patient.qr_code.name, first_name)
+
+    def test_clean_qr_codes_removes_orphans(self):
+        patient = self.create_patient()
+        patient.blood_group = 'O+'
+        patient.save()
+        directory = os.path.join(self.media_root, 'qr_codes')
+        with open(os.path.join(directory, 'qr_PT291CD3F8_1CoqFo6.png'), 'wb') as file:
+            file.write(b'old copy')
+        self.assertEqual(len(os.listdir(directory)), 3)
+
+        call_command('clean_qr_codes', '--min-age=0', stdout=StringIO())
+        self.assertEqual(os.listdir(directory), [os.path.basename(patient.qr_code.name)])
+
+    def test_generate_qr_codes_command(self):
+        with override_settings(QR_CODE_STORE_IMAGES=False):
+            first = self.create_patient()
+            second = Patient.objects.create_user(
+                'second@example.com', 'secret-pass', first_name='S', last_name='T', phone_number='80001'
+            )
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'qr_codes')))
+
+        out = StringIO()
+        call_command('generate_qr_codes', '--workers=0', '--batch-size=1', stdout=out)
+        self.assertIn('2 images rendered, 2 patients updated', out.getvalue())
+        for patient in (first, second):
+            patient.refresh_from_db()
+            self.assertEqual(patient.qr_code.name, qr.qr_code_name(qr.payload_hash(patient.get_qr_data())))
+            self.assertTrue(os.path.exists(patient.qr_code.path))
+
+        out = StringIO()
+        call_command('generate_qr_codes', '--workers=1', '--force', stdout=out)
+        self.assertIn('0 images rendered, 0 patients updated', out.getvalue())
+
+    def test_background_renders_are_deduplicated(self):
+        patient = Patient(patient_id='PT00000001', email='p@example.com', first_name='P', last_name='Q')
+        executor = mock.Mock()
+        with override_settings(QR_CODE_WORKERS=2), mock.patch('patients.qr._get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                qr.schedule_qr_code(patient)
+                qr.schedule_qr_code(patient)
+            self.assertEqual(executor.submit.call_count, 1)
+            patient.blood_group = 'A+'
+            with self.captureOnCommitCallbacks(execute=True):
+                qr.schedule_qr_code(patient)
+            self.assertEqual(executor.submit.call_count, 2)
+        qr._pending.pop(patient.pk, None)
+
+    def test_background_render_waits_for_commit(self):
+        executor = mock.Mock()
+        with override_settings(QR_CODE_WORKERS=2), mock.patch('patients.qr._get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks() as callbacks:
+                patient = self.create_patient()
+                self.assertEqual(executor.submit.call_count, 0)
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+            executor.submit.assert_called_once_with(qr._background_run, patient.pk, mock.ANY, mock.ANY)
+        qr._pending.pop(patient.pk, None)
+
+
+class QRCodeViewTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.media_root = media_root
+        media = override_settings(MEDIA_ROOT=media_root, QR_CODE_WORKERS=0)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.patient = Patient.objects.create_user(
+            'patient@example.com', 'secret-pass', first_name='P', last_name='Q', phone_number='80000'
+        )
+        self.url = reverse('patients:qr_code', args=[self.patient.pk, 'png'])
+
+    def login(self, user):
+        self.client.force_login(user, backend=session_backend(user))
+
+    def create_doctor(self, is_verified):
+        return Doctor.objects.create(
+            email='doctor@example.com', username='doctor', phone_number='80001',
+            nmc_registration_number='100', medical_license_number='LIC100',
+            hospital_name='General Hospital', hospital_address='Main Road', is_verified=is_verified,
+        )
+
+    def test_saving_a_patient_writes_no_image(self):
+        self.patient.blood_group = 'O+'
+        self.patient.save()
+        self.assertFalse(self.patient.qr_code)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'qr_codes')))
+
+    def test_renders_png_with_etag(self):
+        self.login(self.patient)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.patient.blood_group = 'O+'
+        self.patient.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_renders_svg_and_clamps_box_size(self):
+        self.login(self.patient)
+        response = self.client.get(reverse('patients:qr_code', args=[self.patient.pk, 'svg']))
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', response.content)
+        small = self.client.get(self.url, {'box': '0'})
+        large = self.client.get(self.url, {'box': '500'})
+        self.assertIn('-1"', small['ETag'])
+        self.assertIn('-20"', large['ETag'])
+        self.assertEqual(self.client.get(reverse('patients:qr_code', args=[self.patient.pk, 'gif'])).status_code, 404)
+
+    def test_access_is_limited_to_patient_and_verified_doctors(self):
+        other = Patient.objects.create_user(
+            'other@example.com', 'secret-pass', first_name='O', last_name='R', phone_number='80002'
+        )
+        self.login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        doctor = self.create_doctor(is_verified=False)
+        self.login(doctor)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        doctor.is_verified = True
+        doctor.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class SmartCardTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.media_root = media_root
+        media = override_settings(MEDIA_ROOT=media_root, QR_CODE_WORKERS=0)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.patients = [
+            Patient.objects.create_user(
+                f'patient{i}@example.com', 'secret-pass', first_name='P', last_name=str(i), phone_number=f'8000{i}'
+            )
+            for i in range(12)
+        ]
+
+    def test_render_smart_cards_command(self):
+        output = os.path.join(self.media_root, 'cards.pdf')
+        out = StringIO()
+        call_command('render_smart_cards', '--output', output, '--workers=0', '--batch-size=5', stdout=out)
+        self.assertIn('Wrote 12 cards', out.getvalue())
+        self.assertIn('12 composed', out.getvalue())
+        with open(output, 'rb') as file:
+            pdf = file.read()
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
+        self.assertIn(b'/Count 2', pdf)
+        self.assertEqual(pdf.count(b'/Subtype /Image'), 12)
+
+        # Cached cards are reused; only the changed patient's card is composed again
+        self.patients[0].blood_group = 'O+'
+        self.patients[0].save()
+        out = StringIO()
+        call_command(
+            'render_smart_cards', self.patients[0].patient_id, self.patients[1].patient_id,
+            '--output', output, '--workers=1', stdout=out,
+        )
+        self.assertIn('Wrote 2 cards', out.getvalue())
+        self.assertIn('1 composed', out.getvalue())
+
+    def test_clean_qr_codes_removes_old_cards(self):
+        items = [card_item(patient)[1] for patient in self.patients[:2]]
+        compose_cards(items)
+        self.patients[0].blood_group = 'O+'
+        self.patients[0].save()
+        _, current = card_item(self.patients[0])
+        compose_cards([current])
+        directory = os.path.join(self.media_root, 'cards')
+        self.assertEqual(len(os.listdir(directory)), 3)
+
+        call_command('clean_qr_codes', '--min-age=0', '--batch-size=5', stdout=StringIO())
+        self.assertCountEqual(os.listdir(directory), [os.path.basename(current[1]), os.path.basename(items[1][1])])
+
+    def test_pdf_cross_reference_table(self):
+        _, item = card_item(self.patients[0])
+        compose_cards([item])
+        pdf = b''.join(card_sheets_pdf([item[1:]] * 11))
+        startxref = int(pdf.rsplit(b'startxref\n', 1)[1].split()[0])
+        entries = pdf[startxref:].split(b'\n')
+        size = int(entries[1].split()[1])
+        for number in range(1, size):
+            offset = int(entries[2 + number][:10])
+            self.assertTrue(pdf[offset:].startswith(b'%d 0 obj' % number))
+
+    def test_patient_downloads_own_card(self):
+        self.client.force_login(self.patients[0], backend=session_backend(self.patients[0]))
+        response = self.client.get(reverse('patients:smart_card'))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(self.patients[0].patient_id, response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+class CompactPayloadTests(SimpleTestCase):
+    def setUp(self):
+        self.patient = Patient(
+            patient_id='PT1A2B3C4D', first_name='Lakshmi', last_name='Iyer', email='lakshmi@example.com',
+            phone_number='9000000001', blood_group='AB-', date_of_birth='1984-02-29',
+            emergency_contact_name='Ravi Iyer', emergency_contact_phone='9000000002',
+        )
+
+    def test_base45_matches_rfc_9285(self):
+        for data, text in ((b'AB', 'BB8'), (b'Hello!!', '%69 VD92EX0'), (b'ietf!', 'QED8WEX0')):
+            self.assertEqual(b45encode(data), text)
+            self.assertEqual(b45decode(text), data)
+        for text in ('GGW', 'A', 'ab'):
+            with self.assertRaises(ValueError):
+                b45decode(text)
+
+    def test_round_trip(self):
+        payload = self.patient.get_qr_data()
+        self.assertTrue(payload.startswith('PSC:'))
+        fields = decode_payload(payload)
+        self.assertEqual(fields['patient_id'], 'PT1A2B3C4D')
+        self.assertEqual(fields['blood_group'], 'AB-')
+        self.assertEqual(str(fields['date_of_birth']), '1984-02-29')
+        self.assertEqual(fields['emergency_contact_phone'], '9000000002')
+
+        self.patient.blood_group = None
+        self.patient.date_of_birth = None
+        fields = decode_payload(self.patient.get_qr_data())
+        self.assertIsNone(fields['blood_group'])
+        self.assertIsNone(fields['date_of_birth'])
+
+    def test_date_of_birth_range(self):
+        for date_of_birth in ('1900-01-01', '2079-06-05'):
+            self.patient.date_of_birth = date_of_birth
+            self.assertEqual(str(decode_payload(self.patient.get_qr_data())['date_of_birth']), date_of_birth)
+        # Dates the field can't hold, e.g. a mistyped year, are sent as unknown
+        for date_of_birth in ('1899-12-31', '2079-06-06', '2108-03-01'):
+            self.patient.date_of_birth = date_of_birth
+            self.assertIsNone(decode_payload(self.patient.get_qr_data())['date_of_birth'])
+
+    def test_rejects_tampered_payload(self):
+        payload = self.patient.get_qr_data()
+        data = bytearray(b45decode(payload[4:]))
+        data[1] = 7  # blood group O+
+        tampered = 'PSC:' + b45encode(bytes(data))
+        with self.assertRaises(ValueError):
+            decode_payload(tampered)
+        self.assertEqual(decode_payload(tampered, verify=False)['blood_group'], 'O+')
+        with override_settings(SECRET_KEY='another-key'):
+            with self.assertRaises(ValueError):
+                decode_payload(payload)
+
+    def test_accepts_payload_signed_with_fallback_key(self):
+        with override_settings(SECRET_KEY='old-key'):
+            payload = self.patient.get_qr_data()
+        with override_settings(SECRET_KEY='new-key', SECRET_KEY_FALLBACKS=['old-key']):
+            self.assertEqual(decode_payload(payload)['patient_id'], 'PT1A2B3C4D')
+        with override_settings(SECRET_KEY='new-key', SECRET_KEY_FALLBACKS=[]):
+            with self.assertRaises(ValueError):
+                decode_payload(payload)
+
+    def test_compact_payload_needs_a_smaller_qr_code(self):
+        compact = qr._make_qr(self.patient.get_qr_data(), 1)
+        with override_settings(QR_PAYLOAD_FORMAT='text'):
+            text = qr._make_qr(self.patient.get_qr_data(), 1)
+        self.assertLess(compact.modules_count, text.modules_count)
+
+
+class PhoneticKeyTests(SimpleTestCase):
+    def key(self, word):
+        return phonetic_key(normalize(word))
+
+    def test_spellings_share_a_key(self):
+        for spellings in (
+            ['Tejaswini', 'Tejasvini', 'तेजस्विनी'],
+            ['Lakshmi', 'Laxmi', 'लक्ष्मी'],
+            ['Srinivasan', 'Sreenivasan', 'Shrinivasan'],
+            ['Mohammed', 'Muhammad'],
+            ['Krishnan', 'கிருஷ்ணன்'],
+            ['Banerjee', 'Banerji'],
+        ):
+            self.assertEqual(len({self.key(spelling) for spelling in spellings}), 1, spellings)
+
+    def test_different_names_differ(self):
+        self.assertNotEqual(self.key('Lakshmi'), self.key('Lakshman'))
+        self.assertNotEqual(self.key('Ravi'), self.key('Rahul'))
+        self.assertEqual(self.key('-'), '')
+
+
+class PatientSearchTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root, QR_CODE_WORKERS=0)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.lakshmi = Patient.objects.create_user(
+            'Lakshmi.Iyer@Example.com', 'secret-pass', first_name='Lakshmi', last_name='Iyer', phone_number='80001'
+        )
+        self.emile = Patient.objects.create_user(
+            'emile@hospital.org', 'secret-pass', first_name='Émile', last_name='Lakshman', phone_number='80002'
+        )
+
+    def search(self, query):
+        return [patient.pk for patient in search_patients(query)]
+
+    def test_finds_by_name_word_prefixes(self):
+        # In index order: by matching word ('lakshman' < 'lakshmi')
+        self.assertEqual(self.search('laksh'), [self.emile.pk, self.lakshmi.pk])
+        self.assertEqual(self.search('lak iy'), [self.lakshmi.pk])
+        self.assertEqual(self.search('EMILE'), [self.emile.pk])
+        self.assertEqual(self.search('akshmi'), [])
+
+    def test_finds_by_email_and_patient_id_prefix(self):
+        self.assertEqual(self.search('lakshmi.iyer@ex'), [self.lakshmi.pk])
+        self.assertEqual(self.search('@hospital'), [self.emile.pk])
+        self.assertEqual(self.search(self.emile.patient_id[:6].lower()), [self.emile.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.lakshmi.last_name = 'Raman'
+        self.lakshmi.save()
+        self.assertEqual(self.search('iyer'), [])
+        self.assertEqual(self.search('raman'), [self.lakshmi.pk])
+
+        with self.assertNumQueries(1):
+            self.lakshmi.save(update_fields=['last_login'])
+
+        self.lakshmi.delete()
+        self.assertEqual(self.search('raman'), [])
+        self.assertFalse(PatientSearchTerm.objects.filter(term='raman').exists())
+
+    def test_pages_follow_cursor(self):
+        for i in range(5):
+            Patient.objects.create_user(
+                f'ravi{i}@example.com', 'secret-pass', first_name='Ravi', last_name=f'Ravindran {i}', phone_number=f'8100{i}'
+            )
+        seen = []
+        cursor = None
+        while True:
+            page = search_patients('ravi', cursor=cursor, page_size=2)
+            seen.extend(patient.pk for patient in page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        # Each patient once, though both their name words match
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertEqual(page.count, 5)
+        self.assertEqual((page.first, page.last), (5, 5))
+
+        self.assertEqual(len(search_patients('ravi', cursor='tampered', page_size=2)), 2)
+        # A cursor only continues the query it came from
+        cursor = search_patients('ravi', page_size=2).next_cursor
+        self.assertEqual(search_patients('ravindran', cursor=cursor, page_size=2).first, 1)
+        self.assertEqual(list(search_patients('pt', cursor=cursor)), list(search_patients('pt')))
+        id_cursor = search_patients('pt', page_size=2).next_cursor
+        self.assertEqual(list(search_patients('ravi', cursor=id_cursor, page_size=2)), list(search_patients('ravi', page_size=2)))
+        self.assertEqual(len(search_patients('r@example.com', cursor=id_cursor)), 0)
+        with mock.patch('patients.search.SEARCH_RESULTS_LIMIT', 3):
+            page = search_patients('ravi', page_size=2)
+            self.assertTrue(page.count_capped)
+            page = search_patients('ravi', cursor=page.next_cursor, page_size=2)
+            self.assertEqual(len(page), 1)
+            self.assertIsNone(page.next_cursor)
+
+    def test_ranks_exact_spellings_before_sound_alikes(self):
+        laxmi = Patient.objects.create_user(
+            'laxmi@example.com', 'secret-pass', first_name='Laxmi', last_name='Menon', phone_number='80003'
+        )
+        self.assertEqual(self.search('laxmi'), [laxmi.pk, self.lakshmi.pk])
+        self.assertEqual(self.search('lakshmi'), [self.lakshmi.pk, laxmi.pk])
+        self.assertEqual(self.search('laxmi aiyar'), [self.lakshmi.pk])
+        self.assertEqual(search_patients('laxmi').count, 2)
+
+        tejasvini = Patient.objects.create_user(
+            'tejasvini@example.com', 'secret-pass', first_name='तेजस्विनी', last_name='राव', phone_number='80004'
+        )
+        self.assertEqual(self.search('tejaswini'), [tejasvini.pk])
+        self.assertEqual(self.search('तेज'), [tejasvini.pk])
+
+    def test_pages_continue_into_sound_alikes(self):
+        laxmi = Patient.objects.create_user(
+            'laxmi@example.com', 'secret-pass', first_name='Laxmi', last_name='Menon', phone_number='80003'
+        )
+        page = search_patients('laxmi', page_size=1)
+        self.assertEqual(list(page), [laxmi])
+        page = search_patients('laxmi', cursor=page.next_cursor, page_size=1)
+        self.assertEqual(list(page), [self.lakshmi])
+        self.assertIsNone(page.next_cursor)
+
+    def test_rebuild_patient_search(self):
+        terms = set(PatientSearchTerm.objects.values_list('patient', 'kind', 'term'))
+        PatientSearchTerm.objects.all().delete()
+        call_command('rebuild_patient_search', '--batch-size=1', stdout=StringIO())
+        self.assertEqual(self.search('iyer'), [self.lakshmi.pk])
+        self.assertEqual(set(PatientSearchTerm.objects.values_list('patient', 'kind', 'term')), terms)
+
+    def test_index_migration_batches(self):
+        index_patients = import_module('patients.migrations.0006_patientsearchterm').index_patients
+        PatientSearchTerm.objects.all().delete()
+        index_patients(django_apps, None, batch_size=1)
+        self.assertEqual(self.search('iyer'), [self.lakshmi.pk])
+        self.assertEqual(self.search('emile@'), [self.emile.pk])
+
+    def test_phonetic_migration_matches_live_terms(self):
+        tejasvini = Patient.objects.create_user(
+            'tejasvini@example.com', 'secret-pass', first_name='तेजस्विनी', last_name='Rao', phone_number='80004'
+        )
+        terms = set(PatientSearchTerm.objects.values_list('patient', 'kind', 'term'))
+        reindex_patients = import_module('patients.migrations.0007_patientsearchterm_phonetic').reindex_patients
+        PatientSearchTerm.objects.filter(patient=tejasvini).delete()
+        reindex_patients(django_apps, None, batch_size=1)
+        self.assertEqual(set(PatientSearchTerm.objects.values_list('patient', 'kind', 'term')), terms)
@@ -11,6 +11,8 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/', views.profile, name='profile'),
     path('edit-profile/', views.edit_profile, name='edit_profile'),
+    path('qr/<uuid:patient_id>.<str:image_format>', views.qr_code, name='qr_code'),
+    path('smart-card/', views.smart_card, name='smart_card'),
     path('upload-record/', views.upload_record, name='upload_record'),
     path('records/', views.view_records, name='view_records'),
     path('records/<uuid:record_id>/', views.view_record_detail, name='view_record_detail'),
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+
+
+def _cache():
+    """Return the SESSION_USER_CACHE cache, or None when user caching is off"""
+    alias = getattr(settings, 'SESSION_USER_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _key(model, user_id):
+    return f'session-user:{model._meta.label_lower}:{user_id}'
+
+
+def snapshot_fields(model):
+    """Fields kept in a cached user; long text fields are left deferred"""
+    return [field for field in model._meta.concrete_fields if not isinstance(field, models.TextField)]
+
+
+def load_user(model, user_id):
+    """
+    Load the logged-in user, from the cached snapshot when there is one
+
+    A cached user is rebuilt without a query; reading one of the fields left
+    out of the snapshot (addresses, medical history) loads it on access.
+
+    Returns:
+        The model instance, or None if it doesn't exist
+    """
+    cache = _cache()
+    fields = snapshot_fields(model)
+    if cache is not None:
+        values = cache.get(_key(model, user_id))
+        if values is not None:
+            return model.from_db(model._default_manager.db, [field.attname for field in fields], values)
+
+    try:
+        user = model._default_manager.get(pk=user_id)
+    except model.DoesNotExist:
+        return None
+
+    if cache is not None:
+        values = []
+        for field in fields:
+            value = getattr(user, field.attname)
+            values.append(value.name if isinstance(field, models.FileField) else value)
+        cache.set(_key(model, user_id), values, getattr(settings, 'SESSION_USER_CACHE_TIMEOUT', 300))
+    return user
+
+
+def load_deferred_fields(user):
+    """Load the fields a cached user left out, in one query instead of one per field"""
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+def forget_users(model, user_ids):
+    """Drop cached users after they were saved, updated in bulk or deleted"""
+    cache = _cache()
+    if cache is not None:
+        keys = [_key(model, user_id) for user_id in user_ids]
+        cache.delete_many(keys)
+        # Again once committed, in case a request cached the old row meanwhile
+        transaction.on_commit(lambda: cache.delete_many(keys))
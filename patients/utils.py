@@ -1,42 +1,267 @@
-import csv
+import hashlib
 import os
+import threading
+import time
 from django.conf import settings
+from .cache import LRUCache
+from .registry import DatabaseRegistry, DoctorRegistry
+from .snapshot import RegistrySnapshot
+
+DATASET_FILENAMES = ('active_doctors_clean.csv', 'blacklisted_doctors_clean.csv')
+
+_MISSING = object()
+
+def _file_stat(file_path):
+    """Return (mtime_ns, size) for a file, or None if it is missing"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _file_digest(file_path):
+    """Return the SHA-256 of a file, or None if it is missing"""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
 
 class DoctorValidationService:
     """
     Service to validate doctors against active and blacklisted datasets
+
+    The datasets are loaded on first use, or ahead of time with warm_up(),
+    from the mmap-backed snapshot at DOCTOR_REGISTRY_SNAPSHOT when it is up to
+    date with the CSV files (see `manage.py compile_doctor_registry`). With
+    DOCTOR_REGISTRY_SOURCE = 'database' lookups query the RegistryDoctor table
+    instead (see `manage.py import_doctor_registry`).
+    Once loaded, the source files are checked every
+    DOCTOR_REGISTRY_CHECK_INTERVAL seconds and rebuilt in a background thread
+    when they (or the reload marker) change; the new datasets replace the old
+    ones in a single assignment, so a lookup sees either the old or the new
+    registry, never a mix.
+    Results of validate_doctor() and get_doctor_details() are memoized per
+    registration number, exactly as given, and council
+    (DOCTOR_VALIDATION_CACHE_SIZE entries, DOCTOR_VALIDATION_CACHE_TTL
+    seconds) and dropped on reload.
     """
     
-    def __init__(self):
-        self.active_doctors = []
-        self.blacklisted_doctors = []
-        self.load_datasets()
+    def __init__(self, active_doctors=None, blacklisted_doctors=None):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._datasets = None
+        self._sources = None
+        self._next_check = None
+        self._statistics = None
+        self.load_seconds = None
+        self.load_error = None
+        self.results = LRUCache(
+            getattr(settings, 'DOCTOR_VALIDATION_CACHE_SIZE', 4096),
+            getattr(settings, 'DOCTOR_VALIDATION_CACHE_TTL', None),
+        )
+        if active_doctors is not None or blacklisted_doctors is not None:
+            self._datasets = (active_doctors or DoctorRegistry(), blacklisted_doctors or DoctorRegistry())
     
-    def load_datasets(self):
-        """Load doctor datasets from CSV files"""
+    @property
+    def is_loaded(self):
+        """Whether the datasets are in memory (the registry is warm)"""
+        return self._datasets is not None
+    
+    @property
+    def active_doctors(self):
+        return self.ensure_loaded()[0]
+    
+    @property
+    def blacklisted_doctors(self):
+        return self.ensure_loaded()[1]
+    
+    def ensure_loaded(self):
+        """
+        Return the current (active, blacklisted) datasets, loading them if no
+        request has done so yet and scheduling a change check when one is due
+        """
+        datasets = self._datasets
+        if datasets is None:
+            with self._lock:
+                if self._datasets is None:
+                    self.load_datasets()
+                datasets = self._datasets
+        elif self._next_check is not None and time.monotonic() >= self._next_check:
+            self._schedule_reload()
+        return datasets
+    
+    def warm_up(self):
+        """Load the datasets in a background thread"""
+        thread = threading.Thread(target=self.ensure_loaded, name='doctor-registry-warm-up', daemon=True)
+        thread.start()
+        return thread
+    
+    def dataset_paths(self):
+        """Resolve the active and blacklisted CSV paths"""
+        paths = []
+        for filename in DATASET_FILENAMES:
+            file_path = os.path.join(settings.STATIC_ROOT, 'css', filename)
+            if not os.path.exists(file_path):
+                file_path = os.path.join(settings.BASE_DIR, 'static', 'css', filename)
+            paths.append(file_path)
+        return paths
+    
+    def _reload_marker(self):
+        return getattr(settings, 'DOCTOR_REGISTRY_RELOAD_MARKER', None)
+    
+    def source_fingerprints(self):
+        """Return the stat and SHA-256 of each dataset file, keyed by filename"""
+        return {
+            os.path.basename(file_path): {'stat': _file_stat(file_path), 'sha256': _file_digest(file_path)}
+            for file_path in self.dataset_paths()
+        }
+    
+    def _open_snapshot(self, file_stats):
+        """Open the compiled snapshot if it was built from the current dataset files"""
+        snapshot_path = getattr(settings, 'DOCTOR_REGISTRY_SNAPSHOT', None)
+        if not snapshot_path or not os.path.exists(snapshot_path):
+            return None
+        
         try:
-            # Load active doctors
-            active_file_path = os.path.join(settings.STATIC_ROOT, 'css', 'active_doctors_clean.csv')
-            if not os.path.exists(active_file_path):
-                active_file_path = os.path.join(settings.BASE_DIR, 'static', 'css', 'active_doctors_clean.csv')
-            
-            if os.path.exists(active_file_path):
-                with open(active_file_path, 'r', encoding='utf-8') as file:
-                    reader = csv.DictReader(file)
-                    self.active_doctors = list(reader)
-            
-            # Load blacklisted doctors
-            blacklisted_file_path = os.path.join(settings.STATIC_ROOT, 'css', 'blacklisted_doctors_clean.csv')
-            if not os.path.exists(blacklisted_file_path):
-                blacklisted_file_path = os.path.join(settings.BASE_DIR, 'static', 'css', 'blacklisted_doctors_clean.csv')
+            snapshot = RegistrySnapshot(snapshot_path)
+        except (OSError, ValueError) as e:
+            print(f"Error opening doctor registry snapshot: {e}")
+            return None
+        
+        for file_path, stat in file_stats.items():
+            source = snapshot.sources.get(os.path.basename(file_path))
+            if source is None or tuple(source['stat'] or ()) != tuple(stat or ()):
+                print("Doctor registry snapshot is out of date, loading CSV files instead")
+                return None
+        return snapshot
+    
+    def load_datasets(self):
+        """
+        Load doctor datasets from the configured source
+        
+        If a dataset file can't be parsed, the first load falls back to empty
+        registries; a reload keeps the current ones (and their sources, so the
+        next check retries) rather than swap in a partial registry.
+        
+        Returns:
+            bool: True if new datasets were swapped in
+        """
+        self.load_error = None
+        if getattr(settings, 'DOCTOR_REGISTRY_SOURCE', 'files') == 'database':
+            self._load_database()
+            return True
+        
+        started = time.perf_counter()
+        active_doctors = DoctorRegistry()
+        blacklisted_doctors = DoctorRegistry()
+        active_file_path, blacklisted_file_path = self.dataset_paths()
+        
+        # Record the sources before parsing, so a write during the parse is
+        # picked up by the next check
+        marker = self._reload_marker()
+        file_stats = {
+            file_path: _file_stat(file_path)
+            for file_path in (active_file_path, blacklisted_file_path)
+        }
+        sources = {'marker': _file_stat(marker) if marker else None, 'files': {}}
+        
+        snapshot = self._open_snapshot(file_stats)
+        if snapshot is not None:
+            active_doctors = snapshot.active_doctors
+            blacklisted_doctors = snapshot.blacklisted_doctors
+            for file_path, stat in file_stats.items():
+                sources['files'][file_path] = (stat, snapshot.sources[os.path.basename(file_path)]['sha256'])
+            # A recompiled snapshot triggers a reload too
+            snapshot_path = str(settings.DOCTOR_REGISTRY_SNAPSHOT)
+            sources['files'][snapshot_path] = (_file_stat(snapshot_path), None)
+        else:
+            for file_path, stat in file_stats.items():
+                sources['files'][file_path] = (stat, _file_digest(file_path))
             
-            if os.path.exists(blacklisted_file_path):
-                with open(blacklisted_file_path, 'r', encoding='utf-8') as file:
-                    reader = csv.DictReader(file)
-                    self.blacklisted_doctors = list(reader)
-                    
-        except Exception as e:
-            print(f"Error loading doctor datasets: {e}")
+            try:
+                # Load active doctors
+                if os.path.exists(active_file_path):
+                    active_doctors = DoctorRegistry.from_csv(active_file_path)
+                
+                # Load blacklisted doctors
+                if os.path.exists(blacklisted_file_path):
+                    blacklisted_doctors = DoctorRegistry.from_csv(blacklisted_file_path)
+                        
+            except Exception as e:
+                self.load_error = e
+                if self._datasets is not None:
+                    print(f"Error loading doctor datasets, keeping the current registry: {e}")
+                    self._schedule_check()
+                    return False
+                print(f"Error loading doctor datasets: {e}")
+        
+        # Build the suggestion indexes here, in the loading thread, not on the first suggest_doctors()
+        for registry in (active_doctors, blacklisted_doctors):
+            registry.build_near_matches()
+        
+        # Swap in both registries at once
+        self._datasets = (active_doctors, blacklisted_doctors)
+        self._sources = sources
+        self.load_seconds = time.perf_counter() - started
+        self._schedule_check()
+        return True
+    
+    def _schedule_check(self):
+        interval = getattr(settings, 'DOCTOR_REGISTRY_CHECK_INTERVAL', None)
+        self._next_check = time.monotonic() + interval if interval else None
+    
+    def _load_database(self):
+        """Query the imported RegistryDoctor table instead of holding the datasets in memory"""
+        from doctors.models import RegistryDoctor
+        
+        self._datasets = (
+            DatabaseRegistry(RegistryDoctor.objects.filter(list_type='ACTIVE')),
+            DatabaseRegistry(RegistryDoctor.objects.filter(list_type='BLACKLISTED')),
+        )
+        self._sources = None
+        self._next_check = None
+        self.load_seconds = 0
+    
+    def has_changed(self):
+        """Check whether the dataset files or the reload marker changed since the last load"""
+        sources = self._sources
+        if sources is None:
+            return False
+        
+        marker = self._reload_marker()
+        if marker and _file_stat(marker) != sources['marker']:
+            return True
+        
+        for file_path, (stat, digest) in list(sources['files'].items()):
+            current = _file_stat(file_path)
+            if current == stat:
+                continue
+            if current is None or _file_digest(file_path) != digest:
+                return True
+            # Touched but unchanged content: remember the new stat and move on
+            sources['files'][file_path] = (current, digest)
+        return False
+    
+    def reload(self, force=False):
+        """
+        Rebuild the datasets if their sources changed
+        
+        Returns:
+            bool: True if new datasets were swapped in
+        """
+        with self._reload_lock:
+            if not force and self.is_loaded and not self.has_changed():
+                return False
+            return self.load_datasets()
+    
+    def _schedule_reload(self):
+        """Run reload() in a background thread, keeping the stat calls off the request path"""
+        self._schedule_check()
+        threading.Thread(target=self.reload, name='doctor-registry-reload', daemon=True).start()
     
     def validate_doctor(self, registration_number=None, state_medical_council=None):
         """
@@ -49,23 +274,64 @@ class DoctorValidationService:
         Returns:
             dict: Validation result with status and doctor details
         """
-        # Check if doctor is blacklisted
-        blacklisted = self._check_blacklist(registration_number, state_medical_council)
-        if blacklisted:
-            return {
-                'status': 'BLACKLISTED',
-                'message': 'Doctor is not authorized to access patient records',
-                'doctor': blacklisted
-            }
-        
-        # Check if doctor is in active list
-        active = self._check_active(registration_number, state_medical_council)
-        if active:
-            return {
-                'status': 'AUTHORIZED',
-                'message': 'Doctor is authorized to access patient records',
-                'doctor': active
-            }
+        # Read one snapshot so a concurrent reload can't mix old and new lists
+        datasets = self.ensure_loaded()
+        return self._cached(
+            'validate', registration_number, state_medical_council, datasets,
+            lambda: self._validate(datasets, registration_number, state_medical_council),
+        )
+    
+    def _cached(self, kind, registration_number, state_medical_council, datasets, compute):
+        """
+        Return a copy of the memoized result, computing it on a miss
+        
+        Keyed by the number exactly as given: an exact match outranks the
+        canonical form, so numbers that normalize alike can find different rows.
+        """
+        key = (kind, registration_number, state_medical_council)
+        result = self.results.get(key, datasets, _MISSING)
+        if result is _MISSING:
+            result = compute()
+            self.results.set(key, result, datasets)
+        return dict(result) if result is not None else None
+    
+    def validate_many(self, doctors):
+        """
+        Validate many doctors against one snapshot of the datasets
+        
+        Args:
+            doctors: Iterable of (registration_number, state_medical_council) pairs
+            
+        Yields:
+            dict: Validation result for each pair, in order
+        """
+        datasets = self.ensure_loaded()
+        for registration_number, state_medical_council in doctors:
+            yield self._validate(datasets, registration_number, state_medical_council)
+    
+    def _validate(self, datasets, registration_number, state_medical_council):
+        active_doctors, blacklisted_doctors = datasets
+        
+        # Exact registration numbers in both lists first: a canonical form
+        # match must never outrank the doctor's own row in the other list
+        for normalized in (False, True):
+            # Check if doctor is blacklisted
+            blacklisted = blacklisted_doctors.find(registration_number, state_medical_council, normalized)
+            if blacklisted:
+                return {
+                    'status': 'BLACKLISTED',
+                    'message': 'Doctor is not authorized to access patient records',
+                    'doctor': blacklisted
+                }
+            
+            # Check if doctor is in active list
+            active = active_doctors.find(registration_number, state_medical_council, normalized)
+            if active:
+                return {
+                    'status': 'AUTHORIZED',
+                    'message': 'Doctor is authorized to access patient records',
+                    'doctor': active
+                }
         
         return {
             'status': 'NOT_FOUND',
@@ -75,35 +341,36 @@ class DoctorValidationService:
     
     def _check_blacklist(self, registration_number=None, state_medical_council=None):
         """Check if doctor is in blacklist"""
-        for doctor in self.blacklisted_doctors:
-            if registration_number and doctor.get('registration_number') == registration_number:
-                return doctor
-            if state_medical_council and doctor.get('state_medical_council') == state_medical_council:
-                return doctor
-        return None
+        return self.blacklisted_doctors.find(registration_number, state_medical_council)
     
     def _check_active(self, registration_number=None, state_medical_council=None):
         """Check if doctor is in active list"""
-        for doctor in self.active_doctors:
-            if registration_number and doctor.get('registration_number') == registration_number:
-                return doctor
-            if state_medical_council and doctor.get('state_medical_council') == state_medical_council:
-                return doctor
-        return None
+        return self.active_doctors.find(registration_number, state_medical_council)
     
     def get_doctor_details(self, registration_number):
         """Get detailed information about a doctor"""
-        # First check active doctors
-        for doctor in self.active_doctors:
-            if doctor.get('registration_number') == registration_number:
+        datasets = self.ensure_loaded()
+        return self._cached(
+            'details', registration_number, None, datasets,
+            lambda: self._details(datasets, registration_number),
+        )
+    
+    def _details(self, datasets, registration_number):
+        active_doctors, blacklisted_doctors = datasets
+        
+        # Exact registration numbers in both lists before canonical forms
+        for normalized in (False, True):
+            # First check active doctors
+            doctor = active_doctors.find(registration_number, normalized=normalized)
+            if doctor is not None:
                 return {
                     'status': 'ACTIVE',
                     'doctor': doctor
                 }
-        
-        # Then check blacklisted doctors
-        for doctor in self.blacklisted_doctors:
-            if doctor.get('registration_number') == registration_number:
+            
+            # Then check blacklisted doctors
+            doctor = blacklisted_doctors.find(registration_number, normalized=normalized)
+            if doctor is not None:
                 return {
                     'status': 'BLACKLISTED',
                     'doctor': doctor
@@ -111,14 +378,58 @@ class DoctorValidationService:
         
         return None
     
+    def suggest_doctors(self, registration_number, limit=5):
+        """
+        Find the registry entries closest to a registration number that has
+        no exact match, e.g. one typed with a digit missing or swapped
+        
+        Returns:
+            list: Dicts with status, doctor and edit distance, closest first
+        """
+        active_doctors, blacklisted_doctors = self.ensure_loaded()
+        if not registration_number:
+            return []
+        
+        candidates = []
+        for status, registry in (('ACTIVE', active_doctors), ('BLACKLISTED', blacklisted_doctors)):
+            for doctor, distance in registry.suggest(registration_number, limit):
+                candidates.append({'status': status, 'doctor': doctor, 'distance': distance})
+        candidates.sort(key=lambda candidate: candidate['distance'])
+        return candidates[:limit]
+    
     def get_statistics(self):
-        """Get statistics about the doctor database"""
-        return {
-            'total_active_doctors': len(self.active_doctors),
-            'total_blacklisted_doctors': len(self.blacklisted_doctors),
-            'state_councils_active': list(set(doc.get('state_medical_council') for doc in self.active_doctors if doc.get('state_medical_council'))),
-            'qualifications_active': list(set(doc.get('qualification_1') for doc in self.active_doctors if doc.get('qualification_1')))
+        """
+        Get statistics about the doctor database
+        
+        Computed once per loaded snapshot from the per-value counts the
+        registries keep, so the cost doesn't grow with the registry size. In
+        database mode they are cached for DOCTOR_REGISTRY_CHECK_INTERVAL
+        seconds instead, or until the next reload when it is disabled.
+        """
+        datasets = self.ensure_loaded()
+        cached = self._statistics
+        if cached is not None and cached[0] is datasets and (cached[2] is None or time.monotonic() < cached[2]):
+            return cached[1]
+        
+        active_doctors, blacklisted_doctors = datasets
+        active_by_council = active_doctors.value_counts('state_medical_council')
+        active_by_qualification = active_doctors.value_counts('qualification_1')
+        statistics = {
+            'total_active_doctors': len(active_doctors),
+            'total_blacklisted_doctors': len(blacklisted_doctors),
+            'state_councils_active': list(active_by_council),
+            'qualifications_active': list(active_by_qualification),
+            'active_by_council': active_by_council,
+            'active_by_qualification': active_by_qualification,
+            'blacklisted_by_council': blacklisted_doctors.value_counts('state_medical_council'),
         }
+        
+        expires = None
+        interval = getattr(settings, 'DOCTOR_REGISTRY_CHECK_INTERVAL', None)
+        if isinstance(active_doctors, DatabaseRegistry) and interval:
+            expires = time.monotonic() + interval
+        self._statistics = (datasets, statistics, expires)
+        return statistics
 
-# Global instance
+# Global instance, loaded on first use
 doctor_validator = DoctorValidationService()
@@ -2,8 +2,14 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseForbidden, Http404, StreamingHttpResponse
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from authentication import session_backend
 from .models import Patient, MedicalRecord
+from .user_cache import load_deferred_fields
+from .qr import RENDERERS, payload_hash, render_qr
+from .cards import card_item, card_sheets_pdf, compose_cards
 from .forms import PatientRegistrationForm, PatientProfileForm, MedicalRecordForm
 
 def home(request):
@@ -14,7 +20,7 @@ def register(request):
         form = PatientRegistrationForm(request.POST)
         if form.is_valid():
             user = form.save()
-            login(request, user)
+            login(request, user, backend=session_backend(user))
             messages.success(request, 'Registration successful!')
             return redirect('patients:dashboard')
     else:
@@ -25,9 +31,9 @@ def patient_login(request):
     if request.method == 'POST':
         email = request.POST.get('email')
         password = request.POST.get('password')
-        user = authenticate(request, username=email, password=password)
+        user = authenticate(request, username=email, password=password, user_kind='patient')
         if user is not None:
-            login(request, user)
+            login(request, user, backend=session_backend(user))
             messages.success(request, 'Login successful!')
             return redirect('patients:dashboard')
         else:
@@ -50,21 +56,18 @@ def dashboard(request):
 
 @login_required
 def profile(request):
-    patient = request.user
+    patient = load_deferred_fields(request.user)
     return render(request, 'patients/profile.html', {'patient': patient})
 
 @login_required
 def edit_profile(request):
-    patient = request.user
+    patient = load_deferred_fields(request.user)
     if request.method == 'POST':
         form = PatientProfileForm(request.POST, request.FILES, instance=patient)
         if form.is_valid():
-            # Save the form
+            # Saving queues the QR code render when its payload changed
             form.save()
             
-            # Generate QR code after profile update
-            patient.generate_qr_code()
-            
             messages.success(request, 'Profile updated successfully! QR code generated.')
             return redirect('patients:profile')
     else:
@@ -103,3 +106,52 @@ def delete_record(request, record_id):
         messages.success(request, 'Record deleted successfully!')
         return redirect('patients:view_records')
     return render(request, 'patients/delete_record.html', {'record': record})
+
+@login_required
+def qr_code(request, patient_id, image_format):
+    """
+    Render a patient's QR code on demand, as PNG or SVG; ?box= sets the size
+    of a module in pixels
+    
+    The patient, verified doctors and superusers may fetch it. The strong
+    ETag follows the payload, so browsers revalidate with a 304 instead of
+    downloading the image again.
+    """
+    if image_format not in RENDERERS:
+        raise Http404
+    user = request.user
+    if user.pk == patient_id and not hasattr(user, 'doctor_id'):
+        patient = user
+    elif user.is_superuser or (hasattr(user, 'doctor_id') and user.is_verified):
+        patient = get_object_or_404(Patient, id=patient_id)
+    else:
+        return HttpResponseForbidden()
+    
+    try:
+        box_size = min(max(int(request.GET.get('box', 10)), 1), 20)
+    except ValueError:
+        box_size = 10
+    
+    payload = patient.get_qr_data()
+    etag = f'"{payload_hash(payload)}-{image_format}-{box_size}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type, content = render_qr(payload, image_format, box_size)
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    # The payload carries personal details: browsers may keep it, shared caches may not
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'QR_CODE_MAX_AGE', 300))
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+@login_required
+def smart_card(request):
+    """Download the patient's printable smart card as a PDF"""
+    if not hasattr(request.user, 'patient_id'):
+        return HttpResponseForbidden()
+    
+    _, item = card_item(request.user)
+    compose_cards([item])
+    response = StreamingHttpResponse(card_sheets_pdf([item[1:]]), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="smart_card_{request.user.patient_id}.pdf"'
+    return response
@@ -28,6 +28,9 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Patient typeahead on search and emergency access fields
+    document.querySelectorAll('input[data-suggest-url]').forEach(initPatientTypeahead);
+
     // Loading spinner for file uploads
     var fileInputs = document.querySelectorAll('input[type="file"]');
     fileInputs.forEach(function(input) {
@@ -192,3 +195,129 @@ function validateFileSize(input, maxSizeMB = 10) {
     
     return true;
 }
+
+// Patient typeahead: suggestions from the server as the doctor types
+function initPatientTypeahead(input) {
+    var url = input.dataset.suggestUrl;
+    var fill = input.dataset.suggestFill;  // Fill the input with this field instead of opening the patient
+    var csrfInput = input.form && input.form.querySelector('input[name="csrfmiddlewaretoken"]');
+    var cache = {};  // Query -> response, so backspacing doesn't ask again
+    var timer = null;
+    var pending = null;
+    var active = -1;
+
+    var menu = document.createElement('div');
+    menu.className = 'list-group position-absolute w-100 shadow-sm d-none';
+    menu.style.zIndex = 1050;
+    input.parentNode.classList.add('position-relative');
+    input.parentNode.appendChild(menu);
+
+    function close() {
+        menu.classList.add('d-none');
+        active = -1;
+    }
+
+    function choose(result) {
+        if (fill) {
+            input.value = result[fill];
+            close();
+        } else {
+            window.location = result.url;
+        }
+    }
+
+    function highlight(index) {
+        var items = menu.querySelectorAll('.list-group-item');
+        if (!items.length) {
+            return;
+        }
+        active = (index + items.length) % items.length;
+        items.forEach(function(item, i) {
+            item.classList.toggle('active', i === active);
+        });
+    }
+
+    function show(query, response) {
+        if (input.value.trim() !== query) {
+            return;  // A later keystroke has changed the query since
+        }
+        menu.innerHTML = '';
+        active = -1;
+        response.results.forEach(function(result) {
+            var item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            var name = document.createElement('strong');
+            name.textContent = result.name;
+            var id = document.createElement('small');
+            id.className = 'text-muted ms-2';
+            id.textContent = result.patient_id;
+            item.appendChild(name);
+            item.appendChild(id);
+            item.addEventListener('mousedown', function(event) {
+                event.preventDefault();
+                choose(result);
+            });
+            menu.appendChild(item);
+        });
+        menu.classList.toggle('d-none', response.results.length === 0);
+    }
+
+    function fetchSuggestions(query) {
+        if (cache[query]) {
+            show(query, cache[query]);
+            return;
+        }
+        if (pending) {
+            pending.abort();
+        }
+        pending = new AbortController();
+        var body = new FormData();
+        body.append('q', query);
+        fetch(url, {
+            method: 'POST',
+            body: body,
+            headers: {'X-CSRFToken': csrfInput ? csrfInput.value : ''},
+            credentials: 'same-origin',
+            signal: pending.signal
+        }).then(function(response) {
+            return response.ok ? response.json() : {results: []};
+        }).then(function(response) {
+            cache[query] = response;
+            show(query, response);
+        }).catch(function() {
+            // Aborted by a newer keystroke, or offline: the form still works
+        });
+    }
+
+    input.setAttribute('autocomplete', 'off');
+    input.addEventListener('input', function() {
+        var query = input.value.trim();
+        clearTimeout(timer);
+        if (query.length < 2) {
+            close();
+            return;
+        }
+        // Wait for a pause in typing before asking the server
+        timer = setTimeout(function() {
+            fetchSuggestions(query);
+        }, 150);
+    });
+
+    input.addEventListener('keydown', function(event) {
+        if (menu.classList.contains('d-none')) {
+            return;
+        }
+        if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+            event.preventDefault();
+            highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+        } else if (event.key === 'Enter' && active >= 0) {
+            event.preventDefault();
+            menu.querySelectorAll('.list-group-item')[active].dispatchEvent(new MouseEvent('mousedown'));
+        } else if (event.key === 'Escape') {
+            close();
+        }
+    });
+
+    input.addEventListener('blur', close);
+}